@@ -73,4 +73,12 @@
 """
 from jsocket.jsocket_base import *
 from jsocket.tserver import *
+from jsocket.serializers import register_codec, get_codec, available_codecs
+from jsocket.framing import FrameEncoder, FrameDecoder
+from jsocket.mux import MultiplexClient, RemoteCallError
+from jsocket.pool import JsonClientPool
+from jsocket.aio import AsyncJsonStream, AsyncJsonClient, AsyncJsonServer
+from jsocket.selector_server import SelectorServerFactory
+from jsocket.prefork import PreforkServer
+from jsocket.relay import RelayServer, RelayWorker
 from ._version import __version__
@@ -0,0 +1,540 @@
+""" @namespace aio
+    asyncio transport for jsocket framing.
+
+    AsyncJsonStream speaks the same JSN1/JSN2 frames as JsonSocket over an
+    asyncio StreamReader/StreamWriter pair; header validation, size limits,
+    integrity checks, compression and codecs are delegated to a JsonSocket
+    used purely as a framer, so FramingError semantics match jsocket_base.
+    AsyncJsonServer serves many clients from one event loop.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import abc
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Optional
+
+from jsocket import tserver
+from jsocket.jsocket_base import (
+    DEFAULT_BACKLOG,
+    DEFAULT_RETRY_POLICY,
+    RECV_BUFFER_SIZE,
+    FramingError,
+    JsonSocket,
+    _clip_to_deadline,
+    _integrity_name,
+)
+
+logger = logging.getLogger("jsocket.aio")
+
+
+class _StreamFramer(JsonSocket):
+    """JsonSocket used only for encoding and validating frames.
+
+    Closing the "connection" closes the asyncio writer, and control replies
+    (codec and zdict negotiation) are queued on it.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(create_socket=False, **kwargs)
+        self.writer = None
+
+    def _send_parts(self, parts):
+        if self.writer is not None:
+            self.writer.writelines(parts)
+
+    def _close_connection(self):
+        super()._close_connection()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class AsyncJsonStream:
+    """Framed JSON messages over an asyncio StreamReader/StreamWriter pair."""
+
+    def __init__(self, reader=None, writer=None, recv_timeout=None, **kwargs):
+        """Extra keyword arguments (max_message_size, codec, compression, ...) configure the framing."""
+        self._framer = _StreamFramer(**kwargs)
+        self._recv_timeout = recv_timeout
+        self.reader = None
+        self.writer = None
+        if reader is not None and writer is not None:
+            self._attach(reader, writer)
+
+    def _attach(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._framer.writer = writer
+        self._framer._reset_connection_state()
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            self._framer._apply_socket_options(sock)
+
+    def _check_open(self):
+        if self.writer is None or self.writer.is_closing():
+            raise RuntimeError("socket connection broken")
+
+    async def send_obj(self, obj):
+        """Send a JSON-serializable object and wait until it is handed to the transport."""
+        self._check_open()
+        self.writer.writelines(self._framer._encode_frame(obj))
+        await self._drain()
+
+    async def send_many(self, objs) -> list:
+        """Send several objects back to back; see JsonSocket.send_many.
+
+        @retval list of per-object payload sizes on the wire
+        """
+        self._check_open()
+        sizes = []
+        parts = []
+        for obj in objs:
+            parts.extend(self._framer._encode_frame(obj))
+            sizes.append(self._framer._last_send_size)
+        if parts:
+            self.writer.writelines(parts)
+            await self._drain()
+        return sizes
+
+    async def _drain(self):
+        try:
+            await self.writer.drain()
+        except (ConnectionError, OSError) as e:
+            self._framer._close_connection()
+            raise RuntimeError("socket connection broken") from e
+
+    async def _read(self, allow_timeout=False):
+        """Read whatever bytes are available, mapping EOF and timeouts like JsonSocket._read."""
+        try:
+            data = await asyncio.wait_for(self.reader.read(RECV_BUFFER_SIZE), self._recv_timeout)
+        except asyncio.TimeoutError:
+            if allow_timeout:
+                raise socket.timeout("timed out") from None
+            self._framer._close_connection()
+            raise FramingError("socket read timeout during message") from None
+        except (ConnectionError, OSError) as e:
+            self._framer._close_connection()
+            raise RuntimeError("socket connection broken") from e
+        if not data:
+            self._framer._close_connection()
+            raise RuntimeError("socket connection broken")
+        return data
+
+    async def read_obj(self):
+        """Read one message and return the decoded object.
+
+        Raises socket.timeout if nothing arrives within recv_timeout, FramingError on
+        invalid frames and RuntimeError("socket connection broken") on disconnect.
+        """
+        self._check_open()
+        while True:
+            obj, control = await self._read_message()
+            if not control:
+                return obj
+            self._framer._handle_control(obj)
+            await self._drain()
+
+    async def _read_message(self):
+        """Read one frame through the framer's FrameDecoder; return (obj, is_control)."""
+        framer = self._framer
+        decoder = framer._frame_decoder()
+        while True:
+            try:
+                frame = decoder.next_frame()
+            except FramingError:
+                framer._close_connection()
+                raise
+            if frame is not None:
+                break
+            # Only an idle connection may time out; a half-read frame is a framing error.
+            decoder.append(await self._read(allow_timeout=not decoder.buffered))
+        framer._accept_header(frame)
+        framer._last_read_size = frame.size
+        # The decoder already verified the checksum.
+        return framer._finish_message(frame.payload, None, None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Yield incoming objects until the peer disconnects; idle timeouts are skipped."""
+        while True:
+            try:
+                return await self.read_obj()
+            except socket.timeout:
+                continue
+            except RuntimeError as e:
+                if isinstance(e, FramingError) or "socket connection broken" not in str(e):
+                    raise
+                raise StopAsyncIteration from None
+
+    async def close(self):
+        """Close the stream and wait for the transport to shut down."""
+        writer = self.writer
+        if writer is None:
+            return
+        self._framer._reset_connection_state()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _is_connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    def _get_peername(self):
+        return self.writer.get_extra_info("peername") if self.writer is not None else None
+
+    def _get_framer(self):
+        return self._framer
+
+    def _get_recv_timeout(self):
+        return self._recv_timeout
+
+    def _set_recv_timeout(self, timeout):
+        self._recv_timeout = timeout
+
+    connected = property(_is_connected, doc="True while the stream is open")
+    peername = property(_get_peername, doc="read only property of the peer address")
+    recv_timeout = property(_get_recv_timeout, _set_recv_timeout, doc="Get/set read timeout (None waits forever)")
+    framer = property(_get_framer, doc="read only JsonSocket holding codec/compression settings")
+
+
+class AsyncJsonClient(AsyncJsonStream):
+    """asyncio counterpart of JsonClient."""
+
+    def __init__(
+        self,
+        address='127.0.0.1',
+        port=5489,
+        timeout=2.0,
+        recv_timeout=None,
+        connect_timeout=None,
+        retry_policy=None,
+        **kwargs,
+    ):
+        """Extra keyword arguments (socket_options, codec, compression, ...) configure the framing.
+
+        @param connect_timeout seconds one connection attempt may take (default timeout)
+        @param retry_policy RetryPolicy for connect(), as for JsonClient
+        """
+        super().__init__(recv_timeout=timeout if recv_timeout is None else recv_timeout, **kwargs)
+        self._address = address
+        self._port = port
+        self._timeout = timeout
+        self._connect_timeout = timeout if connect_timeout is None else connect_timeout
+        self._retry_policy = DEFAULT_RETRY_POLICY if retry_policy is None else retry_policy
+
+    async def connect(self, fail_fast=False):
+        """Connect to the server, retrying like JsonClient.connect without blocking the loop.
+
+        @param fail_fast make a single attempt and return False at once if it fails
+        @retval True on success, False once the attempts or the deadline are used up
+        """
+        policy = self._retry_policy
+        loop = asyncio.get_running_loop()
+        deadline = None if policy.deadline is None else loop.time() + policy.deadline
+        attempts = 1 if fail_fast else policy.attempts
+        final = False
+        for attempt in range(1, attempts + 1):
+            timeout = self._connect_timeout
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                logger.debug("connect attempt %d to %s:%s", attempt, self._address, self._port)
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._address, self._port), timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.error("connect to %s:%s failed: %s", self._address, self._port, e or type(e).__name__)
+                if attempt == attempts or final:
+                    break
+                delay = policy.delay(attempt)
+                if deadline is not None:
+                    delay, final = _clip_to_deadline(delay, deadline - loop.time(), self._connect_timeout)
+                    if delay is None:
+                        break
+                await asyncio.sleep(delay)
+                continue
+            self._attach(reader, writer)
+            logger.info("...Socket Connected")
+            if self._framer._needs_integrity_offer():
+                try:
+                    await self._negotiate_integrity()
+                except (OSError, RuntimeError) as e:
+                    logger.error("integrity negotiation with %s:%s failed: %s", self._address, self._port, e)
+                    await self.close()
+                    return False
+            if self._framer._needs_codec_offer():
+                try:
+                    await self._negotiate_codec()
+                except (OSError, RuntimeError) as e:
+                    logger.error("codec negotiation with %s:%s failed: %s", self._address, self._port, e)
+                    await self.close()
+                    return False
+            if getattr(self._framer, "_zdicts", None):
+                try:
+                    await self._negotiate_zdict()
+                except (OSError, RuntimeError) as e:
+                    logger.error("zdict negotiation with %s:%s failed: %s", self._address, self._port, e)
+                    await self.close()
+                    return False
+            return True
+        return False
+
+    async def _negotiate_integrity(self):
+        framer = self._framer
+        self.writer.writelines(
+            framer._encode_frame({"op": "integrity_offer", "mode": framer.integrity}, control=True)
+        )
+        await self._drain()
+        msg, control = await self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "integrity_accept":
+            framer._close_connection()
+            raise FramingError("unexpected reply to integrity offer")
+        framer._handle_control(msg)
+        return _integrity_name(framer._send_integrity())
+
+    async def _negotiate_codec(self):
+        framer = self._framer
+        self.writer.writelines(
+            framer._encode_frame({"op": "codec_offer", "ids": framer._decodable_codec_ids()}, control=True)
+        )
+        await self._drain()
+        msg, control = await self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "codec_accept":
+            framer._close_connection()
+            raise FramingError("unexpected reply to codec offer")
+        framer._handle_control(msg)
+        return framer._send_codec().name
+
+    async def _negotiate_zdict(self):
+        framer = self._framer
+        self.writer.writelines(
+            framer._encode_frame({"op": "zdict_offer", "ids": list(framer._zdicts)}, control=True)
+        )
+        await self._drain()
+        msg, control = await self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "zdict_accept":
+            framer._close_connection()
+            raise FramingError("unexpected reply to zdict offer")
+        framer._handle_control(msg)
+        return framer.zdict_id
+
+    def _get_address(self):
+        return self._address
+
+    def _get_port(self):
+        return self._port
+
+    address = property(_get_address, doc="read only property socket address")
+    port = property(_get_port, doc="read only property socket port")
+
+
+class _AsyncClientState:
+    """Per-connection stats holder shaped like a ServerFactoryThread for the tserver stats helpers."""
+
+    def __init__(self, stats_lock, client_id):
+        self._stats_lock = stats_lock
+        self._client_stats = {}
+        self._active_client_id = None
+        self._client_id = client_id
+
+
+class AsyncJsonServer(metaclass=abc.ABCMeta):
+    """asyncio server running one coroutine per connection instead of one thread.
+
+    Subclass and implement _process_message, either as `async def` (awaited on the
+    event loop) or as a plain method (run in `executor`, the loop's default thread
+    pool when None). Per-client stats match ServerFactory.get_client_stats.
+    """
+
+    def __init__(
+        self,
+        address='127.0.0.1',
+        port=5489,
+        timeout=2.0,
+        recv_timeout=None,
+        backlog=DEFAULT_BACKLOG,
+        executor=None,
+        **kwargs,
+    ):
+        """Extra keyword arguments (max_message_size, codec, compression, ...) configure the framing."""
+        self._address = address
+        self._port = port
+        self._recv_timeout = timeout if recv_timeout is None else recv_timeout
+        self._backlog = backlog
+        self._executor = executor
+        self._framing_kwargs = kwargs
+        self._server = None
+        self._streams = {}
+        self._stats_lock = threading.Lock()
+        self._client_stats_archive = {}
+
+    @abc.abstractmethod
+    def _process_message(self, obj) -> Optional[dict]:
+        """Pure Virtual Method - Implementer must define protocol (may be a coroutine)
+
+        @param obj JSON "key: value" object received from client
+        @retval None or a response object
+        """
+        # Return None in the base class to satisfy linters; subclasses should override.
+        return None
+
+    async def start(self):
+        """Bind and start accepting connections."""
+        self._server = await asyncio.start_server(
+            self._serve_client, self._address, self._port, backlog=self._backlog
+        )
+        self._port = self._server.sockets[0].getsockname()[1]
+        logger.debug("AsyncJsonServer started on %s:%s", self._address, self._port)
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled or stopped."""
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self):
+        """Stop accepting and close every client connection."""
+        if self._server is not None:
+            self._server.close()
+        for stream in list(self._streams.values()):
+            await stream.close()
+        if self._server is not None:
+            # Python 3.12+ waits here for connection handlers, so close them first.
+            await self._server.wait_closed()
+        logger.debug("AsyncJsonServer stopped on %s:%s", self._address, self._port)
+
+    async def _serve_client(self, reader, writer):
+        stream = AsyncJsonStream(reader, writer, recv_timeout=self._recv_timeout, **self._framing_kwargs)
+        state = _AsyncClientState(self._stats_lock, tserver._format_client_id(stream.peername))
+        tserver._note_connect(state, state._client_id)
+        self._streams[state] = stream
+        try:
+            await self._handle_client_messages(stream, state)
+        finally:
+            tserver._note_disconnect(state)
+            self._archive_stats(state)
+            del self._streams[state]
+            await stream.close()
+
+    async def _handle_client_messages(self, stream, state):
+        """Read, process, and respond to one client's messages until disconnect."""
+        while True:
+            try:
+                obj = await stream.read_obj()
+            except socket.timeout:
+                tserver._note_failure(state, "timeout")
+                continue
+            except FramingError as e:
+                tserver._note_framing_failure(state, e)
+                logger.debug("framing error (%s): %s", type(e).__name__, e)
+                return
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if isinstance(e, RuntimeError) and "socket connection broken" in str(e):
+                    logger.info("client connection broken, closing connection")
+                else:
+                    logger.debug("handler error (%s): %s", type(e).__name__, e)
+                    tserver._note_failure(state, "handler")
+                return
+            client_id = tserver._extract_client_id(obj)
+            if client_id:
+                tserver._set_client_identity(state, client_id)
+            tserver._note_message_in(state, stream.framer._last_read_size)
+            try:
+                resp_obj = await self._call_handler(obj)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.debug("handler error (%s): %s", type(e).__name__, e)
+                tserver._note_failure(state, "handler")
+                return
+            if resp_obj is None:
+                continue
+            try:
+                await stream.send_obj(resp_obj)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.debug("send error (%s): %s", type(e).__name__, e)
+                tserver._note_failure(state, "bad_write")
+                return
+            tserver._note_message_out(state, stream.framer._last_send_size)
+
+    async def _call_handler(self, obj):
+        if asyncio.iscoroutinefunction(self._process_message):
+            return await self._process_message(obj)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._process_message, obj)
+
+    def _archive_stats(self, state):
+        with self._stats_lock:
+            for client_id, stats in state._client_stats.items():
+                stats = tserver._clone_client_stats(stats)
+                stats["connected"] = False
+                stats["_connected_since"] = None
+                existing = self._client_stats_archive.get(client_id)
+                if existing is None:
+                    self._client_stats_archive[client_id] = stats
+                else:
+                    self._client_stats_archive[client_id] = tserver._merge_client_stats(existing, stats)
+            state._client_stats = {}
+
+    def get_client_stats(self) -> dict:
+        """Return per-client stats including connects, messages, failures, and timestamps."""
+        with self._stats_lock:
+            combined = {cid: tserver._clone_client_stats(s) for cid, s in self._client_stats_archive.items()}
+            for state in list(self._streams):
+                for client_id, stats in state._client_stats.items():
+                    existing = combined.get(client_id)
+                    if existing is None:
+                        combined[client_id] = tserver._clone_client_stats(stats)
+                    else:
+                        combined[client_id] = tserver._merge_client_stats(existing, stats)
+        combined = tserver._rekey_stats_map(combined)
+        now = time.monotonic()
+        clients = {cid: tserver._format_client_stats(stats, now) for cid, stats in combined.items()}
+        connected = sum(1 for stats in clients.values() if stats.get("connected"))
+        return {"connected_clients": connected, "clients": clients}
+
+    def _get_address(self):
+        return self._address
+
+    def _get_port(self):
+        return self._port
+
+    def _get_connections(self):
+        return len(self._streams)
+
+    address = property(_get_address, doc="read only property socket address")
+    port = property(_get_port, doc="read only property bound port (the real port once started with port=0)")
+    connections = property(_get_connections, doc="number of open client connections")
@@ -0,0 +1,196 @@
+""" @namespace compression
+    Stdlib payload compressors (zlib, lzma, bz2) used for JSN2 frame compression.
+
+    Decompression is always bounded by a maximum output size so a small
+    compressed frame cannot expand past max_message_size. zlib frames may also
+    use a shared preset dictionary (zdict) built from sample messages, which
+    peers agree on by id when a connection is opened.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import bz2
+import json
+import lzma
+import re
+import threading
+import zlib
+from collections import Counter
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+DEFAULT_ZDICT_SIZE = 16 * 1024
+MAX_ZDICT_SIZE = 32 * 1024
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSION_BZ2 = 3
+
+COMPRESSION_IDS = {
+    "zlib": COMPRESSION_ZLIB,
+    "lzma": COMPRESSION_LZMA,
+    "bz2": COMPRESSION_BZ2,
+}
+
+
+class DecompressionLimitError(ValueError):
+    """Raised when a payload would decompress past the allowed size."""
+
+
+_zdicts_lock = threading.Lock()
+_zdicts = {}
+
+# JSON strings (optionally followed by a colon, i.e. keys) and literal/punctuation runs.
+_ZDICT_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"\s*:?\s*|[\[\]{},:\s]+|true|false|null')
+
+
+def compression_id(name) -> int:
+    """Return the wire id for a compression name (None means no compression)."""
+    if name is None:
+        return COMPRESSION_NONE
+    try:
+        return COMPRESSION_IDS[name]
+    except KeyError:
+        raise ValueError(f"unknown compression {name!r}") from None
+
+
+def zdict_id(data) -> int:
+    """Derive the 16-bit wire id for a dictionary from its content (never 0)."""
+    return (zlib.adler32(data) % 0xFFFF) + 1
+
+
+def register_zdict(data, dict_id=None) -> int:
+    """Register a zlib preset dictionary and return its wire id.
+
+    @param data dictionary bytes, e.g. from build_zdict()
+    @param dict_id explicit id (1-65535); derived from the content when omitted
+    """
+    data = bytes(data)
+    if not data or len(data) > MAX_ZDICT_SIZE:
+        raise ValueError(f"zdict must be 1..{MAX_ZDICT_SIZE} bytes")
+    dict_id = zdict_id(data) if dict_id is None else int(dict_id)
+    if not 0 < dict_id <= 0xFFFF:
+        raise ValueError("zdict id must be in 1..65535")
+    with _zdicts_lock:
+        existing = _zdicts.get(dict_id)
+        if existing is not None and existing != data:
+            raise ValueError(f"zdict id {dict_id} already registered with different content")
+        _zdicts[dict_id] = data
+    return dict_id
+
+
+def get_zdict(dict_id) -> bytes:
+    """Return the registered dictionary for `dict_id`; raise KeyError if unknown."""
+    with _zdicts_lock:
+        return _zdicts[dict_id]
+
+
+def build_zdict(samples, size=DEFAULT_ZDICT_SIZE) -> bytes:
+    """Build a zlib preset dictionary from sample messages.
+
+    Samples may be bytes or JSON-serializable objects. Keys, repeated string values
+    and punctuation runs are ranked by how many samples contain them times their
+    length; the best ones are packed last since zlib reaches the end of the
+    dictionary with the shortest distances.
+
+    @param samples iterable of captured messages
+    @param size maximum dictionary size in bytes (at most 32 KiB)
+    """
+    size = min(int(size), MAX_ZDICT_SIZE)
+    counts = Counter()
+    total = 0
+    for sample in samples:
+        if not isinstance(sample, (bytes, bytearray, memoryview)):
+            sample = json.dumps(sample, ensure_ascii=False).encode("utf-8")
+        counts.update(set(_ZDICT_TOKEN_RE.findall(bytes(sample))))
+        total += 1
+    if not total:
+        raise ValueError("build_zdict needs at least one sample")
+    min_count = 2 if total > 1 else 1
+    ranked = sorted(
+        (tok for tok, count in counts.items() if count >= min_count and len(tok) > 1),
+        key=lambda tok: counts[tok] * len(tok),
+        reverse=True,
+    )
+    picked = []
+    used = 0
+    for tok in ranked:
+        if used + len(tok) > size:
+            continue
+        picked.append(tok)
+        used += len(tok)
+    picked.reverse()
+    return b"".join(picked)
+
+
+def compress(comp_id, data, level=None, zdict=None) -> bytes:
+    """Compress `data` with the compressor identified by `comp_id`.
+
+    @param zdict optional preset dictionary bytes (zlib only)
+    """
+    if comp_id == COMPRESSION_ZLIB:
+        level = -1 if level is None else level
+        if zdict is None:
+            return zlib.compress(data, level)
+        compressor = zlib.compressobj(level, zdict=zdict)
+        return compressor.compress(data) + compressor.flush()
+    if zdict is not None:
+        raise ValueError("preset dictionaries are only supported with zlib")
+    if comp_id == COMPRESSION_LZMA:
+        return lzma.compress(data, preset=level)
+    if comp_id == COMPRESSION_BZ2:
+        return bz2.compress(data, 9 if level is None else level)
+    raise ValueError(f"unknown compression id {comp_id}")
+
+
+def _bounded(decompressor, data, limit):
+    """Run an lzma/bz2 style decompressor with an output cap."""
+    out = decompressor.decompress(data, -1 if limit is None else limit + 1)
+    if limit is not None and len(out) > limit:
+        raise DecompressionLimitError(f"decompressed size exceeds {limit}")
+    if not decompressor.eof:
+        if limit is not None and not decompressor.needs_input:
+            raise DecompressionLimitError(f"decompressed size exceeds {limit}")
+        raise ValueError("truncated compressed payload")
+    return out
+
+
+def decompress(comp_id, data, limit=None, zdict=None) -> bytes:
+    """Decompress `data`, raising DecompressionLimitError past `limit` bytes.
+
+    @param limit maximum decompressed size in bytes, or None for no cap
+    @param zdict preset dictionary the payload was compressed with (zlib only)
+    """
+    if zdict is not None and comp_id != COMPRESSION_ZLIB:
+        raise ValueError("preset dictionaries are only supported with zlib")
+    try:
+        if comp_id == COMPRESSION_ZLIB:
+            decompressor = zlib.decompressobj() if zdict is None else zlib.decompressobj(zdict=zdict)
+            out = decompressor.decompress(data, 0 if limit is None else limit + 1)
+            if limit is not None and (len(out) > limit or decompressor.unconsumed_tail):
+                raise DecompressionLimitError(f"decompressed size exceeds {limit}")
+            if not decompressor.eof:
+                raise ValueError("truncated compressed payload")
+            return out
+        if comp_id == COMPRESSION_LZMA:
+            return _bounded(lzma.LZMADecompressor(), data, limit)
+        if comp_id == COMPRESSION_BZ2:
+            return _bounded(bz2.BZ2Decompressor(), data, limit)
+    except (zlib.error, lzma.LZMAError, OSError) as e:
+        raise ValueError(f"corrupt compressed payload: {e}") from e
+    raise ValueError(f"unknown compression id {comp_id}")
@@ -0,0 +1,273 @@
+""" @namespace framing
+    Sans-I/O frame encoder and decoder shared by every jsocket transport.
+
+    FrameEncoder turns a payload into its JSN1/JSN2 header; FrameDecoder takes
+    bytes in whatever pieces the transport received them and hands back
+    complete, checksummed frames, or raises a FramingError subclass naming what
+    was wrong. Neither touches a socket: JsonSocket, SelectorServerFactory and
+    the asyncio stream call into them after their own reads. Codec, compression
+    and shared memory handling stay with JsonSocket, so a Frame's payload is the
+    body exactly as it was on the wire.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+from .compression import COMPRESSION_IDS
+from .serializers import JSON_CODEC_ID
+
+FRAME_MAGIC = b"JSN1"
+FRAME_HEADER_FMT = "!4sII"
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FMT)
+# Extended frames reuse the base header and append codec id, flags and a zlib dictionary id.
+FRAME_MAGIC_EXT = b"JSN2"
+FRAME_EXT_FMT = "!BBH"
+FRAME_EXT_SIZE = struct.calcsize(FRAME_EXT_FMT)
+FRAME_EXT_HEADER_FMT = FRAME_HEADER_FMT + FRAME_EXT_FMT[1:]
+# Low bits of the JSN2 flags byte carry the compression id (see jsocket.compression).
+FLAG_COMPRESSION_MASK = 0x07
+# Bits 3-4 of the JSN2 flags byte carry the integrity mode; JSN1 frames are always crc32.
+FLAG_INTEGRITY_MASK = 0x18
+FLAG_INTEGRITY_SHIFT = 3
+# The frame body is a descriptor of a shared memory segment holding the payload (see jsocket.shm).
+FLAG_SHM = 0x20
+# Control frames carry a JSON message for jsocket itself (e.g. zdict negotiation).
+FLAG_CONTROL = 0x80
+_KNOWN_FLAGS = FLAG_COMPRESSION_MASK | FLAG_INTEGRITY_MASK | FLAG_SHM | FLAG_CONTROL
+INTEGRITY_CRC32 = 0
+INTEGRITY_ADLER32 = 1
+INTEGRITY_NONE = 2
+INTEGRITY_MODES = {"crc32": INTEGRITY_CRC32, "adler32": INTEGRITY_ADLER32, "none": INTEGRITY_NONE}
+# Checksum function per mode; each is folded over the payload chunk by chunk.
+INTEGRITY_DIGESTS = {INTEGRITY_CRC32: zlib.crc32, INTEGRITY_ADLER32: zlib.adler32, INTEGRITY_NONE: None}
+# A receiver accepts frames at least as strong as its own mode.
+_INTEGRITY_STRENGTH = {INTEGRITY_NONE: 0, INTEGRITY_ADLER32: 1, INTEGRITY_CRC32: 2}
+DEFAULT_MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+
+_BASE_HEADER = struct.Struct(FRAME_HEADER_FMT)
+_EXT = struct.Struct(FRAME_EXT_FMT)
+_EXT_HEADER = struct.Struct(FRAME_EXT_HEADER_FMT)
+_COMPRESSION_IDS = frozenset(COMPRESSION_IDS.values())
+
+
+class FramingError(RuntimeError):
+    """Raised when a message fails framing or integrity checks."""
+
+
+class BadHeaderError(FramingError):
+    """The bytes where a frame should start do not carry a frame magic."""
+
+
+class UnsupportedFrameError(FramingError):
+    """The header uses flags, a compressor or an integrity mode this side does not accept."""
+
+
+class MessageTooLargeError(FramingError):
+    """The frame (or its decompressed payload) is larger than max_message_size."""
+
+
+class ChecksumError(FramingError):
+    """The payload checksum does not match."""
+
+
+FrameHeader = namedtuple(
+    "FrameHeader", ["size", "checksum", "codec_id", "flags", "dict_id", "integrity", "header_size"]
+)
+"""A validated frame header; header_size is the number of bytes it took on the wire."""
+
+Frame = namedtuple("Frame", ["payload", "size", "codec_id", "flags", "dict_id", "integrity"])
+"""A complete frame whose checksum (if any) has been verified; payload is still encoded."""
+
+
+def integrity_mode(name) -> int:
+    """Map an integrity mode name ("crc32", "adler32" or "none") to its frame id."""
+    if name is None:
+        return INTEGRITY_CRC32
+    try:
+        return INTEGRITY_MODES[name]
+    except KeyError:
+        raise ValueError(f"unknown integrity mode {name!r}") from None
+
+
+def stronger_integrity(mode, other) -> int:
+    """Return whichever of two integrity mode ids gives the stronger check."""
+    return mode if _INTEGRITY_STRENGTH[mode] >= _INTEGRITY_STRENGTH[other] else other
+
+
+def _integrity_name(mode):
+    for name, value in INTEGRITY_MODES.items():
+        if value == mode:
+            return name
+    return str(mode)
+
+
+class FrameEncoder:
+    """Builds frame headers for already encoded payloads."""
+
+    def __init__(self, integrity="crc32"):
+        self.integrity = integrity_mode(integrity)
+
+    def checksum(self, payload) -> int:
+        """Return the checksum of `payload` for this encoder's integrity mode (0 for "none")."""
+        digest = INTEGRITY_DIGESTS[self.integrity]
+        return digest(payload) & 0xFFFFFFFF if digest else 0
+
+    def encode_header(self, payload, codec_id=JSON_CODEC_ID, flags=0, dict_id=0) -> bytes:
+        """Return the header for `payload`.
+
+        The integrity mode is added to `flags`; plain JSON crc32 frames with no
+        other flags use the shorter JSN1 header, everything else JSN2.
+        """
+        flags |= self.integrity << FLAG_INTEGRITY_SHIFT
+        checksum = self.checksum(payload)
+        if codec_id == JSON_CODEC_ID and not flags:
+            return _BASE_HEADER.pack(FRAME_MAGIC, len(payload), checksum)
+        return _EXT_HEADER.pack(FRAME_MAGIC_EXT, len(payload), checksum, codec_id, flags, dict_id)
+
+    def encode(self, payload, codec_id=JSON_CODEC_ID, flags=0, dict_id=0):
+        """Return (header, payload), ready for a gathered write."""
+        return self.encode_header(payload, codec_id, flags, dict_id), payload
+
+
+class FrameDecoder:
+    """Incremental frame parser: feed it received bytes, get back complete frames.
+
+    Bytes are appended to one internal buffer that is compacted at most once per
+    feed, and headers are unpacked in place, so a burst of small frames costs a
+    single copy per payload. Any FramingError leaves the stream unusable; the
+    caller is expected to drop the connection.
+    """
+
+    def __init__(self, max_message_size=DEFAULT_MAX_MESSAGE_SIZE, integrity="crc32"):
+        """@param max_message_size largest frame body accepted (None disables the limit)
+        @param integrity the weakest integrity mode accepted; each frame is verified with
+                         the mode it declares, and "none" skips verification
+        """
+        self.max_message_size = max_message_size
+        self.integrity = integrity_mode(integrity)
+        self._buf = bytearray()
+        self._pos = 0
+        self._header = None
+
+    def feed(self, data) -> list:
+        """Buffer `data` and return every frame it completes (possibly none)."""
+        self.append(data)
+        frames = []
+        frame = self.next_frame()
+        while frame is not None:
+            frames.append(frame)
+            frame = self.next_frame()
+        return frames
+
+    def append(self, data):
+        """Buffer `data` without parsing it; frames are then taken with next_frame()."""
+        buf = self._buf
+        if self._pos:
+            del buf[:self._pos]
+            self._pos = 0
+        buf += data
+
+    def next_frame(self):
+        """Return the next complete Frame, or None until more bytes are appended."""
+        buf = self._buf
+        header = self._header
+        if header is None:
+            header = self.parse_header(buf, self._pos)
+            if header is None:
+                return None
+            self._header = header
+            self._pos += header.header_size
+        start = self._pos
+        end = start + header.size
+        if len(buf) < end:
+            return None
+        payload = memoryview(buf)[start:end].tobytes()
+        self._pos = end
+        self._header = None
+        self.check(header, payload)
+        return Frame(payload, header.size, header.codec_id, header.flags, header.dict_id, header.integrity)
+
+    def parse_header(self, data, offset=0):
+        """Validate the header at data[offset:]; return a FrameHeader, or None if it is incomplete.
+
+        @raises BadHeaderError, UnsupportedFrameError or MessageTooLargeError
+        """
+        available = len(data) - offset
+        if available < FRAME_HEADER_SIZE:
+            return None
+        magic, size, checksum = _BASE_HEADER.unpack_from(data, offset)
+        if magic == FRAME_MAGIC:
+            codec_id, flags, dict_id, header_size = JSON_CODEC_ID, 0, 0, FRAME_HEADER_SIZE
+        elif magic == FRAME_MAGIC_EXT:
+            header_size = FRAME_HEADER_SIZE + FRAME_EXT_SIZE
+            if available < header_size:
+                return None
+            codec_id, flags, dict_id = _EXT.unpack_from(data, offset + FRAME_HEADER_SIZE)
+        else:
+            raise BadHeaderError("invalid message header magic")
+        mode = (flags & FLAG_INTEGRITY_MASK) >> FLAG_INTEGRITY_SHIFT
+        comp_id = flags & FLAG_COMPRESSION_MASK
+        if (flags & ~_KNOWN_FLAGS) or (comp_id and comp_id not in _COMPRESSION_IDS) or mode not in INTEGRITY_DIGESTS:
+            raise UnsupportedFrameError(f"unsupported frame flags {flags:#04x}")
+        self.digest_for(mode)  # rejects modes weaker than ours before the body is read
+        if self.max_message_size is not None and size > self.max_message_size:
+            raise MessageTooLargeError(f"message length {size} exceeds max_message_size {self.max_message_size}")
+        return FrameHeader(size, checksum, codec_id, flags, dict_id, mode, header_size)
+
+    def digest_for(self, mode):
+        """Return the checksum function for a frame sent with integrity `mode`, or None to skip it.
+
+        @raises UnsupportedFrameError if `mode` is weaker than this decoder's own
+        """
+        if _INTEGRITY_STRENGTH[mode] < _INTEGRITY_STRENGTH[self.integrity]:
+            raise UnsupportedFrameError(
+                f"integrity {_integrity_name(mode)} is weaker than the {_integrity_name(self.integrity)} required"
+            )
+        # Trusted transports (integrity "none") skip checksumming even if the peer sent one.
+        if self.integrity == INTEGRITY_NONE:
+            return None
+        return INTEGRITY_DIGESTS[mode]
+
+    def check(self, header, payload):
+        """Checksum a whole frame body with the mode its header declares and verify it.
+
+        @raises ChecksumError on a mismatch
+        """
+        digest = self.digest_for(header.integrity)
+        if digest is not None:
+            self.verify(header, digest(payload) & 0xFFFFFFFF)
+
+    @staticmethod
+    def verify(header, actual):
+        """Raise ChecksumError unless `actual` (None when skipped) matches the header's checksum."""
+        if actual is not None and actual != header.checksum:
+            raise ChecksumError("message checksum mismatch")
+
+    def reset(self):
+        """Drop buffered bytes and any half-read frame, e.g. when a connection is reused."""
+        self._buf.clear()
+        self._pos = 0
+        self._header = None
+
+    @property
+    def buffered(self) -> int:
+        """Number of received bytes not yet returned as part of a frame (headers included)."""
+        return len(self._buf) - self._pos + (self._header.header_size if self._header else 0)
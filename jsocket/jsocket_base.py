@@ -19,25 +19,293 @@ __copyright__= """
     See the License for the specific language governing permissions and
     limitations under the License.
 """
-import json
+import collections
+import ipaddress
+import itertools
+import os
+import random
 import socket
+import stat
 import struct
 import logging
 import time
-import zlib
 
+from . import shm
 from ._version import __version__
+from .serializers import JSON_CODEC_ID, available_codecs, get_codec
+from .compression import (
+    COMPRESSION_IDS,
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    DEFAULT_COMPRESSION_THRESHOLD,
+    DecompressionLimitError,
+    compress,
+    compression_id,
+    decompress,
+    get_zdict,
+    register_zdict,
+)
+from .framing import (
+    DEFAULT_MAX_MESSAGE_SIZE,
+    FLAG_COMPRESSION_MASK,
+    FLAG_CONTROL,
+    FLAG_INTEGRITY_MASK,
+    FLAG_INTEGRITY_SHIFT,
+    FLAG_SHM,
+    FRAME_EXT_FMT,
+    FRAME_EXT_HEADER_FMT,
+    FRAME_EXT_SIZE,
+    FRAME_HEADER_FMT,
+    FRAME_HEADER_SIZE,
+    FRAME_MAGIC,
+    FRAME_MAGIC_EXT,
+    INTEGRITY_ADLER32,
+    INTEGRITY_CRC32,
+    INTEGRITY_DIGESTS,
+    INTEGRITY_MODES,
+    INTEGRITY_NONE,
+    BadHeaderError,
+    ChecksumError,
+    Frame,
+    FrameDecoder,
+    FrameEncoder,
+    FrameHeader,
+    FramingError,
+    MessageTooLargeError,
+    UnsupportedFrameError,
+    _integrity_name,
+    integrity_mode,
+    stronger_integrity,
+)
 
 logger = logging.getLogger("jsocket")
 
-FRAME_MAGIC = b"JSN1"
-FRAME_HEADER_FMT = "!4sII"
-FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FMT)
-DEFAULT_MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+RECV_BUFFER_SIZE = 64 * 1024
+DEFAULT_PIPELINE_DEPTH = 32
+# listen() backlog; a small queue makes the kernel drop SYNs during connection bursts.
+DEFAULT_BACKLOG = 128
 
+# Socket option names accepted in socket_options, mapped to (level, optname) attribute names.
+SOCKET_OPTION_NAMES = {
+    "tcp_nodelay": ("IPPROTO_TCP", "TCP_NODELAY"),
+    "quickack": ("IPPROTO_TCP", "TCP_QUICKACK"),
+    "sndbuf": ("SOL_SOCKET", "SO_SNDBUF"),
+    "rcvbuf": ("SOL_SOCKET", "SO_RCVBUF"),
+    "keepalive": ("SOL_SOCKET", "SO_KEEPALIVE"),
+    "keepidle": ("IPPROTO_TCP", "TCP_KEEPIDLE"),
+    "keepintvl": ("IPPROTO_TCP", "TCP_KEEPINTVL"),
+    "keepcnt": ("IPPROTO_TCP", "TCP_KEEPCNT"),
+}
 
-class FramingError(RuntimeError):
-    """Raised when a message fails framing or integrity checks."""
+SOCKET_PROFILES = {
+    "default": {},
+    # TCP_QUICKACK is left out: Linux clears it after the next ACK, so set once it does nothing.
+    "low_latency": {"tcp_nodelay": True},
+    "bulk_throughput": {"sndbuf": 4 * 1024 * 1024, "rcvbuf": 4 * 1024 * 1024},
+    "keepalive": {"keepalive": True, "keepidle": 60, "keepintvl": 10, "keepcnt": 5},
+}
+
+
+def resolve_socket_options(spec) -> dict:
+    """Resolve a profile name or option dict into a validated option dict.
+
+    @param spec None, a SOCKET_PROFILES name, or a dict of option values. A dict may
+                carry a "profile" key to start from a named profile and override it.
+    @retval dict of option name to value
+    """
+    if spec is None:
+        return {}
+    if isinstance(spec, str):
+        spec = {"profile": spec}
+    options = dict(spec)
+    profile = options.pop("profile", None)
+    resolved = {}
+    if profile is not None:
+        if profile not in SOCKET_PROFILES:
+            raise ValueError(f"unknown socket profile {profile!r}")
+        resolved.update(SOCKET_PROFILES[profile])
+    resolved.update(options)
+    for name in resolved:
+        if name not in SOCKET_OPTION_NAMES:
+            raise ValueError(f"unknown socket option {name!r}")
+    return resolved
+
+
+def _socket_option_key(name):
+    level_name, opt_name = SOCKET_OPTION_NAMES[name]
+    level = getattr(socket, level_name, None)
+    optname = getattr(socket, opt_name, None)
+    if level is None or optname is None:
+        return None
+    return level, optname
+
+
+def apply_socket_options(sock, options) -> dict:
+    """Apply resolved socket options to `sock`, skipping ones the platform lacks.
+
+    @retval dict of the options that were applied
+    """
+    applied = {}
+    for name, value in (options or {}).items():
+        key = _socket_option_key(name)
+        if key is None:
+            logger.debug("socket option %s not supported on this platform", name)
+            continue
+        try:
+            sock.setsockopt(key[0], key[1], int(value))
+        except OSError as e:
+            logger.debug("failed to set socket option %s=%s: %s", name, value, e)
+            continue
+        applied[name] = value
+    return applied
+
+
+def read_socket_options(sock) -> dict:
+    """Read the kernel's current values for the known socket options on `sock`."""
+    values = {}
+    for name in SOCKET_OPTION_NAMES:
+        key = _socket_option_key(name)
+        if key is None:
+            continue
+        try:
+            values[name] = sock.getsockopt(key[0], key[1])
+        except OSError:
+            continue
+    return values
+
+
+def enable_reuse_port(sock):
+    """Set SO_REUSEPORT on `sock`; raises OSError where the platform lacks it."""
+    option = getattr(socket, "SO_REUSEPORT", None)
+    if option is None:
+        raise OSError("SO_REUSEPORT is not supported on this platform")
+    sock.setsockopt(socket.SOL_SOCKET, option, 1)
+
+
+def resolve_endpoint(address, port):
+    """Return (family, sockaddr) for an endpoint.
+
+    A port of None makes `address` a Unix domain socket path; a leading "@" (or NUL)
+    puts the name in the Linux abstract namespace, which needs no file on disk.
+    """
+    if port is None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not supported on this platform")
+        path = os.fspath(address)
+        if isinstance(path, str) and path.startswith("@"):
+            path = "\0" + path[1:]
+        return socket.AF_UNIX, path
+    return socket.AF_INET, (address, port)
+
+
+def _unix_socket_path(sock):
+    """Return the filesystem path `sock` is bound to, or None (TCP, abstract or closed)."""
+    if sock is None or getattr(sock, "family", None) != getattr(socket, "AF_UNIX", None):
+        return None
+    try:
+        path = sock.getsockname()
+    except OSError:
+        return None
+    # Abstract names come back as bytes starting with NUL; unbound sockets as "".
+    if isinstance(path, str) and path and not path.startswith("\0"):
+        return path
+    return None
+
+
+def _remove_stale_unix_socket(path):
+    """Unlink a socket file left behind by a dead server; refuse if one still listens there."""
+    if not isinstance(path, str) or path.startswith("\0"):
+        return
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return
+    except OSError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return
+    finally:
+        probe.close()
+    raise OSError(f"Unix socket {path!r} is already in use")
+
+
+def bind_endpoint(sock, address, port, reuse_port=False):
+    """Bind `sock` to (address, port), or to the Unix socket path `address` when port is None."""
+    family, sockaddr = resolve_endpoint(address, port)
+    if family == socket.AF_INET:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    else:
+        _remove_stale_unix_socket(sockaddr)
+    if reuse_port:
+        enable_reuse_port(sock)
+    sock.bind(sockaddr)
+
+
+def create_listener(address, port, reuse_port=False):
+    """Create a socket bound to (address, port) or a Unix path; the caller calls listen() on it."""
+    sock = socket.socket(resolve_endpoint(address, port)[0], socket.SOCK_STREAM)
+    try:
+        bind_endpoint(sock, address, port, reuse_port=reuse_port)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def close_listener(sock):
+    """Close a listening socket, removing its Unix socket file if it has one."""
+    path = _unix_socket_path(sock)
+    try:
+        sock.close()
+    except OSError:
+        pass
+    if path is not None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def peer_credentials(sock):
+    """Return (pid, uid, gid) of the process at the other end of a Unix socket, or None.
+
+    Uses SO_PEERCRED, which only Linux provides.
+    """
+    option = getattr(socket, "SO_PEERCRED", None)
+    if option is None or sock is None:
+        return None
+    try:
+        raw = sock.getsockopt(socket.SOL_SOCKET, option, struct.calcsize("3i"))
+    except (OSError, AttributeError, TypeError):
+        return None
+    if len(raw) < struct.calcsize("3i"):
+        return None
+    return struct.unpack("3i", raw[:struct.calcsize("3i")])
+
+
+def accept_queue_info(sock):
+    """Return (queued, backlog) for a listening TCP socket, or None if unavailable.
+
+    Reads TCP_INFO, where Linux reports the accept queue length and its limit
+    for listeners in tcpi_unacked and tcpi_sacked.
+    """
+    option = getattr(socket, "TCP_INFO", None)
+    if option is None or sock is None:
+        return None
+    try:
+        raw = sock.getsockopt(socket.IPPROTO_TCP, option, 32)
+    except (OSError, AttributeError):
+        return None
+    if len(raw) < 32:
+        return None
+    fields = struct.unpack("8B6I", raw[:32])
+    return fields[12], fields[13]
 
 
 def _socket_fileno(sock):
@@ -47,6 +315,68 @@ def _socket_fileno(sock):
         return None
 
 
+class RetryPolicy:
+    """How JsonClient.connect retries: exponential backoff with full jitter and an overall deadline.
+
+    Retry n sleeps min(max_delay, initial_delay * multiplier ** (n - 1)) seconds, or
+    with jitter a random time between 0 and that, so clients cut off by the same
+    server restart do not all come back at the same moment.
+    """
+
+    def __init__(self, attempts=10, initial_delay=0.1, multiplier=2.0, max_delay=3.0, jitter=True, deadline=None):
+        """@param attempts connection attempts before giving up (1 means no retries)
+        @param deadline seconds after which connect gives up, including the attempts
+                        themselves (None for no limit)
+        """
+        if int(attempts) < 1:
+            raise ValueError("attempts must be at least 1")
+        if initial_delay < 0 or max_delay < 0 or multiplier < 1:
+            raise ValueError("delays must not be negative and multiplier must be at least 1")
+        self.attempts = int(attempts)
+        self.initial_delay = float(initial_delay)
+        self.multiplier = float(multiplier)
+        self.max_delay = float(max_delay)
+        self.jitter = bool(jitter)
+        self.deadline = deadline
+
+    def backoff(self, retry) -> float:
+        """Upper bound of the sleep before retry number `retry` (1 for the first retry)."""
+        try:
+            return min(self.max_delay, self.initial_delay * self.multiplier ** (retry - 1))
+        except OverflowError:
+            return self.max_delay
+
+    def delay(self, retry) -> float:
+        """Seconds to sleep before retry number `retry`."""
+        ceiling = self.backoff(retry)
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(attempts={self.attempts}, initial_delay={self.initial_delay}, "
+            f"multiplier={self.multiplier}, max_delay={self.max_delay}, jitter={self.jitter}, "
+            f"deadline={self.deadline})"
+        )
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def _clip_to_deadline(delay, remaining, connect_timeout):
+    """Fit a retry sleep into the `remaining` seconds before a connect deadline.
+
+    @retval (delay, final): a backoff that would pass the deadline is cut short so
+            one last attempt still gets half of the time left (at most
+            connect_timeout of it); delay is None when no time is left at all
+    """
+    if remaining <= 0:
+        return None, True
+    if delay < remaining:
+        return delay, False
+    window = remaining / 2 if connect_timeout is None else min(connect_timeout, remaining / 2)
+    return remaining - window, True
+
+
 class JsonSocket:
     """Lightweight JSON-over-TCP socket wrapper with length-prefixed framing."""
 
@@ -59,7 +389,19 @@ class JsonSocket:
         accept_timeout=None,
         recv_timeout=None,
         create_socket=True,
+        socket_options=None,
+        codec=None,
+        compression=None,
+        compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+        compression_level=None,
+        zdicts=None,
+        integrity="crc32",
+        shared_memory_threshold=None,
     ):
+        """@param shared_memory_threshold payloads of at least this many bytes go through a
+                  shared memory segment when the peer is on the same host and agrees
+                  (None disables it)
+        """
         self.socket = None
         self.conn = None
         self._timeout = timeout
@@ -74,24 +416,211 @@ class JsonSocket:
         self._is_listening = False
         self._last_read_size = None
         self._last_send_size = None
+        self._recv_pending = bytearray()
+        self._recv_scratch = None
+        self._socket_options = resolve_socket_options(socket_options)
+        self._codec = None
+        self.codec = codec
+        self._last_read_codec = JSON_CODEC_ID
+        self._peer_codecs = None
+        self._last_read_flags = 0
+        self._compression = COMPRESSION_NONE
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self._zdicts = tuple(
+            register_zdict(zd) if isinstance(zd, (bytes, bytearray, memoryview)) else int(zd)
+            for zd in (zdicts or ())
+        )
+        self._zdict_id = None
+        self._last_read_zdict = 0
+        self._integrity = INTEGRITY_CRC32
+        self.integrity = integrity
+        self._last_read_integrity = INTEGRITY_CRC32
+        self._peer_integrity = None
+        self._shm_threshold = None
+        if shared_memory_threshold is not None:
+            if not shm.available():
+                raise ValueError("shared memory is not available on this platform")
+            self._shm_threshold = max(1, int(shared_memory_threshold))
+        self._shm_active = False
+        self._shm_pool = None
+        self._shm_reader = None
+        self._shm_released = collections.deque()
         if create_socket:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket = socket.socket(resolve_endpoint(address, port)[0], socket.SOCK_STREAM)
             self.conn = self.socket
+            self._apply_socket_options(self.socket)
             # Primary socket timeout (accept for servers; connect/read for clients).
             self.socket.settimeout(self._accept_timeout)
 
     def send_obj(self, obj):
         """Send a JSON-serializable object over the connection."""
-        msg = json.dumps(obj, ensure_ascii=False)
         if self.socket:
-            payload = msg.encode('utf-8')
-            self._last_send_size = len(payload)
-            if self._max_message_size is not None and len(payload) > self._max_message_size:
-                raise ValueError(f"message exceeds max_message_size ({len(payload)} > {self._max_message_size})")
-            checksum = zlib.crc32(payload) & 0xFFFFFFFF
-            packed_hdr = struct.pack(FRAME_HEADER_FMT, FRAME_MAGIC, len(payload), checksum)
-            self._send(packed_hdr)
-            self._send(payload)
+            self._send_parts(self._encode_frame(obj))
+
+    def send_many(self, objs, codec=None) -> list:
+        """Send several JSON-serializable objects back to back in a single write.
+
+        Each object is encoded as an ordinary frame, so peers read them with read_obj
+        as usual; the frames are packed into one buffer and flushed together. Every
+        object is encoded before anything is sent, so an encoding error sends nothing.
+        @param objs iterable of objects
+        @param codec name, id or Codec to encode with; defaults to _send_codec()
+        @retval list of per-object payload sizes on the wire (as _last_send_size for send_obj)
+        """
+        if not self.socket:
+            return []
+        buf = bytearray()
+        sizes = []
+        for obj in objs:
+            header, payload = self._encode_frame(obj, codec=codec)
+            buf += header
+            buf += payload
+            sizes.append(self._last_send_size)
+        if buf:
+            self._send_parts((buf,))
+        return sizes
+
+    def send_raw(self, payload, codec=None):
+        """Frame and send a payload that is already encoded, without re-serializing it.
+
+        Compression, integrity and shared memory apply as for send_obj.
+        @param payload bytes-like document produced by `codec`
+        @param codec name or id of the codec that produced `payload`; defaults to the
+                     codec send_obj would use (for forwarding, pass read_codec of the source)
+        """
+        if self.socket:
+            codec_id = self._send_codec().codec_id if codec is None else get_codec(codec).codec_id
+            self._send_parts(self._frame_payload(payload, codec_id))
+
+    def _send_codec(self):
+        """Return the codec for outgoing frames.
+
+        An explicitly configured codec is used once the peer's codec offer or accept
+        lists it. Until then, and when no codec is configured, frames mirror the codec of
+        the last frame read, so a peer that speaks JSON only ever receives JSN1 frames.
+        """
+        name = getattr(self, "_codec", None)
+        peer = getattr(self, "_peer_codecs", None)
+        if name is not None and peer is not None:
+            codec = get_codec(name)
+            return codec if codec.codec_id in peer else get_codec(JSON_CODEC_ID)
+        try:
+            return get_codec(getattr(self, "_last_read_codec", JSON_CODEC_ID))
+        except KeyError:
+            return get_codec(JSON_CODEC_ID)
+
+    def _encode_frame(self, obj, control=False, codec=None):
+        """Serialize `obj` and build its frame; return (header, payload).
+
+        Control frames are always plain JSON and never compressed.
+        @param codec codec to use instead of _send_codec(), for callers on other threads
+        """
+        if control:
+            codec = get_codec(JSON_CODEC_ID)
+        else:
+            codec = self._send_codec() if codec is None else get_codec(codec)
+        return self._frame_payload(codec.encode(obj), codec.codec_id, control)
+
+    def _frame_payload(self, payload, codec_id, control=False):
+        """Compress and frame an encoded payload; return (header, payload)."""
+        self._last_send_size = len(payload)
+        if self._max_message_size is not None and len(payload) > self._max_message_size:
+            raise ValueError(f"message exceeds max_message_size ({len(payload)} > {self._max_message_size})")
+        flags = FLAG_CONTROL if control else 0
+        dict_id = 0
+        comp_id = COMPRESSION_NONE if control else getattr(self, "_compression", COMPRESSION_NONE)
+        if comp_id != COMPRESSION_NONE and len(payload) >= getattr(self, "compression_threshold", 0):
+            zdict = None
+            if comp_id == COMPRESSION_ZLIB and getattr(self, "_zdict_id", None):
+                dict_id = self._zdict_id
+                zdict = get_zdict(dict_id)
+            compressed = compress(comp_id, payload, getattr(self, "compression_level", None), zdict)
+            # Only pay the receiver's decompression cost when it actually saves bytes.
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= comp_id
+            else:
+                dict_id = 0
+        self._last_send_size = len(payload)
+        encoder = self._frame_encoder(control)
+        if not control and getattr(self, "_shm_active", False) and len(payload) >= self._shm_threshold:
+            if self._shm_pool is None:
+                self._shm_pool = shm.SegmentPool()
+            try:
+                name, pooled = self._shm_pool.write(payload)
+            except OSError as e:
+                # e.g. /dev/shm is full; the socket path still works.
+                logger.debug("shared memory write failed, sending inline: %s", e)
+            else:
+                payload = shm.pack_descriptor(name, len(payload), encoder.integrity, encoder.checksum(payload), pooled)
+                flags |= FLAG_SHM
+        return encoder.encode(payload, codec_id, flags, dict_id)
+
+    def _frame_encoder(self, control=False):
+        """Return this socket's FrameEncoder, set to the integrity mode for the next frame.
+
+        Control frames always use crc32 so that a receiver in any mode accepts them.
+        """
+        encoder = getattr(self, "_encoder", None)
+        if encoder is None:
+            encoder = self._encoder = FrameEncoder()
+        encoder.integrity = INTEGRITY_CRC32 if control else self._send_integrity()
+        return encoder
+
+    def _send_integrity(self) -> int:
+        """Return the integrity mode for outgoing data frames.
+
+        This is the stronger of our own mode and the one the peer's integrity offer
+        or accept named. A peer that made no offer may require crc32, so it gets crc32.
+        """
+        peer = getattr(self, "_peer_integrity", None)
+        return stronger_integrity(
+            getattr(self, "_integrity", INTEGRITY_CRC32), INTEGRITY_CRC32 if peer is None else peer
+        )
+
+    def _frame_decoder(self):
+        """Return this connection's FrameDecoder, following max_message_size and the integrity mode."""
+        decoder = getattr(self, "_decoder", None)
+        if decoder is None:
+            decoder = self._decoder = FrameDecoder()
+        decoder.max_message_size = getattr(self, "_max_message_size", None)
+        decoder.integrity = getattr(self, "_integrity", INTEGRITY_CRC32)
+        return decoder
+
+    def _send_parts(self, parts):
+        """Send a sequence of buffers as one gathered write.
+
+        Uses sendmsg so the header and payload leave in a single syscall without
+        being joined first; falls back to a joined _send where sendmsg is missing.
+        Pending shared memory releases for the peer go out in the same write.
+        """
+        release = self._take_shm_releases()
+        if release:
+            parts = (*release, *parts)
+        sendmsg = getattr(self.conn, "sendmsg", None)
+        if sendmsg is None:
+            self._send(b"".join(parts))
+            return
+        views = [memoryview(part) for part in parts if len(part)]
+        while views:
+            try:
+                sent = sendmsg(views)
+            except OSError as e:
+                self._close_connection()
+                raise RuntimeError("socket connection broken") from e
+            if sent == 0:
+                self._close_connection()
+                raise RuntimeError("socket connection broken")
+            while sent:
+                head = views[0]
+                if sent >= len(head):
+                    sent -= len(head)
+                    views.pop(0)
+                else:
+                    views[0] = head[sent:]
+                    sent = 0
 
     def _send(self, msg):
         """Send all bytes in `msg` to the peer."""
@@ -107,54 +636,424 @@ class JsonSocket:
                 raise RuntimeError("socket connection broken")
             sent += chunk
 
+    def _reset_connection_state(self):
+        """Drop read-ahead bytes and negotiated options from a previous connection."""
+        pending = getattr(self, "_recv_pending", None)
+        if pending:
+            pending.clear()
+        decoder = getattr(self, "_decoder", None)
+        if decoder is not None:
+            decoder.reset()
+        self._zdict_id = None
+        self._peer_codecs = None
+        self._peer_integrity = None
+        self._shm_active = False
+        self._close_shm()
+
+    def _close_shm(self):
+        """Give up our segments (ones the peer has not read linger) and unmap the peer's segments."""
+        pool = getattr(self, "_shm_pool", None)
+        if pool is not None:
+            self._shm_pool = None
+            pool.close()
+        reader = getattr(self, "_shm_reader", None)
+        if reader is not None:
+            self._shm_reader = None
+            reader.close()
+        released = getattr(self, "_shm_released", None)
+        if released:
+            released.clear()
+
+    def _recv_chunk(self, view, allow_timeout, have_data):
+        """recv_into `view` once, mapping timeouts/EOF onto framing errors."""
+        try:
+            nbytes = self.conn.recv_into(view)
+        except socket.timeout:
+            if allow_timeout and not have_data:
+                raise
+            self._close_connection()
+            raise FramingError("socket read timeout during message")
+        if nbytes == 0:
+            self._close_connection()
+            raise RuntimeError("socket connection broken")
+        return nbytes
+
     def _read(self, size, allow_timeout=False):
         """Read exactly `size` bytes from the peer or raise on disconnect."""
-        data = b''
-        while len(data) < size:
-            try:
-                data_tmp = self.conn.recv(size - len(data))
-            except socket.timeout:
-                if allow_timeout and not data:
-                    raise
-                self._close_connection()
-                raise FramingError("socket read timeout during message")
-            if data_tmp == b'':
-                self._close_connection()
-                raise RuntimeError("socket connection broken")
-            data += data_tmp
-        return data
+        return self._read_exact(size, allow_timeout)[0]
+
+    def _read_payload(self, size, digest=None):
+        """Read a frame body of `size` bytes; return (data, checksum).
+
+        @param digest zlib.crc32 or zlib.adler32 to fold over each chunk as it is
+                      received, or None to skip checksumming (checksum is then None)
+        """
+        return self._read_exact(size, False, digest)
+
+    def _read_exact(self, size, allow_timeout=False, digest=None):
+        """Read exactly `size` bytes, optionally checksumming them on the way in.
+
+        Bytes are served from a per-connection read-ahead buffer first. Short reads
+        are refilled with recv_into on a reusable scratch buffer so a single recv
+        can pick up the header, the body and following frames; large remainders
+        are received straight into the result to avoid an extra copy. The checksum
+        is updated per chunk while it is still in cache instead of in a second pass.
+        """
+        pending = getattr(self, "_recv_pending", None)
+        if pending is None:
+            pending = self._recv_pending = bytearray()
+        if len(pending) >= size:
+            data = pending[:size]
+            del pending[:size]
+            return data, (digest(data) & 0xFFFFFFFF if digest else None)
+        data = bytearray(size)
+        view = memoryview(data)
+        filled = len(pending)
+        view[:filled] = pending
+        value = None
+        if digest:
+            value = digest(pending)
+        pending.clear()
+        scratch = getattr(self, "_recv_scratch", None)
+        while filled < size:
+            remaining = size - filled
+            if remaining >= RECV_BUFFER_SIZE:
+                nbytes = self._recv_chunk(view[filled:], allow_timeout, filled > 0)
+            else:
+                if scratch is None:
+                    scratch = self._recv_scratch = bytearray(RECV_BUFFER_SIZE)
+                received = self._recv_chunk(scratch, allow_timeout, filled > 0)
+                nbytes = min(received, remaining)
+                view[filled:filled + nbytes] = scratch[:nbytes]
+                if received > nbytes:
+                    pending += scratch[nbytes:received]
+            if digest:
+                value = digest(view[filled:filled + nbytes], value)
+            filled += nbytes
+        view.release()
+        return data, (value & 0xFFFFFFFF if digest else None)
 
     def _read_header(self):
         """Read and unpack the framing header."""
         header = self._read(FRAME_HEADER_SIZE, allow_timeout=True)
-        magic, size, checksum = struct.unpack(FRAME_HEADER_FMT, header)
-        if magic != FRAME_MAGIC:
+        ext = self._read(FRAME_EXT_SIZE) if header[:4] == FRAME_MAGIC_EXT else None
+        return self._check_header(header, ext)
+
+    def _check_header(self, header, ext=None):
+        """Unpack and validate a frame header; return (size, checksum).
+
+        @param header the FRAME_HEADER_SIZE base header bytes
+        @param ext the FRAME_EXT_SIZE extension bytes for JSN2 frames, else None
+        """
+        try:
+            parsed = self._frame_decoder().parse_header(header if ext is None else bytes(header) + bytes(ext))
+        except FramingError:
+            self._close_connection()
+            raise
+        if parsed is None:
             self._close_connection()
-            raise FramingError("invalid message header magic")
-        if self._max_message_size is not None and size > self._max_message_size:
+            raise BadHeaderError("truncated message header")
+        self._accept_header(parsed)
+        return parsed.size, parsed.checksum
+
+    def _accept_header(self, header):
+        """Record a FrameHeader (or Frame) as the frame being read and apply connection policy.
+
+        FrameDecoder checks the framing itself; this rejects codecs and zlib
+        dictionaries we do not have and shared memory that was not negotiated.
+        """
+        codec_id, flags, dict_id = header.codec_id, header.flags, header.dict_id
+        self._last_read_codec = codec_id
+        self._last_read_flags = flags
+        self._last_read_zdict = dict_id
+        self._last_read_integrity = header.integrity
+        try:
+            get_codec(codec_id)
+        except KeyError:
+            self._close_connection()
+            raise UnsupportedFrameError(f"unsupported payload codec id {codec_id}") from None
+        if flags & FLAG_SHM and not getattr(self, "_shm_active", False):
+            # Only peers that agreed to shared memory may name segments for us to map.
             self._close_connection()
-            raise FramingError(f"message length {size} exceeds max_message_size {self._max_message_size}")
-        return size, checksum
+            raise UnsupportedFrameError("shared memory frame on a connection that did not negotiate it")
+        if dict_id:
+            try:
+                if flags & FLAG_COMPRESSION_MASK != COMPRESSION_ZLIB:
+                    raise KeyError(dict_id)
+                get_zdict(dict_id)
+            except KeyError:
+                self._close_connection()
+                raise UnsupportedFrameError(f"unknown zdict id {dict_id}") from None
 
     def read_obj(self):
-        """Read a full message and decode it as JSON, returning a Python object."""
+        """Read a full message and decode it as JSON, returning a Python object.
+
+        Control frames are handled internally and never returned.
+        """
+        while True:
+            obj, control = self._read_message()
+            if not control:
+                return obj
+            self._handle_control(obj)
+
+    def read_raw(self) -> bytes:
+        """Read a full message and return its payload without decoding it.
+
+        The checksum is verified and compression or shared memory undone, so the
+        result is the document exactly as the peer's codec produced it; read_codec
+        names that codec. Control frames are handled internally and never returned.
+        """
+        while True:
+            size, checksum = self._read_header()
+            self._last_read_size = size
+            data, actual = self._read_payload(size, self._payload_digest())
+            if not getattr(self, "_last_read_flags", 0) & FLAG_CONTROL:
+                return self._finish_raw(data, checksum, actual)
+            obj, _ = self._finish_message(data, checksum, actual)
+            self._handle_control(obj)
+
+    def _finish_raw(self, data, checksum, actual) -> bytes:
+        """Verify and decompress a frame body, leaving it encoded."""
+        self._verify_checksum(checksum, actual)
+        flags = getattr(self, "_last_read_flags", 0)
+        data = self._decompress_payload(data, flags, getattr(self, "_last_read_zdict", 0))
+        return data if isinstance(data, bytes) else bytes(data)
+
+    def _read_message(self):
+        """Read, verify and decode one frame; return (obj, is_control)."""
         size, checksum = self._read_header()
         self._last_read_size = size
-        data = self._read(size)
-        actual = zlib.crc32(data) & 0xFFFFFFFF
-        if actual != checksum:
+        data, actual = self._read_payload(size, self._payload_digest())
+        return self._finish_message(data, checksum, actual)
+
+    def _payload_digest(self):
+        """Return the checksum function for the frame just read, or None to skip it."""
+        return self._frame_decoder().digest_for(getattr(self, "_last_read_integrity", INTEGRITY_CRC32))
+
+    def _finish_message(self, data, checksum, actual):
+        """Verify, decompress and decode a frame body; return (obj, is_control).
+
+        @param actual the checksum computed over `data`, or None if it was skipped
+        """
+        self._verify_checksum(checksum, actual)
+        flags = getattr(self, "_last_read_flags", 0)
+        data = self._decompress_payload(data, flags, getattr(self, "_last_read_zdict", 0))
+        obj = self._decode_payload(data, getattr(self, "_last_read_codec", JSON_CODEC_ID))
+        return obj, bool(flags & FLAG_CONTROL)
+
+    def _verify_checksum(self, checksum, actual):
+        """Raise FramingError if a computed checksum does not match the header's."""
+        if actual is not None and actual != checksum:
+            self._close_connection()
+            raise ChecksumError("message checksum mismatch")
+
+    def _handle_control(self, msg):
+        """React to a control frame from the peer."""
+        op = msg.get("op") if isinstance(msg, dict) else None
+        if op == "codec_offer":
+            self._peer_codecs = frozenset(msg.get("ids") or ()) | {JSON_CODEC_ID}
+            reply = {"op": "codec_accept", "ids": self._decodable_codec_ids()}
+            self._send_parts(self._encode_frame(reply, control=True))
+            logger.debug("peer decodes codec ids %s", sorted(self._peer_codecs))
+        elif op == "codec_accept":
+            self._peer_codecs = frozenset(msg.get("ids") or ()) | {JSON_CODEC_ID}
+        elif op == "integrity_offer":
+            self._peer_integrity = INTEGRITY_MODES.get(msg.get("mode"))
+            reply = {"op": "integrity_accept", "mode": self.integrity}
+            self._send_parts(self._encode_frame(reply, control=True))
+            logger.debug("peer integrity %s, sending %s", msg.get("mode"), _integrity_name(self._send_integrity()))
+        elif op == "integrity_accept":
+            self._peer_integrity = INTEGRITY_MODES.get(msg.get("mode"))
+        elif op == "zdict_offer":
+            offered = msg.get("ids") or []
+            local = getattr(self, "_zdicts", ())
+            self._zdict_id = next((dict_id for dict_id in offered if dict_id in local), None)
+            self._send_parts(self._encode_frame({"op": "zdict_accept", "id": self._zdict_id}, control=True))
+            logger.debug("zdict negotiated: %s (offered %s)", self._zdict_id, offered)
+        elif op == "zdict_accept":
+            chosen = msg.get("id")
+            self._zdict_id = chosen if chosen in getattr(self, "_zdicts", ()) else None
+        elif op == "shm_offer":
+            self._shm_active = self._can_use_shm()
+            self._send_parts(self._encode_frame({"op": "shm_accept", "ok": self._shm_active}, control=True))
+            logger.debug("shared memory negotiated: %s", self._shm_active)
+        elif op == "shm_accept":
+            self._shm_active = bool(msg.get("ok")) and self._can_use_shm()
+        elif op == "shm_release":
+            pool = getattr(self, "_shm_pool", None)
+            if pool is not None:
+                pool.release(msg.get("names") or ())
+        else:
+            logger.debug("ignoring unknown control message %r", op)
+
+    def _decodable_codec_ids(self) -> list:
+        """Return the wire ids of the codecs this side can decode."""
+        return [get_codec(name).codec_id for name in available_codecs()]
+
+    def _needs_codec_offer(self) -> bool:
+        """True if a codec other than JSON is configured, so the peer must confirm it."""
+        name = getattr(self, "_codec", None)
+        return name is not None and get_codec(name).codec_id != JSON_CODEC_ID
+
+    def _negotiate_codec(self):
+        """Tell the peer which codecs we decode and learn which ones it does."""
+        self._send_parts(self._encode_frame({"op": "codec_offer", "ids": self._decodable_codec_ids()}, control=True))
+        msg, control = self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "codec_accept":
+            self._close_connection()
+            raise FramingError("unexpected reply to codec offer")
+        self._handle_control(msg)
+        codec = self._send_codec()
+        if codec.name != self._codec:
+            logger.info("peer cannot decode %s payloads, sending %s", self._codec, codec.name)
+        return codec.name
+
+    def _needs_integrity_offer(self) -> bool:
+        """True if our integrity mode is weaker than crc32, so the peer must learn it before we use it."""
+        return getattr(self, "_integrity", INTEGRITY_CRC32) != INTEGRITY_CRC32
+
+    def _negotiate_integrity(self):
+        """Tell the peer our integrity mode and learn its own; both then send the stronger one."""
+        self._send_parts(self._encode_frame({"op": "integrity_offer", "mode": self.integrity}, control=True))
+        msg, control = self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "integrity_accept":
+            self._close_connection()
+            raise FramingError("unexpected reply to integrity offer")
+        self._handle_control(msg)
+        return _integrity_name(self._send_integrity())
+
+    def _negotiate_zdict(self):
+        """Offer our dictionaries to the peer and wait for its choice."""
+        self._send_parts(self._encode_frame({"op": "zdict_offer", "ids": list(self._zdicts)}, control=True))
+        msg, control = self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "zdict_accept":
+            self._close_connection()
+            raise FramingError("unexpected reply to zdict offer")
+        self._handle_control(msg)
+        return self._zdict_id
+
+    def _negotiate_shm(self):
+        """Ask the peer whether large payloads may go through shared memory."""
+        self._send_parts(self._encode_frame({"op": "shm_offer"}, control=True))
+        msg, control = self._read_message()
+        if not control or not isinstance(msg, dict) or msg.get("op") != "shm_accept":
+            self._close_connection()
+            raise FramingError("unexpected reply to shm offer")
+        self._handle_control(msg)
+        return self._shm_active
+
+    def _can_use_shm(self) -> bool:
+        """True if shared memory is enabled here and the peer is on this host."""
+        if getattr(self, "_shm_threshold", None) is None:
+            return False
+        conn = getattr(self, "conn", None)
+        if conn is None:
+            return False
+        if getattr(conn, "family", None) == getattr(socket, "AF_UNIX", None):
+            return True
+        try:
+            return ipaddress.ip_address(conn.getpeername()[0]).is_loopback
+        except (OSError, ValueError, TypeError, IndexError):
+            return False
+
+    def _take_shm_releases(self):
+        """Return a control frame handing read pooled segments back to the peer, or ()."""
+        released = getattr(self, "_shm_released", None)
+        names = []
+        while released:
+            names.append(released.popleft())
+        if not names:
+            return ()
+        size = self._last_send_size
+        try:
+            return self._encode_frame({"op": "shm_release", "names": names}, control=True)
+        finally:
+            # Callers read _last_send_size for the frame they sent, not this one.
+            self._last_send_size = size
+
+    def _load_shm_payload(self, data):
+        """Copy out the payload a shared memory descriptor points to."""
+        try:
+            name, size, mode, checksum, pooled = shm.unpack_descriptor(data)
+        except ValueError as e:
+            self._close_connection()
+            raise FramingError("invalid shared memory descriptor") from e
+        if self._shm_reader is None:
+            self._shm_reader = shm.SegmentReader()
+        try:
+            if mode not in INTEGRITY_DIGESTS:
+                raise UnsupportedFrameError(f"unsupported integrity mode {mode} in shared memory descriptor")
+            digest = self._frame_decoder().digest_for(mode)
+        except UnsupportedFrameError:
+            self._shm_reader.discard(name, pooled)
+            self._close_connection()
+            raise
+        limit = getattr(self, "_max_message_size", None)
+        if limit is not None and size > limit:
+            self._shm_reader.discard(name, pooled)
+            self._close_connection()
+            raise MessageTooLargeError(f"message length {size} exceeds max_message_size {limit}")
+        try:
+            payload = self._shm_reader.read(name, size, pooled)
+        except (OSError, ValueError) as e:
+            self._close_connection()
+            raise FramingError(f"shared memory segment unavailable: {e}") from e
+        if pooled:
+            self._shm_released.append(name)
+        if digest is not None and digest(payload) & 0xFFFFFFFF != checksum:
+            self._close_connection()
+            raise ChecksumError("message checksum mismatch")
+        return payload
+
+    def _decompress_payload(self, data, flags, dict_id=0):
+        """Undo frame compression, enforcing max_message_size on the expanded size.
+
+        Shared memory frames are first swapped for the payload their segment holds.
+        """
+        if flags & FLAG_SHM:
+            data = self._load_shm_payload(data)
+        comp_id = flags & FLAG_COMPRESSION_MASK
+        if comp_id == COMPRESSION_NONE:
+            return data
+        limit = getattr(self, "_max_message_size", None)
+        try:
+            return decompress(comp_id, data, limit, get_zdict(dict_id) if dict_id else None)
+        except DecompressionLimitError as e:
             self._close_connection()
-            raise FramingError("message checksum mismatch")
+            raise MessageTooLargeError(f"decompressed message exceeds max_message_size {limit}") from e
+        except ValueError as e:
+            self._close_connection()
+            raise FramingError("invalid compressed payload") from e
+
+    def _decode_payload(self, data, codec_id=JSON_CODEC_ID):
+        """Decode a verified payload with the codec named in its frame header."""
+        codec = get_codec(codec_id)
         try:
-            decoded = data.decode('utf-8')
+            return codec.decode(data)
         except UnicodeDecodeError as e:
             self._close_connection()
             raise FramingError("invalid UTF-8 payload") from e
-        try:
-            return json.loads(decoded)
-        except json.JSONDecodeError as e:
+        except (ValueError, TypeError) as e:
             self._close_connection()
-            raise FramingError("invalid JSON payload") from e
+            raise FramingError(f"invalid JSON payload ({codec.name})") from e
+
+    def _apply_socket_options(self, sock):
+        """Apply the configured socket options to `sock` (no-op when none are set)."""
+        options = getattr(self, "_socket_options", None)
+        if not options or sock is None:
+            return {}
+        return apply_socket_options(sock, options)
+
+    def get_socket_options(self) -> dict:
+        """Return live values of the known socket options on the active connection.
+
+        Values come from getsockopt, so they show what the kernel applied (Linux reports
+        doubled buffer sizes, and TCP_QUICKACK is not sticky so it may read back as 0).
+        """
+        sock = getattr(self, "conn", None) or getattr(self, "socket", None)
+        if sock is None:
+            return {}
+        return read_socket_options(sock)
 
     def close(self):
         """Close active connection and the listening socket if open."""
@@ -186,6 +1085,7 @@ class JsonSocket:
     def _close_connection(self):
         """Best-effort shutdown and close of the connection socket."""
         logger.debug("closing connection socket (fd=%s)", _socket_fileno(self.conn))
+        self._reset_connection_state()
         try:
             if self.conn and self.conn.fileno() != -1:
                 try:
@@ -260,6 +1160,59 @@ class JsonSocket:
         """No-op: port is read-only after initialization."""
         return None
 
+    def _get_socket_options(self):
+        """Return a copy of the configured socket options."""
+        return dict(getattr(self, "_socket_options", None) or {})
+
+    def _get_codec(self):
+        """Get the codec name used for outgoing frames (None mirrors the peer)."""
+        return getattr(self, "_codec", None)
+
+    def _set_codec(self, codec):
+        """Set the outgoing codec by name; None mirrors the last frame read."""
+        if codec is None:
+            self._codec = None
+            return
+        try:
+            self._codec = get_codec(codec).name
+        except KeyError:
+            raise ValueError(f"codec {codec!r} is not registered (is it installed?)") from None
+
+    def _get_read_codec(self):
+        """Return the codec name of the last frame read (None if its id is not registered)."""
+        try:
+            return get_codec(getattr(self, "_last_read_codec", JSON_CODEC_ID)).name
+        except KeyError:
+            return None
+
+    def _get_compression(self):
+        """Get the outgoing compression name (None when disabled)."""
+        comp_id = getattr(self, "_compression", COMPRESSION_NONE)
+        for name, value in COMPRESSION_IDS.items():
+            if value == comp_id:
+                return name
+        return None
+
+    def _set_compression(self, name):
+        """Set the outgoing compression: None, "zlib", "lzma" or "bz2"."""
+        self._compression = compression_id(name)
+
+    def _get_integrity(self):
+        """Get the weakest integrity mode accepted; frames are sent in the stronger of it and the peer's."""
+        return _integrity_name(getattr(self, "_integrity", INTEGRITY_CRC32))
+
+    def _set_integrity(self, name):
+        """Set the integrity mode: "crc32" (default), "adler32" or "none" for trusted transports."""
+        self._integrity = integrity_mode(name)
+
+    def _get_zdict_id(self):
+        """Return the zlib dictionary id agreed with the peer (None if not negotiated)."""
+        return getattr(self, "_zdict_id", None)
+
+    def _get_shared_memory(self):
+        """Return True if large payloads on this connection go through shared memory."""
+        return getattr(self, "_shm_active", False)
+
     def _get_max_message_size(self):
         """Get the maximum allowed message size in bytes."""
         return self._max_message_size
@@ -280,25 +1233,52 @@ class JsonSocket:
     address = property(_get_address, _set_address, doc='read only property socket address')
     port = property(_get_port, _set_port, doc='read only property socket port')
     max_message_size = property(_get_max_message_size, _set_max_message_size, doc='Get/set max message size in bytes')
+    codec = property(_get_codec, _set_codec, doc='Get/set outgoing payload codec name')
+    read_codec = property(_get_read_codec, doc='read only property, codec name of the last frame read')
+    compression = property(_get_compression, _set_compression, doc='Get/set outgoing frame compression')
+    integrity = property(_get_integrity, _set_integrity, doc='Get/set frame integrity mode')
+    zdict_id = property(_get_zdict_id, doc='read only property of the negotiated zlib dictionary id')
+    shared_memory = property(_get_shared_memory, doc='read only property, True once shared memory is negotiated')
+    socket_options = property(_get_socket_options, doc='read only property of configured socket options')
 
 
 class JsonServer(JsonSocket):
     """Server socket that accepts one connection at a time."""
 
-    def __init__(self, address='127.0.0.1', port=5489, timeout=2.0, accept_timeout=None, recv_timeout=None):
+    def __init__(
+        self,
+        address='127.0.0.1',
+        port=5489,
+        timeout=2.0,
+        accept_timeout=None,
+        recv_timeout=None,
+        reuse_port=False,
+        backlog=DEFAULT_BACKLOG,
+        **kwargs,
+    ):
+        """Extra keyword arguments (socket_options, codec, compression, ...) go to JsonSocket.
+
+        @param reuse_port set SO_REUSEPORT so several processes can bind the same
+                          address and port and the kernel spreads accepts across them
+        @param backlog length of the kernel's queue of connections waiting for accept
+        """
         super().__init__(
             address,
             port,
             timeout=timeout,
             accept_timeout=accept_timeout,
             recv_timeout=recv_timeout,
+            **kwargs,
         )
         self._is_server = True
+        self._reuse_port = bool(reuse_port)
+        self._backlog = int(backlog)
         self._bind()
 
     def _close_connection(self):
         """Best-effort shutdown and close of the accepted connection socket."""
         logger.debug("closing connection socket (fd=%s)", _socket_fileno(self.conn))
+        self._reset_connection_state()
         try:
             if self.conn and self.conn is not self.socket and self.conn.fileno() != -1:
                 try:
@@ -313,28 +1293,65 @@ class JsonServer(JsonSocket):
             pass
 
     def _bind(self):
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.address, self.port))
+        bind_endpoint(self.socket, self.address, self.port, reuse_port=getattr(self, "_reuse_port", False))
         self._is_listening = False
 
+    def _close_socket(self):
+        """Close the listening socket and remove its Unix socket file, if any."""
+        path = _unix_socket_path(self.socket)
+        super()._close_socket()
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
     def _listen(self):
         if self._is_listening:
             return
-        self.socket.listen(5)
+        self.socket.listen(getattr(self, "_backlog", DEFAULT_BACKLOG))
         self._is_listening = True
 
     def _accept(self):
         return self.socket.accept()
 
+    def _accept_pending(self, limit, sock=None):
+        """Accept up to `limit` connections already queued by the kernel, without waiting.
+
+        @param sock listening socket to accept from; defaults to the server socket
+        @retval list of (conn, addr); stops early when the queue is empty or accept fails
+        """
+        accepted = []
+        if sock is None:
+            sock = self.socket
+        if sock is None or limit <= 0:
+            return accepted
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            while len(accepted) < limit:
+                try:
+                    conn, addr = sock.accept()
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as e:
+                    logger.debug("accept error while draining queue: %s", e)
+                    break
+                conn.setblocking(True)
+                accepted.append((conn, addr))
+        finally:
+            sock.settimeout(timeout)
+        return accepted
+
     def accept_connection(self):
         """Listen and accept a single client connection; set timeout accordingly."""
         self._listen()
         self.conn, addr = self._accept()
         self._last_client_addr = addr
+        self._reset_connection_state()
+        self._apply_socket_options(self.conn)
         self.conn.settimeout(self.recv_timeout)
-        logger.debug(
-            "connection accepted, conn socket (%s,%d,%s)", addr[0], addr[1], str(self.conn.gettimeout())
-        )
+        logger.debug("connection accepted, conn socket (%r,%s)", addr, str(self.conn.gettimeout()))
 
     def _reset_connection_ref(self):
         """Reset the server's connection reference to the listening socket."""
@@ -352,20 +1369,60 @@ class JsonServer(JsonSocket):
 class JsonClient(JsonSocket):
     """Client socket for connecting to a JsonServer and exchanging JSON messages."""
 
-    def __init__(self, address='127.0.0.1', port=5489, timeout=2.0, recv_timeout=None):
-        super().__init__(address, port, timeout=timeout, recv_timeout=recv_timeout)
+    def __init__(
+        self,
+        address='127.0.0.1',
+        port=5489,
+        timeout=2.0,
+        recv_timeout=None,
+        connect_timeout=None,
+        retry_policy=None,
+        **kwargs
+    ):
+        """Extra keyword arguments (socket_options, codec, compression, ...) go to JsonSocket.
+
+        @param connect_timeout seconds one connection attempt may take (default recv_timeout)
+        @param retry_policy RetryPolicy for connect() (default: 10 attempts, jittered
+                            exponential backoff from 0.1 s up to 3 s)
+        """
+        super().__init__(address, port, timeout=timeout, recv_timeout=recv_timeout, **kwargs)
+        self._connect_timeout = connect_timeout
+        self._retry_policy = DEFAULT_RETRY_POLICY if retry_policy is None else retry_policy
         if self.socket is not None:
             self.socket.settimeout(self._recv_timeout)
 
-    def connect(self):
-        """Attempt to connect to the server up to 10 times with backoff."""
+    def connect(self, fail_fast=False):
+        """Connect to the server, retrying failed attempts as the retry policy says.
+
+        Each attempt waits at most connect_timeout (and never past the policy's
+        deadline) for the handshake; between attempts connect() sleeps for the
+        policy's backoff delay.
+        @param fail_fast make a single attempt and return False at once if it fails
+        @retval True on success, False once the attempts or the deadline are used up
+        """
         def _recreate_socket():
             self._close_socket()
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket = socket.socket(family, socket.SOCK_STREAM)
+            self._apply_socket_options(self.socket)
             self.socket.settimeout(self._recv_timeout)
             self.conn = self.socket
 
-        for attempt in range(1, 11):
+        family, sockaddr = resolve_endpoint(self.address, self.port)
+        policy = getattr(self, "_retry_policy", None) or DEFAULT_RETRY_POLICY
+        connect_timeout = getattr(self, "_connect_timeout", None)
+        if connect_timeout is None:
+            connect_timeout = self._recv_timeout
+        deadline = None if policy.deadline is None else time.monotonic() + policy.deadline
+        attempts = 1 if fail_fast else policy.attempts
+        final = False
+
+        for attempt in range(1, attempts + 1):
+            timeout = connect_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = remaining if timeout is None else min(timeout, remaining)
             sock = getattr(self, "socket", None)
             needs_fresh_socket = sock is None
             if not needs_fresh_socket:
@@ -375,19 +1432,91 @@ class JsonClient(JsonSocket):
                     needs_fresh_socket = True
             if needs_fresh_socket:
                 _recreate_socket()
-                logger.debug("created fresh socket before connect attempt %d to %s:%s", attempt, self.address, self.port)
+                logger.debug(
+                    "created fresh socket before connect attempt %d to %s:%s", attempt, self.address, self.port
+                )
             try:
                 logger.debug("connect attempt %d to %s:%s", attempt, self.address, self.port)
-                self.socket.connect((self.address, self.port))
+                self.socket.settimeout(timeout)
+                self.socket.connect(sockaddr)
             except socket.error as msg:
                 logger.error("SockThread Error: %s", msg)
                 # Recreate the socket to avoid retrying on a potentially bad fd.
                 _recreate_socket()
-                logger.debug("recreated socket for retry %d to %s:%s", attempt, self.address, self.port)
-                time.sleep(3)
+                if attempt == attempts or final:
+                    break
+                delay = policy.delay(attempt)
+                if deadline is not None:
+                    delay, final = _clip_to_deadline(delay, deadline - time.monotonic(), connect_timeout)
+                    if delay is None:
+                        logger.debug(
+                            "connect deadline to %s:%s reached after %d attempts", self.address, self.port, attempt
+                        )
+                        break
+                logger.debug("retry %d to %s:%s in %.3fs", attempt, self.address, self.port, delay)
+                time.sleep(delay)
                 continue
             logger.info("...Socket Connected")
+            self._reset_connection_state()
             # Switch to recv_timeout after successful connection
             self.socket.settimeout(self._recv_timeout)
+            if self._needs_integrity_offer():
+                try:
+                    self._negotiate_integrity()
+                except (OSError, RuntimeError) as e:
+                    logger.error("integrity negotiation with %s:%s failed: %s", self.address, self.port, e)
+                    self._close_connection()
+                    return False
+            if self._needs_codec_offer():
+                try:
+                    self._negotiate_codec()
+                except (OSError, RuntimeError) as e:
+                    logger.error("codec negotiation with %s:%s failed: %s", self.address, self.port, e)
+                    self._close_connection()
+                    return False
+            if getattr(self, "_zdicts", None):
+                try:
+                    self._negotiate_zdict()
+                except (OSError, RuntimeError) as e:
+                    logger.error("zdict negotiation with %s:%s failed: %s", self.address, self.port, e)
+                    self._close_connection()
+                    return False
+            if self._can_use_shm():
+                try:
+                    self._negotiate_shm()
+                except (OSError, RuntimeError) as e:
+                    logger.error("shm negotiation with %s:%s failed: %s", self.address, self.port, e)
+                    self._close_connection()
+                    return False
             return True
         return False
+
+    def pipeline(self, objs, depth=DEFAULT_PIPELINE_DEPTH):
+        """Send requests without waiting for each reply; yield the replies in order.
+
+        Up to `depth` requests are kept in flight on the connection. The first window
+        goes out in one send_many write, and each reply read frees a slot for the next
+        request. The server must answer every request with exactly one reply, which
+        ServerFactoryThread and ThreadedServer do in arrival order. Closing the
+        generator early reads and discards the replies still in flight, so the
+        connection stays usable. Give the server socket_options="low_latency" so that
+        Nagle's algorithm does not hold back its back-to-back replies.
+        @param objs iterable of request objects (consumed lazily)
+        @param depth maximum number of unanswered requests
+        """
+        depth = int(depth)
+        if depth < 1:
+            raise ValueError("pipeline depth must be at least 1")
+        pending = iter(objs)
+        in_flight = len(self.send_many(itertools.islice(pending, depth)))
+        try:
+            while in_flight:
+                reply = self.read_obj()
+                in_flight -= 1
+                yield reply
+                if in_flight < depth:
+                    in_flight += len(self.send_many(itertools.islice(pending, depth - in_flight)))
+        except GeneratorExit:
+            for _ in range(in_flight):
+                self.read_obj()
+            raise
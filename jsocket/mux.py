@@ -0,0 +1,175 @@
+""" @namespace mux
+    Request-id multiplexing: many threads sharing one JsonClient connection.
+
+    Each call is wrapped in an envelope {"mux_id": n, "body": obj}. A background
+    reader thread routes every reply to the future waiting on its id, so calls
+    may complete in any order. ServerFactoryThread answers envelopes when it is
+    created with multiplex=True.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import itertools
+import logging
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from jsocket.jsocket_base import JsonClient
+
+logger = logging.getLogger("jsocket.mux")
+
+MUX_ID_KEY = "mux_id"
+MUX_BODY_KEY = "body"
+MUX_ERROR_KEY = "error"
+
+
+class RemoteCallError(RuntimeError):
+    """Raised by MultiplexClient when the server's handler failed for a call."""
+
+
+def is_envelope(obj) -> bool:
+    """True if `obj` is a multiplexing envelope."""
+    return isinstance(obj, dict) and MUX_ID_KEY in obj
+
+
+def make_envelope(mux_id, body=None, error=None) -> dict:
+    """Wrap `body` (or an error string) with its correlation id."""
+    env = {MUX_ID_KEY: mux_id, MUX_BODY_KEY: body}
+    if error is not None:
+        env[MUX_ERROR_KEY] = error
+    return env
+
+
+class MultiplexClient(JsonClient):
+    """JsonClient that lets many threads have calls in flight on one connection.
+
+    Use call() or call_async() instead of send_obj/read_obj; the reader thread
+    started by connect() owns the receive side of the socket.
+    """
+
+    def __init__(self, address='127.0.0.1', port=5489, timeout=2.0, recv_timeout=None, **kwargs):
+        super().__init__(address, port, timeout=timeout, recv_timeout=recv_timeout, **kwargs)
+        self._send_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._reader = None
+        self._closing = False
+
+    def connect(self, fail_fast=False):
+        """Connect and start the reply reader thread."""
+        self._stop_reader()
+        if not super().connect(fail_fast):
+            return False
+        self._closing = False
+        self._reader = threading.Thread(target=self._read_loop, name="jsocket-mux-reader", daemon=True)
+        self._reader.start()
+        return True
+
+    def call_async(self, obj) -> Future:
+        """Send `obj` and return a Future resolved with the server's reply.
+
+        The future fails with RemoteCallError if the handler raised, or with
+        RuntimeError("socket connection broken") if the connection is lost.
+        """
+        future = Future()
+        mux_id = next(self._ids)
+        with self._pending_lock:
+            if self._reader is None or not self._reader.is_alive():
+                raise RuntimeError("socket connection broken")
+            self._pending[mux_id] = future
+        try:
+            with self._send_lock:
+                self.send_obj(make_envelope(mux_id, obj))
+        except Exception:
+            with self._pending_lock:
+                self._pending.pop(mux_id, None)
+            raise
+        future.mux_id = mux_id
+        return future
+
+    def call(self, obj, timeout=None):
+        """Send `obj` and block for its reply.
+
+        @param timeout seconds to wait; on expiry the call is abandoned and
+                       socket.timeout is raised (a late reply is discarded)
+        """
+        future = self.call_async(obj)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                self._pending.pop(future.mux_id, None)
+            raise socket.timeout(f"no reply to call {future.mux_id} within {timeout}s") from None
+
+    def _read_loop(self):
+        """Route replies to their futures until the connection ends."""
+        error = RuntimeError("socket connection broken")
+        while True:
+            try:
+                msg = self.read_obj()
+            except socket.timeout:
+                continue
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if not self._closing:
+                    logger.info("multiplexed connection ended (%s): %s", type(e).__name__, e)
+                    if not isinstance(e, RuntimeError) or "socket connection broken" not in str(e):
+                        error = e
+                break
+            if not is_envelope(msg):
+                logger.debug("dropping reply without %s: %r", MUX_ID_KEY, msg)
+                continue
+            with self._pending_lock:
+                future = self._pending.pop(msg[MUX_ID_KEY], None)
+            if future is None:
+                logger.debug("dropping reply for unknown or abandoned call %r", msg[MUX_ID_KEY])
+                continue
+            if msg.get(MUX_ERROR_KEY) is not None:
+                future.set_exception(RemoteCallError(msg[MUX_ERROR_KEY]))
+            else:
+                future.set_result(msg.get(MUX_BODY_KEY))
+        self._fail_pending(error)
+
+    def _fail_pending(self, error):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def _stop_reader(self):
+        reader = getattr(self, "_reader", None)
+        if reader is None:
+            return
+        self._closing = True
+        self._close_connection()
+        if reader is not threading.current_thread():
+            reader.join()
+        self._reader = None
+
+    def close(self):
+        """Close the connection; calls still in flight fail with RuntimeError."""
+        self._stop_reader()
+        super().close()
+        self._fail_pending(RuntimeError("socket connection broken"))
+
+    def _get_in_flight(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    in_flight = property(_get_in_flight, doc="number of calls awaiting a reply")
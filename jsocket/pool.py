@@ -0,0 +1,347 @@
+""" @namespace pool
+    Thread-safe pool of JsonClient connections.
+
+    A background thread keeps at least min_size connections open, closes
+    connections left idle longer than idle_timeout, and drops idle connections
+    the server has closed. Connections are opened by helper threads, so a
+    checkout waits at most checkout_timeout even while connect() retries.
+    Every connection is checked before it is lent: one that was closed (for
+    example by _close_connection after a FramingError), that has unread bytes,
+    or that fails the optional health check is closed and never lent again.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import contextlib
+import logging
+import select
+import socket
+import threading
+import time
+
+from jsocket.jsocket_base import JsonClient
+
+logger = logging.getLogger("jsocket.pool")
+
+DEFAULT_CHECKOUT_TIMEOUT = 5.0
+DEFAULT_IDLE_TIMEOUT = 60.0
+DEFAULT_MAINTENANCE_INTERVAL = 1.0
+
+
+def _is_usable(client) -> bool:
+    """True if the client's connection is open with nothing unread on it."""
+    conn = getattr(client, "conn", None)
+    try:
+        if conn is None or conn.fileno() == -1:
+            return False
+        if getattr(client, "_recv_pending", None):
+            return False
+        # Readable while idle means the server closed it or sent an unexpected reply.
+        # poll, unlike select, works for descriptors above FD_SETSIZE (1024).
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(conn, select.POLLIN | select.POLLPRI)
+            return not poller.poll(0)
+        readable, _, _ = select.select([conn], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+class JsonClientPool:
+    """Lends connected JsonClients to threads and takes them back.
+
+    with pool.connection() as client:
+        client.send_obj(request)
+        reply = client.read_obj()
+
+    A connection is closed instead of returned when the block raises, because
+    a request may be left half sent or a reply unread. Extra keyword arguments
+    (timeout, codec, compression, ...) go to every client.
+    """
+
+    def __init__(
+        self,
+        address='127.0.0.1',
+        port=5489,
+        min_size=1,
+        max_size=10,
+        checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        health_check=None,
+        maintenance_interval=DEFAULT_MAINTENANCE_INTERVAL,
+        client_type=JsonClient,
+        **client_kwargs
+    ):
+        """@param min_size connections kept open, opened in the background as soon as the pool starts
+        @param max_size most connections open at once, lent or idle
+        @param checkout_timeout default seconds checkout() waits for a connection
+        @param idle_timeout seconds an idle connection above min_size is kept (None keeps it)
+        @param health_check optional callable(client) -> bool run before a connection is lent;
+                            False or an exception closes the connection
+        """
+        min_size, max_size = int(min_size), int(max_size)
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("pool sizes need 0 <= min_size <= max_size and max_size >= 1")
+        self._address = address
+        self._port = port
+        self._min_size = min_size
+        self._max_size = max_size
+        self._checkout_timeout = checkout_timeout
+        self._idle_timeout = idle_timeout
+        self._health_check = health_check
+        self._maintenance_interval = maintenance_interval
+        self._client_type = client_type
+        self._client_kwargs = client_kwargs
+        self._cond = threading.Condition()
+        self._idle = []  # (client, returned_at); the most recently returned is lent first
+        self._lent = set()
+        self._size = 0  # idle + lent + being opened
+        self._opening = 0
+        self._waiters = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "opened": 0,
+            "connect_failures": 0,
+            "discarded": 0,
+            "evicted_idle": 0,
+            "in_use_peak": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+        self._stop = threading.Event()
+        with self._cond:
+            for _ in range(min_size):
+                self._open_async()
+        self._maintenance = threading.Thread(target=self._maintain, name="jsocket-pool-maintenance", daemon=True)
+        self._maintenance.start()
+
+    def checkout(self, timeout=None):
+        """Return a connected client for the calling thread's exclusive use.
+
+        @param timeout seconds to wait when all max_size connections are in use
+                       (default checkout_timeout); on expiry socket.timeout is raised
+        """
+        timeout = self._checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            client = self._take(deadline)
+            if self._validate(client):
+                break
+            self._discard(client)
+        waited = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+        return client
+
+    def checkin(self, client, discard=False):
+        """Give back a client from checkout(); closed or unusable ones are dropped.
+
+        @param discard close the connection instead of keeping it
+        """
+        with self._cond:
+            if client not in self._lent:
+                raise ValueError("client was not checked out from this pool")
+        # The caller still owns the client, so it can be checked without holding the lock.
+        usable = not discard and _is_usable(client)
+        with self._cond:
+            if client not in self._lent:
+                raise ValueError("client was not checked out from this pool")
+            self._lent.remove(client)
+            keep = usable and not self._closed
+            if keep:
+                self._idle.append((client, time.monotonic()))
+                self._cond.notify()
+        if not keep:
+            self._discard(client, lent=False)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """Context manager around checkout()/checkin(); an exception discards the connection."""
+        client = self.checkout(timeout)
+        try:
+            yield client
+        except BaseException:
+            self.checkin(client, discard=True)
+            raise
+        self.checkin(client)
+
+    def close(self):
+        """Close idle connections and stop the pool; lent ones are closed when checked in."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._stop.set()
+        for client, _ in idle:
+            client.close()
+        if self._maintenance is not threading.current_thread():
+            self._maintenance.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_stats(self) -> dict:
+        """Snapshot of pool size, utilization and checkout wait times."""
+        with self._cond:
+            stats = dict(self._stats)
+            in_use = len(self._lent)
+            snapshot = {
+                "min_size": self._min_size,
+                "max_size": self._max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "opening": self._opening,
+                "waiters": self._waiters,
+            }
+        checkouts = stats.pop("checkouts")
+        wait_total = stats.pop("wait_total")
+        wait_max = stats.pop("wait_max")
+        snapshot.update(stats)
+        snapshot["checkouts"] = checkouts
+        snapshot["utilization"] = in_use / self._max_size
+        snapshot["utilization_peak"] = snapshot["in_use_peak"] / self._max_size
+        snapshot["wait_avg_ms"] = wait_total / checkouts * 1000.0 if checkouts else 0.0
+        snapshot["wait_max_ms"] = wait_max * 1000.0
+        return snapshot
+
+    def _take(self, deadline):
+        """Wait for an idle connection, opening new ones while below max_size."""
+        with self._cond:
+            self._waiters += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("pool is closed")
+                    if self._idle:
+                        client, _ = self._idle.pop()
+                        self._lent.add(client)
+                        self._stats["in_use_peak"] = max(self._stats["in_use_peak"], len(self._lent))
+                        return client
+                    if self._size < self._max_size and self._opening < self._waiters:
+                        self._open_async()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise socket.timeout("no pooled connection available")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def _validate(self, client) -> bool:
+        if not _is_usable(client):
+            logger.debug("pooled connection to %s:%s is closed or has unread data", self._address, self._port)
+            return False
+        if self._health_check is None:
+            return True
+        try:
+            return bool(self._health_check(client))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.info("pooled connection failed health check (%s): %s", type(e).__name__, e)
+            return False
+
+    def _discard(self, client, lent=True):
+        with self._cond:
+            if lent:
+                self._lent.discard(client)
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+        client.close()
+
+    def _open_async(self):
+        """Start opening one connection; the caller holds the lock."""
+        self._size += 1
+        self._opening += 1
+        threading.Thread(target=self._open, name="jsocket-pool-connect", daemon=True).start()
+
+    def _open(self):
+        client = None
+        try:
+            client = self._client_type(address=self._address, port=self._port, **self._client_kwargs)
+            connected = client.connect()
+        except (OSError, RuntimeError) as e:
+            logger.error("pool connect to %s:%s failed: %s", self._address, self._port, e)
+            connected = False
+        with self._cond:
+            self._opening -= 1
+            if connected and not self._closed:
+                self._idle.append((client, time.monotonic()))
+                self._stats["opened"] += 1
+                client = None
+            else:
+                self._size -= 1
+                if not connected:
+                    self._stats["connect_failures"] += 1
+            self._cond.notify()
+        if client is not None:
+            client.close()
+
+    def _maintain(self):
+        """Evict idle and dead connections and top the pool up to min_size."""
+        while not self._stop.wait(self._maintenance_interval):
+            now = time.monotonic()
+            with self._cond:
+                if self._closed:
+                    return
+                expired = []
+                keep = []
+                for client, returned_at in self._idle:
+                    if (
+                        self._idle_timeout is not None
+                        and now - returned_at >= self._idle_timeout
+                        and self._size - len(expired) > self._min_size
+                    ):
+                        expired.append(client)
+                    else:
+                        keep.append((client, returned_at))
+                self._idle = keep
+                self._size -= len(expired)
+                self._stats["evicted_idle"] += len(expired)
+                candidates = [client for client, _ in keep]
+            # Probe the sockets without the lock; a client lent meanwhile is checked again by checkout().
+            dead = {client for client in candidates if not _is_usable(client)}
+            with self._cond:
+                if dead:
+                    # Only drop the ones still idle; the rest were lent or discarded meanwhile.
+                    dead = [client for client, _ in self._idle if client in dead]
+                    self._idle = [(client, at) for client, at in self._idle if client not in dead]
+                    self._size -= len(dead)
+                    self._stats["discarded"] += len(dead)
+                if not self._closed:
+                    for _ in range(self._min_size - self._size):
+                        self._open_async()
+            for client in expired:
+                client.close()
+            for client in dead:
+                client.close()
+
+    def _get_size(self):
+        return self._size
+
+    size = property(_get_size, doc="read only number of open connections, lent, idle or being opened")
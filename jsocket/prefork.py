@@ -0,0 +1,327 @@
+""" @namespace prefork
+    Pre-fork launcher: N processes, each running its own ServerFactory on one port.
+
+    Every child binds the same address and port with SO_REUSEPORT, so the kernel
+    spreads incoming connections across processes (and cores). The parent only
+    supervises: it restarts children that exit unexpectedly and merges their
+    client stats on request.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from jsocket import jsocket_base
+from jsocket.tserver import ServerFactory, _merge_client_stats
+
+logger = logging.getLogger("jsocket.prefork")
+
+DEFAULT_SUPERVISE_INTERVAL = 0.5
+DEFAULT_RESTART_DELAY = 0.1
+DEFAULT_MAX_RESTART_DELAY = 30.0
+DEFAULT_MAX_RESTARTS = 10
+# Seconds get_client_stats() waits for each child's reply.
+STATS_TIMEOUT = 5.0
+
+
+def _serve_child(factory_type, server_thread, address, port, factory_kwargs, control):
+    """Child process entry point: run a factory until the parent says stop."""
+    server = factory_type(server_thread, address=address, port=port, reuse_port=True, **factory_kwargs)
+    server._listen()  # pylint: disable=protected-access
+    server.start()
+    try:
+        control.send(("ready", os.getpid()))
+        while True:
+            try:
+                request = control.recv()
+            except (EOFError, OSError):
+                break
+            if isinstance(request, tuple) and request[0] == "stats":
+                # Echo the request number so the parent can drop replies it gave up on.
+                control.send(("stats", request[1], server.get_client_stats()))
+            elif request == "stop":
+                break
+    finally:
+        server.stop()
+        server.join(timeout=5)
+
+
+def _merge_stats(snapshots) -> dict:
+    """Combine get_client_stats() results from several processes."""
+    clients = {}
+    for snapshot in snapshots:
+        for client_id, stats in snapshot.get("clients", {}).items():
+            existing = clients.get(client_id)
+            if existing is None:
+                clients[client_id] = dict(stats, failures=dict(stats.get("failures", {})))
+                continue
+            duration = max(existing.get("connected_duration", 0.0), stats.get("connected_duration", 0.0))
+            merged = _merge_client_stats(existing, stats)
+            merged["connected_duration"] = duration
+            messages_in = merged.get("messages_in", 0)
+            messages_out = merged.get("messages_out", 0)
+            merged["avg_payload_in"] = merged.get("bytes_in", 0) / messages_in if messages_in else 0.0
+            merged["avg_payload_out"] = merged.get("bytes_out", 0) / messages_out if messages_out else 0.0
+    connected = sum(s.get("connected_clients", 0) for s in snapshots)
+    return {"connected_clients": connected, "clients": clients}
+
+
+class _Child:
+    """Parent-side handle on one worker process."""
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.process = None
+        self.control = None
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.crashes = 0  # exits in a row, each soon after its start
+        self.started_at = 0.0
+        self.restart_at = None
+        self.gave_up = False
+
+
+class PreforkServer:
+    """Run `processes` copies of a ServerFactory that share one listening port.
+
+    Children are started with multiprocessing, so with a non-fork start method the
+    factory and worker classes must be importable. A child that exits on its own is
+    restarted after a delay that doubles with each crash in a row, up to
+    max_restart_delay; after max_restarts crashes in a row the slot is given up.
+    Its stats up to the crash are lost. With port=0 the parent reserves an
+    ephemeral port (bound, never listening) that every child and restart reuses.
+    """
+
+    def __init__(
+        self,
+        server_thread,
+        address='127.0.0.1',
+        port=5489,
+        processes=None,
+        factory_type=ServerFactory,
+        supervise_interval=DEFAULT_SUPERVISE_INTERVAL,
+        start_method=None,
+        restart_delay=DEFAULT_RESTART_DELAY,
+        max_restart_delay=DEFAULT_MAX_RESTART_DELAY,
+        max_restarts=DEFAULT_MAX_RESTARTS,
+        **kwargs,
+    ):
+        """@param server_thread ServerFactoryThread subclass handling each connection
+        @param processes number of worker processes (default: os.cpu_count())
+        @param factory_type ServerFactory or SelectorServerFactory
+        @param supervise_interval seconds between liveness checks of the children
+        @param start_method multiprocessing start method, or None for the platform default
+        @param restart_delay seconds before restarting a child that exited; doubles with
+                             each crash in a row, up to max_restart_delay
+        @param max_restarts crashes in a row after which a slot is left empty (None: no limit);
+                            a child that stays up for max_restart_delay resets the count
+        @param kwargs passed on to every factory (timeout, codec, compression, ...)
+        """
+        processes = (os.cpu_count() or 1) if processes is None else int(processes)
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        if not issubclass(factory_type, ServerFactory):
+            raise TypeError("factory_type not of type", ServerFactory)
+        self._server_thread = server_thread
+        self._factory_type = factory_type
+        self._factory_kwargs = kwargs
+        self._address = address
+        self._supervise_interval = supervise_interval
+        self._restart_delay = restart_delay
+        self._max_restart_delay = max_restart_delay
+        self._max_restarts = max_restarts
+        self._stats_seq = itertools.count(1)
+        self._context = multiprocessing.get_context(start_method)
+        self._reservation = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        jsocket_base.enable_reuse_port(self._reservation)
+        self._reservation.bind((address, port))
+        self._port = self._reservation.getsockname()[1]
+        self._children = [_Child(slot) for slot in range(processes)]
+        self._is_alive = False
+        self._supervisor = None
+
+    def start(self):
+        """Start every child, wait until each is accepting, then start supervising."""
+        self._is_alive = True
+        for child in self._children:
+            self._spawn(child)
+        self._supervisor = threading.Thread(target=self._supervise, name="jsocket-prefork-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _spawn(self, child):
+        parent_end, child_end = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve_child,
+            args=(
+                self._factory_type,
+                self._server_thread,
+                self._address,
+                self._port,
+                self._factory_kwargs,
+                child_end,
+            ),
+            name=f"jsocket-prefork-{child.slot}",
+            daemon=True,
+        )
+        process.start()
+        child_end.close()
+        with child.lock:
+            if child.control is not None:
+                child.control.close()
+            child.process = process
+            child.started_at = time.monotonic()
+            child.control = parent_end
+            if parent_end.poll(10):
+                try:
+                    parent_end.recv()
+                except (EOFError, OSError):
+                    pass
+        logger.debug("prefork child %s started (pid %s)", child.slot, process.pid)
+
+    def _supervise(self):
+        while self._is_alive:
+            time.sleep(self._supervise_interval)
+            for child in self._children:
+                if not self._is_alive:
+                    return
+                process = child.process
+                if process is None or child.gave_up or process.is_alive():
+                    continue
+                now = time.monotonic()
+                if child.restart_at is None:
+                    self._schedule_restart(child, process, now)
+                if child.restart_at is not None and now >= child.restart_at:
+                    child.restart_at = None
+                    child.restarts += 1
+                    self._spawn(child)
+
+    def _schedule_restart(self, child, process, now):
+        """Pick when to restart a child that exited, or give its slot up."""
+        if now - child.started_at >= self._max_restart_delay:
+            child.crashes = 0
+        child.crashes += 1
+        if self._max_restarts is not None and child.crashes > self._max_restarts:
+            child.gave_up = True
+            logger.error(
+                "prefork child %s (pid %s) exited with %s after %d restarts in a row; giving up",
+                child.slot,
+                process.pid,
+                process.exitcode,
+                child.crashes - 1,
+            )
+            return
+        delay = min(self._max_restart_delay, self._restart_delay * 2 ** (child.crashes - 1))
+        logger.warning(
+            "prefork child %s (pid %s) exited with %s; restarting in %.2fs",
+            child.slot,
+            process.pid,
+            process.exitcode,
+            delay,
+        )
+        child.restart_at = now + delay
+
+    def stop(self):
+        """Stop supervising and shut every child down."""
+        self._is_alive = False
+        if self._supervisor is not None and self._supervisor is not threading.current_thread():
+            self._supervisor.join(timeout=self._supervise_interval + 10)
+        for child in self._children:
+            with child.lock:
+                if child.control is None:
+                    continue
+                try:
+                    child.control.send("stop")
+                except (OSError, ValueError):
+                    pass
+        for child in self._children:
+            process = child.process
+            if process is None:
+                continue
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+            child.control.close()
+        self._reservation.close()
+
+    def join(self, timeout=None):
+        """Wait for the supervisor thread to finish (after stop())."""
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+
+    def get_client_stats(self) -> dict:
+        """Merge get_client_stats() from every live child.
+
+        Adds "processes": one entry per slot with pid, alive and restarts.
+        """
+        snapshots = []
+        processes = []
+        for child in self._children:
+            process = child.process
+            alive = process is not None and process.is_alive()
+            if alive:
+                with child.lock:
+                    snapshot = self._request_stats(child.control)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+            processes.append(
+                {
+                    "slot": child.slot,
+                    "pid": process.pid if process else None,
+                    "alive": alive,
+                    "restarts": child.restarts,
+                    "gave_up": child.gave_up,
+                }
+            )
+        stats = _merge_stats(snapshots)
+        stats["processes"] = processes
+        return stats
+
+    def _request_stats(self, control):
+        """Ask one child for its stats; replies to earlier, timed out requests are dropped."""
+        seq = next(self._stats_seq)
+        deadline = time.monotonic() + STATS_TIMEOUT
+        try:
+            control.send(("stats", seq))
+            while control.poll(max(0.0, deadline - time.monotonic())):
+                reply = control.recv()
+                if isinstance(reply, tuple) and len(reply) == 3 and reply[0] == "stats" and reply[1] == seq:
+                    return reply[2]
+                logger.debug("dropping stale stats reply from prefork child (wanted request %d)", seq)
+        except (EOFError, OSError):
+            pass
+        return None
+
+    def _get_pids(self):
+        return [child.process.pid for child in self._children if child.process is not None]
+
+    def _get_address(self):
+        return self._address
+
+    def _get_port(self):
+        return self._port
+
+    pids = property(_get_pids, doc="process ids of the current children")
+    address = property(_get_address, doc="read only property of the shared address")
+    port = property(_get_port, doc="read only property of the shared port")
@@ -0,0 +1,340 @@
+""" @namespace relay
+    Relay server that forwards jsocket frames to upstream servers without decoding them.
+
+    RelayServer accepts clients like ServerFactory. For each client its
+    RelayWorker opens a connection to the next upstream (round robin, skipping
+    ones that refuse) and pumps frames both ways. Only headers are parsed and
+    checksums verified, so payloads are never decompressed or parsed; zlib
+    dictionaries and codecs are negotiated end to end. Shared memory offers are
+    declined by the relay itself, since the client is not on the upstream's host.
+
+    Frames are read into a large per-direction buffer and forwarded in batches.
+    Frames bigger than the buffer are streamed through it chunk by chunk. With
+    integrity="none" on the relay (trusted network zones), bodies of large frames
+    are moved socket to socket with os.splice on Linux instead of being copied
+    through Python.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+from typing import Optional
+
+from jsocket import jsocket_base
+from jsocket.tserver import (
+    ServerFactory,
+    ServerFactoryThread,
+    _note_disconnect,
+    _note_failure,
+    _note_framing_failure,
+    _note_message_in,
+    _note_message_out,
+)
+
+logger = logging.getLogger("jsocket.relay")
+
+DEFAULT_RELAY_BUFFER_SIZE = 256 * 1024
+DEFAULT_CONNECT_TIMEOUT = 5.0
+# Remaining bodies at least this large are spliced; one chunk fits a default pipe.
+SPLICE_THRESHOLD = 64 * 1024
+SPLICE_CHUNK = 64 * 1024
+
+_HAS_SPLICE = hasattr(os, "splice")
+
+
+class _UpstreamRing:
+    """Round-robin order over upstream endpoints, shared by every worker of a relay."""
+
+    def __init__(self, upstreams):
+        self.endpoints = [tuple(endpoint) for endpoint in upstreams]
+        if not self.endpoints:
+            raise ValueError("at least one upstream is required")
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def order(self) -> list:
+        """Return every endpoint, starting with the next one in turn."""
+        with self._lock:
+            first = self._next
+            self._next = (first + 1) % len(self.endpoints)
+        return self.endpoints[first:] + self.endpoints[:first]
+
+
+class RelayWorker(ServerFactoryThread):
+    """Forwards one client's frames to an upstream server and the upstream's frames back."""
+
+    def __init__(
+        self,
+        upstreams=None,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        relay_buffer_size=DEFAULT_RELAY_BUFFER_SIZE,
+        splice=True,
+        **kwargs
+    ):
+        """@param upstreams [(address, port), ...] to relay to (a port of None means a Unix socket path)
+        @param relay_buffer_size bytes buffered per direction; larger frames are streamed
+        @param splice move large bodies with os.splice when checksums are not verified (Linux)
+        """
+        if upstreams is None:
+            raise ValueError("RelayWorker needs upstreams")
+        self._upstreams = upstreams if isinstance(upstreams, _UpstreamRing) else _UpstreamRing(upstreams)
+        self._connect_timeout = connect_timeout
+        self._buffer_size = int(relay_buffer_size)
+        if self._buffer_size < jsocket_base.FRAME_HEADER_SIZE + jsocket_base.FRAME_EXT_SIZE:
+            raise ValueError("relay_buffer_size is smaller than a frame header")
+        self._splice = bool(splice) and _HAS_SPLICE
+        self.upstream = None
+        self._upstream_lock = threading.Lock()
+        self._client_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _process_message(self, obj) -> Optional[dict]:
+        """Never called: the relay does not decode messages."""
+        return None
+
+    def run(self):
+        try:
+            self.upstream = self._connect_upstream()
+        except OSError as e:
+            logger.info("no upstream reachable (%s), closing client connection", e)
+            _note_failure(self, "upstream")
+        else:
+            back = threading.Thread(
+                target=self._pump, args=(self.upstream, self.conn, False), name=f"{self.name}-upstream", daemon=True
+            )
+            back.start()
+            self._pump(self.conn, self.upstream, True)
+            back.join()
+        self._is_alive = False
+        _note_disconnect(self)
+        self._close_upstream()
+        self._close_connection()
+        if hasattr(self, "socket"):
+            self._close_socket()
+
+    def force_stop(self):
+        """Stop relaying; both connections are shut down so blocked reads return."""
+        super().force_stop()
+        self._shutdown(self.conn, self.upstream)
+
+    def _connect_upstream(self):
+        """Connect to the first upstream, in round-robin order, that accepts."""
+        error = None
+        for address, port in self._upstreams.order():
+            family, sockaddr = jsocket_base.resolve_endpoint(address, port)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self._connect_timeout)
+                sock.connect(sockaddr)
+                self._apply_socket_options(sock)
+                sock.settimeout(getattr(self, "_recv_timeout", None))
+            except OSError as e:
+                sock.close()
+                error = e
+                logger.debug("upstream %s:%s refused (%s)", address, port, e)
+                continue
+            logger.debug("relaying %s to upstream %s:%s", self._client_id, address, port)
+            return sock
+        raise error
+
+    def _close_upstream(self):
+        upstream, self.upstream = self.upstream, None
+        if upstream is not None:
+            self._shutdown(upstream)
+            upstream.close()
+
+    @staticmethod
+    def _shutdown(*socks):
+        for sock in socks:
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _pump(self, src, dst, to_upstream):
+        """Forward frames from `src` to `dst` until either side closes, then close both."""
+        try:
+            self._forward(src, dst, to_upstream)
+        except jsocket_base.FramingError as e:
+            _note_framing_failure(self, e)
+            logger.debug("relay framing error (%s): %s", type(e).__name__, e)
+        except (OSError, RuntimeError) as e:
+            if self._is_alive:
+                logger.info("relay connection closed (%s)", e)
+        finally:
+            self._is_alive = False
+            self._shutdown(src, dst)
+
+    def _forward(self, src, dst, to_upstream):
+        decoder = self._frame_decoder()
+        lock = self._upstream_lock if to_upstream else self._client_lock
+        note = _note_message_in if to_upstream else _note_message_out
+        buf = bytearray(self._buffer_size)
+        view = memoryview(buf)
+        start = end = 0
+        while self._is_alive:
+            sent = start
+            header = None
+            while True:
+                header = decoder.parse_header(view[:end], start)
+                if header is None:
+                    break
+                body = start + header.header_size
+                if body + header.size > end:
+                    break
+                self._check_frame(header)
+                decoder.check(header, view[body:body + header.size])
+                if header.flags & jsocket_base.FLAG_CONTROL:
+                    if to_upstream and self._answer_control(view[body:body + header.size]):
+                        # Answered here: forward what came before and drop this frame.
+                        with lock:
+                            dst.sendall(view[sent:start])
+                        sent = body + header.size
+                else:
+                    note(self, header.size)
+                start = body + header.size
+            if sent < start:
+                with lock:
+                    dst.sendall(view[sent:start])
+            if header is not None and header.header_size + header.size > len(buf):
+                with lock:
+                    self._stream_frame(src, dst, header, view, start, end)
+                note(self, header.size)
+                start = end = 0
+                continue
+            if start:
+                # Move the partial frame to the front so the next read can complete it.
+                pending = end - start
+                if pending:
+                    buf[:pending] = bytes(view[start:end])
+                start, end = 0, pending
+            end += self._recv(src, view[end:])
+
+    def _recv(self, sock, view) -> int:
+        while True:
+            try:
+                nbytes = sock.recv_into(view)
+            except socket.timeout:
+                if not self._is_alive:
+                    raise RuntimeError("relay stopped") from None
+                continue
+            if nbytes == 0:
+                raise RuntimeError("socket connection broken")
+            return nbytes
+
+    def _check_frame(self, header):
+        if header.flags & jsocket_base.FLAG_SHM:
+            # Neither side can have negotiated shared memory: the relay declines every offer.
+            raise jsocket_base.UnsupportedFrameError("shared memory frame on a relayed connection")
+
+    def _answer_control(self, payload) -> bool:
+        """Handle a client control frame meant for the relay; True if it must not be forwarded."""
+        try:
+            msg = json.loads(bytes(payload))
+        except ValueError as e:
+            raise jsocket_base.FramingError("invalid control frame") from e
+        if not isinstance(msg, dict) or msg.get("op") != "shm_offer":
+            return False
+        header, body = self._encode_frame({"op": "shm_accept", "ok": False}, control=True)
+        with self._client_lock:
+            self.conn.sendall(header + body)
+        return True
+
+    def _stream_frame(self, src, dst, header, view, start, end):
+        """Pass on a frame too large for the buffer, of which view[start:end] has arrived."""
+        if header.flags & jsocket_base.FLAG_CONTROL:
+            raise jsocket_base.FramingError("control frame larger than the relay buffer")
+        self._check_frame(header)
+        decoder = self._frame_decoder()
+        digest = decoder.digest_for(header.integrity)
+        body = start + header.header_size
+        value = digest(view[body:end]) if digest is not None else None
+        dst.sendall(view[start:end])
+        remaining = header.size - (end - body)
+        if digest is None and self._splice and remaining >= SPLICE_THRESHOLD:
+            self._splice_body(src, dst, remaining)
+            return
+        while remaining:
+            nbytes = self._recv(src, view[:min(remaining, len(view))])
+            if digest is not None:
+                value = digest(view[:nbytes], value)
+            dst.sendall(view[:nbytes])
+            remaining -= nbytes
+        if digest is not None:
+            decoder.verify(header, value & 0xFFFFFFFF)
+
+    def _splice_body(self, src, dst, remaining):
+        """Move `remaining` body bytes from `src` to `dst` through a pipe, without copying them into Python."""
+        read_end, write_end = os.pipe()
+        try:
+            while remaining:
+                try:
+                    moved = os.splice(src.fileno(), write_end, min(remaining, SPLICE_CHUNK))
+                except BlockingIOError:
+                    self._wait(src, select.POLLIN)
+                    continue
+                if moved == 0:
+                    raise RuntimeError("socket connection broken")
+                remaining -= moved
+                while moved:
+                    try:
+                        moved -= os.splice(read_end, dst.fileno(), moved)
+                    except BlockingIOError:
+                        self._wait(dst, select.POLLOUT)
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+
+    def _wait(self, sock, event):
+        # Sockets with a timeout are non-blocking underneath, so splice can return EAGAIN.
+        poller = select.poll()
+        poller.register(sock, event)
+        timeout = sock.gettimeout()
+        while not poller.poll(None if timeout is None else timeout * 1000):
+            if not self._is_alive:
+                raise RuntimeError("relay stopped")
+
+
+class RelayServer(ServerFactory):
+    """ServerFactory that relays every client to one of `upstreams` without decoding payloads.
+
+    Takes ServerFactory's keyword arguments; max_message_size and integrity
+    apply to the frames the relay checks (integrity="none" skips checksums
+    and lets large bodies be spliced). connect_timeout, relay_buffer_size and
+    splice go to each RelayWorker. get_client_stats() counts frames sent to
+    upstream as messages_in and frames returned as messages_out; "upstream"
+    failures count clients no upstream would accept.
+    """
+
+    def __init__(self, upstreams, relay_thread=RelayWorker, **kwargs):
+        """@param upstreams [(address, port), ...]; each client goes to the next one in turn"""
+        if not issubclass(relay_thread, RelayWorker):
+            raise TypeError("relay_thread not of type", RelayWorker)
+        super().__init__(relay_thread, upstreams=_UpstreamRing(upstreams), **kwargs)
+
+    def _get_upstreams(self) -> list:
+        return list(self._thread_args["upstreams"].endpoints)
+
+    upstreams = property(_get_upstreams, doc="read only list of upstream (address, port) endpoints")
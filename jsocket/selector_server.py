@@ -0,0 +1,674 @@
+""" @namespace selector_server
+    ServerFactory variant that serves every connection from a few selector threads.
+
+    Instead of starting one ServerFactoryThread per client, SelectorServerFactory
+    keeps an unstarted instance per connection as its handler and framer. One or
+    more I/O threads wait on all sockets with `selectors` (epoll on Linux), decode
+    frames from non-blocking reads and call the handler's _process_message for each
+    complete message. Replies are queued and flushed when the socket is writable.
+
+    With workers=N, handlers run on a fixed pool of N threads instead of the I/O
+    threads. Decoded messages wait in a bounded queue; a connection is handled by
+    one worker at a time, so its messages are still processed in order.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import collections
+import logging
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from jsocket import jsocket_base, mux
+from jsocket.tserver import (
+    ServerFactory,
+    _extract_client_id,
+    _note_disconnect,
+    _note_failure,
+    _note_framing_failure,
+    _note_message_in,
+    _note_message_out,
+    _set_client_identity,
+)
+
+logger = logging.getLogger("jsocket.selector_server")
+
+# Stop reading from a client while this many reply bytes are waiting to be written to it.
+SEND_HIGH_WATER = 1024 * 1024
+
+# Default bound on decoded messages waiting for a pool worker.
+DEFAULT_MAX_QUEUE = 1024
+
+
+class _RawFrame(collections.namedtuple("_RawFrame", "payload codec_id flags zdict_id")):
+    """A verified but undecoded frame body, as shipped to a worker process."""
+
+    __slots__ = ()
+
+
+_process_handler = None
+
+
+def _init_process(handler_type, handler_kwargs):
+    """Worker process initializer: build the handler used for every message."""
+    global _process_handler  # pylint: disable=global-statement
+    _process_handler = handler_type(**handler_kwargs)
+
+
+def _handle_in_process(frame, reply_zdict_id, peer_codecs=None, peer_integrity=None, codec=None):
+    """Decode `frame`, run the handler and encode its reply, inside a worker process.
+
+    @param peer_codecs codec ids the client said it decodes, or None if it made no offer
+    @param peer_integrity integrity mode id the client offered, or None if it made no offer
+    @param codec id of the reply codec, chosen when the frame was read
+    @retval (client_id, reply frame bytes or None, reply payload size)
+    """
+    handler = _process_handler
+    handler._last_read_codec = frame.codec_id
+    handler._zdict_id = reply_zdict_id
+    handler._peer_codecs = peer_codecs
+    handler._peer_integrity = peer_integrity
+    if codec is None:
+        codec = handler._send_codec().codec_id
+    data = handler._decompress_payload(frame.payload, frame.flags, frame.zdict_id)
+    if getattr(handler, "_raw_frames", False):
+        reply = handler._process_raw(bytes(data))
+        if reply is None:
+            return None, None, None
+        header, payload = handler._frame_payload(reply, codec)
+        return None, header + payload, handler._last_send_size
+    obj = handler._decode_payload(data, frame.codec_id)
+    if getattr(handler, "_multiplex", False) and mux.is_envelope(obj):
+        body = obj.get(mux.MUX_BODY_KEY)
+        try:
+            reply = mux.make_envelope(obj[mux.MUX_ID_KEY], handler._process_message(body))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            reply = mux.make_envelope(obj[mux.MUX_ID_KEY], error=f"{type(e).__name__}: {e}")
+    else:
+        body = obj
+        reply = handler._process_message(obj)
+    client_id = _extract_client_id(body)
+    if reply is None:
+        return client_id, None, None
+    header, payload = handler._encode_frame(reply, codec=codec)
+    return client_id, header + payload, handler._last_send_size
+
+
+class _SelectorConnection:
+    """Per-connection buffers and frame decoding state."""
+
+    def __init__(self, handler, sock, loop=None):
+        self.handler = handler
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.loop = loop
+        self.decoder = handler._frame_decoder()
+        self.outbuf = bytearray()
+        self.out_lock = threading.Lock()
+        self.events = selectors.EVENT_READ
+        self.paused = False
+        self.closed = False
+        # Pool mode: (obj, size, queued_at) waiting for a worker, and whether a worker owns us.
+        self.pending = collections.deque()
+        self.scheduled = False
+        # Replies (send_obj, send_many, control frames) are queued and flushed by the loop.
+        handler._send_parts = self.queue_parts
+
+    def queue_parts(self, parts):
+        release = self.handler._take_shm_releases()
+        if release:
+            parts = (*release, *parts)
+        with self.out_lock:
+            for part in parts:
+                self.outbuf += part
+
+    def try_flush(self) -> bool:
+        """Write as much queued output as the socket takes without blocking.
+
+        @retval True if nothing is left to write
+        """
+        with self.out_lock:
+            while self.outbuf:
+                try:
+                    sent = self.sock.send(self.outbuf)
+                except (BlockingIOError, InterruptedError):
+                    return False
+                del self.outbuf[:sent]
+        return True
+
+    def frames(self, raw=False):
+        """Yield (obj, is_control) for every complete frame buffered so far.
+
+        Handlers with raw_frames get data payloads as undecoded bytes.
+        @param raw if True, data frames are only checksummed and yielded as
+                   _RawFrame for decoding elsewhere; control frames are decoded
+        """
+        handler = self.handler
+        decoder = handler._frame_decoder()
+        raw_frames = getattr(handler, "_raw_frames", False)
+        while True:
+            try:
+                frame = decoder.next_frame()
+            except jsocket_base.FramingError:
+                handler._close_connection()
+                raise
+            if frame is None:
+                return
+            handler._accept_header(frame)
+            handler._last_read_size = frame.size
+            flags = frame.flags
+            if raw and not flags & jsocket_base.FLAG_CONTROL:
+                data = frame.payload
+                if flags & jsocket_base.FLAG_SHM:
+                    # Worker processes never see the segment, so releases stay with this connection.
+                    data = handler._load_shm_payload(data)
+                    flags &= ~jsocket_base.FLAG_SHM
+                yield _RawFrame(data, frame.codec_id, flags, frame.dict_id), False
+            elif raw_frames and not flags & jsocket_base.FLAG_CONTROL:
+                yield handler._finish_raw(frame.payload, None, None), False
+            else:
+                # The decoder already verified the checksum.
+                yield handler._finish_message(frame.payload, None, None)
+
+
+class _WorkerPool:
+    """Fixed set of threads running handlers for messages decoded by the I/O loops.
+
+    Ready connections wait in a FIFO; a worker takes one, handles its oldest
+    message and puts it back at the tail if more are waiting, so busy clients
+    share the pool round-robin and no client is handled by two workers at once.
+    """
+
+    def __init__(self, factory, workers, max_queue):
+        self._factory = factory
+        self.workers = workers
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._ready = collections.deque()
+        self._queued = 0
+        self._peak = 0
+        self._handled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._running = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"jsocket-pool-{i}", daemon=True) for i in range(workers)
+        ]
+
+    def start(self):
+        self._running = True
+        for thread in self._threads:
+            if not thread.is_alive():
+                thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=5)
+
+    def submit(self, conn, obj, size, codec=None) -> bool:
+        """Queue a message for `conn`.
+
+        @param codec id of the reply codec; the I/O thread moves on to later frames
+                     before a worker answers this one, so it is chosen now
+        @retval False if the queue is now full and the caller should stop reading
+        """
+        with self._cond:
+            conn.pending.append((obj, size, codec, time.monotonic()))
+            self._queued += 1
+            self._peak = max(self._peak, self._queued)
+            if not conn.scheduled:
+                conn.scheduled = True
+                self._ready.append(conn)
+                self._cond.notify()
+            return self._queued < self.max_queue
+
+    def has_room(self) -> bool:
+        with self._cond:
+            return self._queued < self.max_queue
+
+    def discard(self, conn):
+        """Drop messages still queued for a closed connection."""
+        with self._cond:
+            conn.closed = True
+            self._queued -= len(conn.pending)
+            conn.pending.clear()
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._running:
+                    return None, None, False
+                conn = self._ready.popleft()
+                if conn.pending:
+                    break
+                conn.scheduled = False
+            obj, size, codec, queued_at = conn.pending.popleft()
+            was_full = self._queued >= self.max_queue
+            self._queued -= 1
+            waited = time.monotonic() - queued_at
+            self._handled += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            return conn, (obj, size, codec), was_full
+
+    def _run(self):
+        while True:
+            conn, item, was_full = self._next()
+            if conn is None:
+                return
+            if was_full:
+                self._factory._resume_reading()
+            ok = self._factory._dispatch(conn.handler, *item)
+            with self._cond:
+                if conn.pending and not conn.closed:
+                    self._ready.append(conn)
+                    self._cond.notify()
+                else:
+                    conn.scheduled = False
+            if conn.closed:
+                continue
+            try:
+                flushed = ok and conn.try_flush()
+            except OSError:
+                flushed = False
+            if not flushed:
+                conn.loop.post(conn, "flush" if ok else "close")
+
+    def stats(self) -> dict:
+        with self._cond:
+            handled = self._handled
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "queue_depth_peak": self._peak,
+                "messages_handled": handled,
+                "queue_wait_avg_ms": (self._wait_total / handled * 1000.0) if handled else 0.0,
+                "queue_wait_max_ms": self._wait_max * 1000.0,
+            }
+
+
+class _SelectorLoop(threading.Thread):
+    """One I/O thread multiplexing a share of the factory's connections."""
+
+    def __init__(self, factory, index):
+        super().__init__(name=f"jsocket-selector-{index}", daemon=True)
+        self._factory = factory
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self._pending = collections.deque()
+        self._posted = collections.deque()
+        self._paused = {}
+        self._conns = {}
+        self._conns_lock = threading.Lock()
+        self._scratch = bytearray(jsocket_base.RECV_BUFFER_SIZE)
+        self._running = False
+
+    def add(self, handler):
+        """Hand an accepted connection (owned by `handler`) to this loop."""
+        self._pending.append(handler)
+        self._wake()
+
+    def post(self, conn, action):
+        """Ask the loop thread to "flush", "close" or "resume" (conn may be None) from another thread."""
+        self._posted.append((conn, action))
+        self._wake()
+
+    def stop(self):
+        self._running = False
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_w.send(b"\x00")
+        except OSError:
+            pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(1024):
+                pass
+        except OSError:
+            pass
+
+    def handlers(self):
+        with self._conns_lock:
+            return [conn.handler for conn in self._conns.values()]
+
+    def __len__(self):
+        return len(self._conns) + len(self._pending)
+
+    def start(self):
+        self._running = True
+        super().start()
+
+    def run(self):
+        while self._running:
+            try:
+                events = self._selector.select()
+            except OSError as e:
+                logger.debug("selector error in %s: %s", self.name, e)
+                continue
+            for key, mask in events:
+                conn = key.data
+                if conn is None:
+                    self._drain_wakeup()
+                    continue
+                if mask & selectors.EVENT_READ:
+                    self._on_readable(conn)
+                if mask & selectors.EVENT_WRITE and self._owns(conn):
+                    self._flush(conn)
+            self._run_posted()
+            self._register_pending()
+        for conn in list(self._conns.values()):
+            self._close(conn)
+        while self._pending:
+            handler = self._pending.popleft()
+            _note_disconnect(handler)
+            handler._close_connection()
+            self._factory._archive_thread_stats(handler)
+        self._selector.close()
+        for sock in (self._wakeup_r, self._wakeup_w):
+            sock.close()
+
+    def _owns(self, conn) -> bool:
+        # File descriptors are reused, so compare the connection object too.
+        return self._conns.get(conn.fd) is conn
+
+    def _register_pending(self):
+        while self._pending:
+            handler = self._pending.popleft()
+            try:
+                handler.conn.setblocking(False)
+                conn = _SelectorConnection(handler, handler.conn, self)
+                self._selector.register(conn.sock, selectors.EVENT_READ, conn)
+            except (OSError, ValueError) as e:
+                logger.debug("failed to register connection: %s", e)
+                _note_disconnect(handler)
+                handler._close_connection()
+                self._factory._archive_thread_stats(handler)
+                continue
+            with self._conns_lock:
+                self._conns[conn.fd] = conn
+
+    def _run_posted(self):
+        while self._posted:
+            conn, action = self._posted.popleft()
+            if action == "resume":
+                self._resume()
+            elif self._owns(conn):
+                self._flush(conn)
+                if action == "close" and self._owns(conn):
+                    self._close(conn)
+
+    def _resume(self):
+        pool = self._factory._pool
+        for fd, conn in list(self._paused.items()):
+            if not pool.has_room():
+                return
+            del self._paused[fd]
+            conn.paused = False
+            if self._owns(conn):
+                self._process_frames(conn)
+
+    def _on_readable(self, conn):
+        try:
+            nbytes = conn.sock.recv_into(self._scratch)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.info("client connection broken (%s), closing connection", e)
+            self._close(conn)
+            return
+        if nbytes == 0:
+            logger.info("client connection broken, closing connection")
+            self._close(conn)
+            return
+        conn.decoder.append(memoryview(self._scratch)[:nbytes])
+        self._process_frames(conn)
+
+    def _process_frames(self, conn):
+        """Handle (or queue for the pool) every complete frame buffered in conn.decoder."""
+        handler = conn.handler
+        pool = self._factory._pool
+        if pool is not None and not pool.has_room():
+            self._pause(conn)
+            self._flush(conn)
+            return
+        try:
+            for obj, control in conn.frames(raw=self._factory._processes > 0):
+                if control:
+                    handler._handle_control(obj)
+                elif pool is not None:
+                    if not pool.submit(conn, obj, handler._last_read_size, handler._send_codec().codec_id):
+                        self._pause(conn)
+                        break
+                elif not handler._dispatch_message(obj):
+                    self._flush(conn)
+                    self._close(conn)
+                    return
+        except jsocket_base.FramingError as e:
+            _note_framing_failure(handler, e)
+            logger.debug("framing error (%s): %s", type(e).__name__, e)
+            self._close(conn)
+            return
+        self._flush(conn)
+
+    def _pause(self, conn):
+        # Queue full: leave the rest unread until a worker frees a slot.
+        conn.paused = True
+        self._paused[conn.fd] = conn
+
+    def _flush(self, conn):
+        try:
+            conn.try_flush()
+        except OSError as e:
+            logger.info("client connection broken (%s), closing connection", e)
+            _note_failure(conn.handler, "bad_write")
+            self._close(conn)
+            return
+        with conn.out_lock:
+            queued = len(conn.outbuf)
+        events = 0
+        if not conn.paused and queued < SEND_HIGH_WATER:
+            events |= selectors.EVENT_READ
+        if queued:
+            events |= selectors.EVENT_WRITE
+        if events == conn.events or not self._owns(conn):
+            return
+        # A paused connection with nothing to write is dropped from the selector until resumed.
+        if not conn.events:
+            self._selector.register(conn.sock, events, conn)
+        elif not events:
+            self._selector.unregister(conn.sock)
+        else:
+            self._selector.modify(conn.sock, events, conn)
+        conn.events = events
+
+    def _close(self, conn):
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.closed = True
+        handler = conn.handler
+        _note_disconnect(handler)
+        handler._close_connection()
+        # Archive before the connection stops counting as active, so stats never miss it.
+        self._factory._archive_thread_stats(handler)
+        with self._conns_lock:
+            self._conns.pop(conn.fd, None)
+        self._paused.pop(conn.fd, None)
+        if self._factory._pool is not None:
+            self._factory._pool.discard(conn)
+
+
+class SelectorServerFactory(ServerFactory):
+    """ServerFactory that multiplexes all clients over `io_threads` selector threads.
+
+    Takes the same ServerFactoryThread subclass and keyword arguments as
+    ServerFactory. By default _process_message runs on the I/O thread that owns
+    the connection, so a slow handler delays the other clients on that thread.
+    With workers=N it runs on a pool of N threads fed by a queue of at most
+    max_queue messages; once the queue is full, clients are not read until a
+    worker frees a slot. Idle clients are never timed out.
+
+    With processes=N, frames are only checksummed in this process: the raw
+    payload goes to one of N worker processes, which decodes it, runs
+    _process_message on its own handler instance and returns the encoded reply
+    frame. The handler class must be importable by the worker processes and
+    cannot share state with the server; stats are still kept here.
+    """
+
+    def __init__(
+        self, server_thread, io_threads=1, workers=0, max_queue=DEFAULT_MAX_QUEUE, processes=0, **kwargs
+    ):
+        io_threads = int(io_threads)
+        if io_threads < 1:
+            raise ValueError("io_threads must be at least 1")
+        workers = int(workers)
+        if workers < 0:
+            raise ValueError("workers must not be negative")
+        max_queue = int(max_queue)
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        processes = int(processes)
+        if processes < 0:
+            raise ValueError("processes must not be negative")
+        # Built for many clients, so default to the largest accept queue the kernel allows.
+        kwargs.setdefault("backlog", socket.SOMAXCONN)
+        ServerFactory.__init__(self, server_thread, **kwargs)
+        self._loops = [_SelectorLoop(self, i) for i in range(io_threads)]
+        self._processes = processes
+        self._executor = None
+        # Each pool thread waits on one process at a time, so default to one thread per process.
+        workers = workers or processes
+        self._pool = _WorkerPool(self, workers, max_queue) if workers else None
+
+    def start(self):
+        if self._processes and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._processes,
+                initializer=_init_process,
+                initargs=(self._thread_type, self._thread_args),
+            )
+        if self._pool is not None:
+            self._pool.start()
+        for loop in self._loops:
+            if not loop.is_alive():
+                loop.start()
+        super().start()
+
+    def _start_worker(self, conn):
+        """Wrap the connection in an unstarted handler and give it to the least busy loop."""
+        handler = self._thread_type(**self._thread_args)
+        handler.swap_socket(conn)
+        loop = min(self._loops, key=len)
+        loop.add(handler)
+        return handler
+
+    def _dispatch(self, handler, obj, size, codec=None) -> bool:
+        """Run one queued message for a pool worker.
+
+        @param codec id of the reply codec, chosen when the message was queued
+        @retval False if the connection should be closed
+        """
+        if self._executor is None:
+            return handler._dispatch_message(obj, size, codec)
+        try:
+            client_id, reply, reply_size = self._executor.submit(
+                _handle_in_process,
+                obj,
+                getattr(handler, "_zdict_id", None),
+                getattr(handler, "_peer_codecs", None),
+                getattr(handler, "_peer_integrity", None),
+                codec,
+            ).result()
+        except jsocket_base.FramingError as e:
+            _note_framing_failure(handler, e)
+            logger.debug("framing error in worker process (%s): %s", type(e).__name__, e)
+            return False
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.debug("worker process handler error (%s): %s", type(e).__name__, e)
+            _note_message_in(handler, size)
+            _note_failure(handler, "handler")
+            return False
+        if client_id:
+            _set_client_identity(handler, client_id)
+        _note_message_in(handler, size)
+        if reply is not None:
+            handler._send_parts((reply,))
+            _note_message_out(handler, reply_size)
+        return True
+
+    def _resume_reading(self):
+        """Called by a pool worker when the full queue gets a free slot."""
+        for loop in self._loops:
+            loop.post(None, "resume")
+
+    def _live_workers(self):
+        handlers = []
+        for loop in self._loops:
+            handlers.extend(loop.handlers())
+        return handlers
+
+    def _purge_threads(self):
+        # Handlers are tracked by the I/O loops, not in _threads.
+        with self._threads_lock:
+            self._threads = []
+
+    def stop_all(self):
+        """Close every connection and stop the I/O and pool threads."""
+        for loop in self._loops:
+            loop.stop()
+        for loop in self._loops:
+            if loop.is_alive() and loop is not threading.current_thread():
+                loop.join(timeout=5)
+        if self._pool is not None:
+            self._pool.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_client_stats(self) -> dict:
+        """Per-client stats as for ServerFactory, plus "pool" queue stats when workers are used.
+
+        "pool" reports workers, max_queue, the current and peak queue_depth, the number
+        of messages handled and their average and worst wait in the queue (ms).
+        """
+        stats = super().get_client_stats()
+        if self._pool is not None:
+            stats["pool"] = self._pool.stats()
+        return stats
+
+    def _get_num_of_active_threads(self):
+        return sum(len(loop) for loop in self._loops if loop.is_alive())
+
+    active = property(_get_num_of_active_threads, doc="number of open client connections")
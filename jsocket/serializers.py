@@ -0,0 +1,115 @@
+""" @namespace serializers
+    Codec registry used by JsonSocket to encode and decode frame payloads.
+
+    Every frame names the codec that produced its payload, so peers with
+    different codecs installed can share a connection: stdlib json is always
+    available and is the fallback; orjson, msgpack and cbor2 are registered
+    when they can be imported.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import json
+import threading
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+JSON_CODEC = "json"
+JSON_CODEC_ID = 0
+
+Codec = namedtuple("Codec", ["name", "codec_id", "encode", "decode"])
+"""A payload codec: encode(obj) -> bytes and decode(bytes-like) -> obj."""
+
+# Writers serialize on the lock and swap in new dicts; readers never lock.
+_codecs_lock = threading.Lock()
+_codecs_by_name = {}
+_codecs_by_id = {}
+
+
+def register_codec(name, codec_id, encode, decode) -> Codec:
+    """Register a payload codec under `name` and wire id `codec_id` (0-255).
+
+    Decoders should raise UnicodeDecodeError for bad text and ValueError for
+    malformed documents; JsonSocket maps both onto FramingError.
+    """
+    global _codecs_by_name, _codecs_by_id  # pylint: disable=global-statement
+    codec_id = int(codec_id)
+    if not 0 <= codec_id <= 0xFF:
+        raise ValueError("codec_id must fit in one byte")
+    codec = Codec(name, codec_id, encode, decode)
+    with _codecs_lock:
+        existing = _codecs_by_id.get(codec_id)
+        if existing is not None and existing.name != name:
+            raise ValueError(f"codec id {codec_id} already registered as {existing.name!r}")
+        _codecs_by_name = {**_codecs_by_name, name: codec}
+        _codecs_by_id = {**_codecs_by_id, codec_id: codec}
+    return codec
+
+
+def get_codec(key) -> Codec:
+    """Look up a registered codec by name or wire id; raise KeyError if unknown."""
+    if isinstance(key, Codec):
+        return key
+    if isinstance(key, int):
+        return _codecs_by_id[key]
+    return _codecs_by_name[key]
+
+
+def available_codecs() -> list:
+    """Return the names of all registered codecs ordered by wire id."""
+    by_id = _codecs_by_id
+    return [by_id[cid].name for cid in sorted(by_id)]
+
+
+def _json_encode(obj):
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_decode(data):
+    return json.loads(str(data, "utf-8"))
+
+
+register_codec(JSON_CODEC, JSON_CODEC_ID, _json_encode, _json_decode)
+
+if orjson is not None:
+    register_codec("orjson", 1, orjson.dumps, orjson.loads)
+
+if msgpack is not None:
+    register_codec(
+        "msgpack",
+        2,
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+if cbor2 is not None:
+    register_codec("cbor", 3, cbor2.dumps, lambda data: cbor2.loads(bytes(data)))
@@ -0,0 +1,294 @@
+""" @namespace shm
+    Shared-memory side channel for large frame payloads between processes on one host.
+
+    The sender copies the encoded payload into a POSIX shared memory segment
+    and sends only a small descriptor frame; the receiver copies the payload
+    out of its mapping. Segments come from a small per-connection pool owned by
+    the sender and stay mapped on both sides, so repeated transfers avoid fresh
+    page faults. The receiver hands a pooled segment back with a "shm_release"
+    control frame that rides along with the next frame it sends. When every
+    pooled segment is still out (e.g. the peer never replies), a one-shot
+    segment is used instead, which the receiver unlinks after reading; a
+    one-shot descriptor that is never read leaves its segment behind.
+
+    The last byte of a pooled segment is an acknowledgement the receiver sets
+    once it has copied the payload out. Closing a pool unlinks the segments the
+    peer has read; the others linger until it acknowledges them or
+    DEFAULT_SHM_LINGER seconds pass, so a payload sent just before close() is
+    still there when the peer gets to its descriptor.
+"""
+__author__   = "Christopher Piekarski"
+__email__    = "chris@cpiekarski.com"
+__copyright__= """
+    Copyright (C) 2011 by
+    Christopher Piekarski <chris@cpiekarski.com>
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import atexit
+import collections
+import os
+import re
+import secrets
+import struct
+import sys
+import threading
+import time
+
+try:
+    import _posixshmem
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # pragma: no cover - platforms without POSIX shared memory
+    _posixshmem = resource_tracker = shared_memory = None
+
+DEFAULT_SHM_THRESHOLD = 1024 * 1024
+DEFAULT_SHM_SEGMENTS = 4
+# Seconds a closed pool keeps segments the peer has not acknowledged yet.
+DEFAULT_SHM_LINGER = 30.0
+_LINGER_POLL = 0.05
+SEGMENT_PREFIX = "jsk_"
+# Descriptor sent in place of the payload: payload size, integrity mode, pooled flag,
+# checksum, then the segment name.
+DESCRIPTOR_FMT = "!QBBI"
+DESCRIPTOR_SIZE = struct.calcsize(DESCRIPTOR_FMT)
+# Mappings of a peer's pooled segments kept open by a receiver.
+_MAX_MAPPINGS = 16
+
+# Only names this module generates are accepted, so a peer cannot make us map or unlink other segments.
+_SEGMENT_NAME_RE = re.compile(r"^" + SEGMENT_PREFIX + r"[0-9a-f]{16}$")
+# Segments are kept away from multiprocessing's resource tracker: ownership moves between
+# processes, and a peer in the same process would otherwise unregister a name twice.
+# Python 3.13 can skip tracking; earlier versions register every segment they open.
+_HAS_TRACK = sys.version_info >= (3, 13)
+
+
+def available() -> bool:
+    """True when POSIX shared memory segments can be used on this platform."""
+    return shared_memory is not None and os.name == "posix"
+
+
+def _untracked(name, create=False, size=0):
+    if _HAS_TRACK:
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")  # pylint: disable=protected-access
+    return segment
+
+
+def _create(size):
+    return _untracked(SEGMENT_PREFIX + secrets.token_hex(8), create=True, size=size)
+
+
+def _attach(name):
+    if not isinstance(name, str) or not _SEGMENT_NAME_RE.match(name):
+        raise ValueError(f"invalid shared memory segment name {name!r}")
+    return _untracked(name)
+
+
+def _unlink(segment):
+    # SharedMemory.unlink() would also unregister the name from the tracker.
+    try:
+        _posixshmem.shm_unlink(segment._name)  # pylint: disable=protected-access
+    except FileNotFoundError:
+        pass
+
+
+def _segment_size(size) -> int:
+    # Round up to a power of two so a pooled segment fits somewhat larger payloads later.
+    return 1 << max(12, (size - 1).bit_length())
+
+
+def _acknowledged(segment) -> bool:
+    """True once the receiver has copied the current payload out of a pooled segment."""
+    return segment.buf[segment.size - 1] == 1
+
+
+def _destroy(segment):
+    segment.close()
+    _unlink(segment)
+
+
+class _Lingerer:
+    """Unlinks segments of closed pools once the peer acknowledges them or their time is up."""
+
+    def __init__(self):
+        self._segments = []  # (segment, deadline)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def add(self, segments, linger):
+        deadline = time.monotonic() + linger
+        with self._cond:
+            self._segments.extend((segment, deadline) for segment in segments)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jsocket-shm-linger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while self._segments:
+                now = time.monotonic()
+                waiting = []
+                for segment, deadline in self._segments:
+                    if now >= deadline or _acknowledged(segment):
+                        _destroy(segment)
+                    else:
+                        waiting.append((segment, deadline))
+                self._segments = waiting
+                if waiting:
+                    self._cond.wait(_LINGER_POLL)
+            self._thread = None
+
+    def flush(self):
+        """Unlink every lingering segment now (at interpreter exit)."""
+        with self._cond:
+            segments, self._segments = self._segments, []
+        for segment, _ in segments:
+            _destroy(segment)
+
+
+_lingerer = _Lingerer()
+atexit.register(_lingerer.flush)
+
+
+class SegmentPool:
+    """Sender side: a few reusable segments, each lent out for one payload at a time."""
+
+    def __init__(self, max_segments=DEFAULT_SHM_SEGMENTS):
+        self._max_segments = max_segments
+        self._segments = {}
+        self._busy = set()
+        self._lock = threading.Lock()
+
+    def write(self, payload):
+        """Copy `payload` into a segment; return (name, pooled).
+
+        A pooled segment stays ours until release(); otherwise the segment is
+        one-shot and the receiver unlinks it.
+        """
+        size = len(payload)
+        with self._lock:
+            # Pooled segments keep their last byte for the receiver's acknowledgement.
+            segment = next(
+                (seg for name, seg in self._segments.items() if name not in self._busy and seg.size > size),
+                None,
+            )
+            if segment is None and len(self._segments) < self._max_segments:
+                segment = _create(_segment_size(size + 1))
+                self._segments[segment.name] = segment
+            if segment is not None:
+                self._busy.add(segment.name)
+        if segment is None:
+            segment = _create(size)
+            try:
+                segment.buf[:size] = payload
+            finally:
+                segment.close()
+            return segment.name, False
+        segment.buf[segment.size - 1] = 0
+        segment.buf[:size] = payload
+        return segment.name, True
+
+    def release(self, names):
+        """Make pooled segments the peer has finished reading available again."""
+        with self._lock:
+            for name in names:
+                self._busy.discard(name)
+
+    def close(self, linger=None):
+        """Unlink the segments; ones the peer has not read yet are left to linger.
+
+        @param linger seconds an unacknowledged segment is kept (default DEFAULT_SHM_LINGER)
+        """
+        with self._lock:
+            segments = self._segments
+            busy = self._busy
+            self._segments = {}
+            self._busy = set()
+        lent = []
+        for name, segment in segments.items():
+            if name in busy and not _acknowledged(segment):
+                lent.append(segment)
+            else:
+                _destroy(segment)
+        if lent:
+            _lingerer.add(lent, DEFAULT_SHM_LINGER if linger is None else linger)
+
+
+class SegmentReader:
+    """Receiver side: copies payloads out of the peer's segments, keeping pooled ones mapped."""
+
+    def __init__(self):
+        self._mappings = collections.OrderedDict()
+
+    def read(self, name, size, pooled) -> bytes:
+        """Return `size` bytes from segment `name`; one-shot segments are unlinked.
+
+        @raises ValueError for names not made by this module or a segment smaller than `size`
+        @raises OSError if the segment does not exist
+        """
+        if not pooled:
+            segment = _attach(name)
+            try:
+                if segment.size < size:
+                    raise ValueError(f"shared memory segment {name} is smaller than {size} bytes")
+                return bytes(segment.buf[:size])
+            finally:
+                segment.close()
+                _unlink(segment)
+        segment = self._mappings.get(name)
+        if segment is None:
+            segment = _attach(name)
+            self._mappings[name] = segment
+            if len(self._mappings) > _MAX_MAPPINGS:
+                self._mappings.popitem(last=False)[1].close()
+        else:
+            self._mappings.move_to_end(name)
+        if segment.size <= size:
+            raise ValueError(f"shared memory segment {name} is too small for {size} bytes")
+        payload = bytes(segment.buf[:size])
+        # Tell the sender it may unlink the segment even if our release never reaches it.
+        segment.buf[segment.size - 1] = 1
+        return payload
+
+    def discard(self, name, pooled):
+        """Drop a segment without reading it (unlinking it if it is one-shot)."""
+        if pooled:
+            return
+        try:
+            segment = _attach(name)
+        except (OSError, ValueError):
+            return
+        segment.close()
+        _unlink(segment)
+
+    def close(self):
+        while self._mappings:
+            self._mappings.popitem()[1].close()
+
+
+def pack_descriptor(name, size, mode, checksum, pooled) -> bytes:
+    """Build the descriptor frame body for a payload of `size` bytes stored in segment `name`."""
+    return struct.pack(DESCRIPTOR_FMT, size, mode, int(pooled), checksum) + name.encode("ascii")
+
+
+def unpack_descriptor(data):
+    """Return (name, size, mode, checksum, pooled) from a descriptor; raises ValueError if malformed."""
+    if len(data) <= DESCRIPTOR_SIZE:
+        raise ValueError("shared memory descriptor too short")
+    size, mode, pooled, checksum = struct.unpack(DESCRIPTOR_FMT, bytes(data[:DESCRIPTOR_SIZE]))
+    try:
+        name = bytes(data[DESCRIPTOR_SIZE:]).decode("ascii")
+    except UnicodeDecodeError as e:
+        raise ValueError("invalid shared memory segment name") from e
+    return name, size, mode, checksum, bool(pooled)
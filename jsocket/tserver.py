@@ -27,13 +27,18 @@ import time
 import logging
 import abc
 from typing import Optional
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 
 from jsocket import jsocket_base
+from jsocket import mux
 from ._version import __version__
 
 logger = logging.getLogger("jsocket.tserver")
 
+# Most connections accepted per wakeup of the factory's accept loop.
+DEFAULT_ACCEPT_BATCH = 32
+
 
 def _response_summary(resp_obj) -> str:
     if isinstance(resp_obj, dict):
@@ -53,6 +58,21 @@ def _format_client_id(addr) -> str:
         return "unknown"
 
 
+def _peer_client_id(sock, addr=None) -> str:
+    """Client id for a connection: host:port for TCP, the peer's pid and uid for Unix sockets."""
+    if getattr(sock, "family", None) == getattr(socket, "AF_UNIX", None):
+        creds = jsocket_base.peer_credentials(sock)
+        if creds is not None:
+            return f"unix:pid={creds[0]},uid={creds[1]}"
+        return f"unix:{addr}" if isinstance(addr, str) and addr else "unix:unnamed"
+    if addr is None:
+        try:
+            addr = sock.getpeername()
+        except (OSError, AttributeError):
+            addr = None
+    return _format_client_id(addr)
+
+
 def _now_ts() -> float:
     return time.time()
 
@@ -68,6 +88,7 @@ def _new_failure_counts() -> dict:
         "invalid_json": 0,
         "handler": 0,
         "framing": 0,
+        "upstream": 0,
     }
 
 
@@ -90,6 +111,18 @@ def _new_client_stats(client_id: str) -> dict:
     }
 
 
+def _new_accept_stats() -> dict:
+    return {
+        "accepted": 0,
+        "wakeups": 0,
+        "max_batch": 0,
+        "queue_len_peak": 0,
+        "handoffs": 0,
+        "handoff_total": 0.0,
+        "handoff_max": 0.0,
+    }
+
+
 def _clone_client_stats(stats: dict) -> dict:
     return {
         **stats,
@@ -218,13 +251,13 @@ def _note_failure(obj, kind: str) -> None:
 
 
 def _framing_failure_kind(error: Exception) -> str:
-    msg = str(error)
-    if "invalid message header magic" in msg:
+    if isinstance(error, jsocket_base.BadHeaderError):
         return "bad_header"
-    if "checksum mismatch" in msg:
+    if isinstance(error, jsocket_base.ChecksumError):
         return "bad_crc"
-    if "exceeds max_message_size" in msg:
+    if isinstance(error, jsocket_base.MessageTooLargeError):
         return "oversize"
+    msg = str(error)
     if "invalid UTF-8 payload" in msg:
         return "invalid_utf8"
     if "invalid JSON payload" in msg:
@@ -438,9 +471,13 @@ class ThreadedServer(threading.Thread, jsocket_base.JsonServer, metaclass=abc.AB
         self._wakeup_r = None
         self._wakeup_w = None
 
-    def _wait_for_accept(self) -> bool:
-        """Block until a client can be accepted or a wakeup is signaled."""
-        sock = getattr(self, "socket", None)
+    def _wait_for_accept(self, sock=None) -> bool:
+        """Block until a client can be accepted or a wakeup is signaled.
+
+        @param sock listening socket to wait on; defaults to the server socket
+        """
+        if sock is None:
+            sock = getattr(self, "socket", None)
         wake = getattr(self, "_wakeup_r", None)
         if sock is None or wake is None:
             return True
@@ -450,14 +487,32 @@ class ThreadedServer(threading.Thread, jsocket_base.JsonServer, metaclass=abc.AB
         except OSError as e:
             logger.debug("listen error on %s:%s: %s", self.address, self.port, e)
             return False
+        # poll has no FD_SETSIZE limit, unlike select, so it works in busy processes
+        # where the listening socket's descriptor is above 1024.
+        poller = None
+        if hasattr(select, "poll"):
+            try:
+                poller = select.poll()
+                poller.register(sock, select.POLLIN)
+                poller.register(wake, select.POLLIN)
+            except (OSError, ValueError, TypeError) as e:
+                logger.debug("poll setup error on %s:%s: %s", self.address, self.port, e)
+                return False
         while getattr(self, "_is_alive", False):
             try:
-                readable, _, _ = select.select([sock, wake], [], [], None)
+                if poller is None:
+                    readable, _, _ = select.select([sock, wake], [], [], None)
+                else:
+                    ready = {fd for fd, _ in poller.poll()}
+                    readable = [s for s in (sock, wake) if s.fileno() in ready]
             except (OSError, ValueError) as e:
-                logger.debug("select error on %s:%s: %s", self.address, self.port, e)
+                logger.debug("poll error on %s:%s: %s", self.address, self.port, e)
                 return False
             if wake in readable:
-                self._drain_wakeup()
+                # When stopping, leave the wakeup byte unread so every thread
+                # polling it (see ServerFactory acceptors) wakes up too.
+                if getattr(self, "_is_alive", False):
+                    self._drain_wakeup()
                 return False
             if sock in readable:
                 return True
@@ -476,13 +531,7 @@ class ThreadedServer(threading.Thread, jsocket_base.JsonServer, metaclass=abc.AB
         return None
 
     def _record_client_start(self):
-        addr = getattr(self, "_last_client_addr", None)
-        if addr is None:
-            try:
-                addr = self.conn.getpeername()
-            except OSError:
-                addr = None
-        client_id = _format_client_id(addr)
+        client_id = _peer_client_id(getattr(self, "conn", None), getattr(self, "_last_client_addr", None))
         with self._stats_lock:
             self._client_started_at = time.monotonic()
             self._client_id = client_id
@@ -505,6 +554,13 @@ class ThreadedServer(threading.Thread, jsocket_base.JsonServer, metaclass=abc.AB
         connected = sum(1 for stats in clients.values() if stats.get("connected"))
         return {"connected_clients": connected, "clients": clients}
 
+    def send_many(self, objs, codec=None) -> list:
+        """Send several objects in one write, counting each in the client's stats."""
+        sizes = jsocket_base.JsonSocket.send_many(self, objs, codec)
+        for size in sizes:
+            _note_message_out(self, size)
+        return sizes
+
     def _accept_client(self) -> bool:
         """Accept an incoming connection; return True when a client connects."""
         if not self._wait_for_accept():
@@ -615,10 +671,22 @@ class ThreadedServer(threading.Thread, jsocket_base.JsonServer, metaclass=abc.AB
 
 
 class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=abc.ABCMeta):
-    """Per-connection worker thread used by ServerFactory."""
+    """Per-connection worker thread used by ServerFactory.
+
+    With multiplex=True, requests wrapped by jsocket.mux.MultiplexClient are answered
+    with their correlation id; multiplex_workers > 1 handles them concurrently, so
+    replies may leave out of order. Plain messages are handled as usual.
+
+    With raw_frames=True, payloads are not decoded: each one is passed as bytes to
+    _process_raw, whose bytes reply is framed as is. Client ids then come from the
+    peer address only, and multiplex envelopes are not unwrapped.
+    """
 
     def __init__(self, **kwargs):
         create_socket = kwargs.pop("create_socket", False)
+        self._multiplex = bool(kwargs.pop("multiplex", False))
+        self._multiplex_workers = int(kwargs.pop("multiplex_workers", 1))
+        self._raw_frames = bool(kwargs.pop("raw_frames", False))
         thread_kwargs = {}
         for key in ("group", "target", "name", "args", "kwargs", "daemon"):
             if key in kwargs:
@@ -633,6 +701,8 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
         self._client_id = None
         self._client_stats = {}
         self._active_client_id = None
+        self._send_lock = threading.Lock()
+        self._executor = None
 
     def swap_socket(self, new_sock):
         """ Swaps the existing socket with a new one. Useful for setting socket after a new connection.
@@ -648,17 +718,18 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
                 pass
         self.socket = new_sock
         self.conn = self.socket
+        self._reset_connection_state()
+        try:
+            self._apply_socket_options(new_sock)
+        except (OSError, AttributeError):
+            pass
         try:
             timeout = getattr(self, "_recv_timeout", getattr(self, "_timeout", None))
             if timeout is not None:
                 self.socket.settimeout(timeout)
         except OSError:
             pass
-        try:
-            addr = new_sock.getpeername()
-        except OSError:
-            addr = None
-        self._client_id = _format_client_id(addr)
+        self._client_id = _peer_client_id(new_sock)
         self._client_started_at = time.monotonic()
         _note_connect(self, self._client_id)
 
@@ -666,9 +737,14 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
         """ Should exit when client closes socket conn.
             Can force an exit with force_stop.
         """
+        if getattr(self, "_multiplex", False) and getattr(self, "_multiplex_workers", 1) > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._multiplex_workers, thread_name_prefix=f"{self.name}-mux"
+            )
+        read = self.read_raw if getattr(self, "_raw_frames", False) else self.read_obj
         while self._is_alive:
             try:
-                obj = self.read_obj()
+                obj = read()
             except socket.timeout as e:
                 logger.debug("worker read timeout waiting for data: %s", e)
                 _note_failure(self, "timeout")
@@ -687,36 +763,102 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
                     _note_failure(self, "handler")
                 self._is_alive = False
                 break
-            client_id = _extract_client_id(obj)
-            if client_id:
-                _set_client_identity(self, client_id)
-            _note_message_in(self, getattr(self, "_last_read_size", None))
-            try:
-                resp_obj = self._process_message(obj)
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                logger.debug("worker handler error (%s): %s", type(e).__name__, e)
-                _note_failure(self, "handler")
-                self._is_alive = False
+            if not self._dispatch_message(obj):
                 break
-            if resp_obj is not None:
-                logger.debug("sending response (%s)", _response_summary(resp_obj))
-                try:
-                    self.send_obj(resp_obj)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    msg = str(e)
-                    if isinstance(e, RuntimeError) and "socket connection broken" in msg:
-                        logger.info("client connection broken, closing connection")
-                    else:
-                        logger.debug("worker send error (%s): %s", type(e).__name__, e)
-                    _note_failure(self, "bad_write")
-                    self._is_alive = False
-                    break
-                _note_message_out(self, getattr(self, "_last_send_size", None))
+        if getattr(self, "_executor", None) is not None:
+            # Let queued calls finish so their replies still go out before closing.
+            self._executor.shutdown(wait=True)
+            self._executor = None
         _note_disconnect(self)
         self._close_connection()
         if hasattr(self, "socket"):
             self._close_socket()
 
+    def _dispatch_message(self, obj, size=None, codec=None) -> bool:
+        """Handle one message: update stats, run _process_message and send the reply.
+
+        With raw_frames, `obj` is the undecoded payload and goes to _process_raw instead.
+        @param size wire size of the message; defaults to the size of the last read
+        @param codec codec for the reply, chosen when the message was read; defaults to _send_codec()
+        @retval False if the connection should be closed
+        """
+        raw = getattr(self, "_raw_frames", False)
+        envelope = not raw and getattr(self, "_multiplex", False) and mux.is_envelope(obj)
+        if not raw:
+            client_id = _extract_client_id(obj.get(mux.MUX_BODY_KEY) if envelope else obj)
+            if client_id:
+                _set_client_identity(self, client_id)
+        if size is None:
+            size = getattr(self, "_last_read_size", None)
+        _note_message_in(self, size)
+        if envelope:
+            # Pick the reply codec now: executor threads must not read _last_read_codec later.
+            if codec is None:
+                codec = self._send_codec()
+            if getattr(self, "_executor", None) is not None:
+                self._executor.submit(self._answer_envelope, obj, codec)
+                return True
+            return self._answer_envelope(obj, codec)
+        try:
+            resp_obj = self._process_raw(obj) if raw else self._process_message(obj)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.debug("worker handler error (%s): %s", type(e).__name__, e)
+            _note_failure(self, "handler")
+            self._is_alive = False
+            return False
+        if resp_obj is not None:
+            logger.debug("sending response (%s)", _response_summary(resp_obj))
+            try:
+                # Executor threads may be writing multiplexed replies to the same connection.
+                with getattr(self, "_send_lock", None) or nullcontext():
+                    if raw:
+                        self.send_raw(resp_obj, codec)
+                    elif codec is None:
+                        self.send_obj(resp_obj)
+                    else:
+                        self._send_parts(self._encode_frame(resp_obj, codec=codec))
+                    size = getattr(self, "_last_send_size", None)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                msg = str(e)
+                if isinstance(e, RuntimeError) and "socket connection broken" in msg:
+                    logger.info("client connection broken, closing connection")
+                else:
+                    logger.debug("worker send error (%s): %s", type(e).__name__, e)
+                _note_failure(self, "bad_write")
+                self._is_alive = False
+                return False
+            _note_message_out(self, size)
+        return True
+
+    def _answer_envelope(self, envelope, codec=None) -> bool:
+        """Process one multiplexed request and send its reply tagged with the same id.
+
+        Handler errors are returned to the caller in the envelope instead of closing
+        the connection, since other calls may share it.
+        @param codec codec for the reply, chosen when the request was read
+        @retval False if the reply could not be written
+        """
+        mux_id = envelope[mux.MUX_ID_KEY]
+        try:
+            reply = mux.make_envelope(mux_id, self._process_message(envelope.get(mux.MUX_BODY_KEY)))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.debug("worker handler error (%s): %s", type(e).__name__, e)
+            _note_failure(self, "handler")
+            reply = mux.make_envelope(mux_id, error=f"{type(e).__name__}: {e}")
+        try:
+            with self._send_lock:
+                self.send_many([reply], codec)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            msg = str(e)
+            if isinstance(e, RuntimeError) and "socket connection broken" in msg:
+                logger.info("client connection broken, closing connection")
+            else:
+                logger.debug("worker send error (%s): %s", type(e).__name__, e)
+            _note_failure(self, "bad_write")
+            self._is_alive = False
+            return False
+        return True
+
     @abc.abstractmethod
     def _process_message(self, obj) -> Optional[dict]:
         """Pure Virtual Method - Implementer must define protocol
@@ -727,6 +869,21 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
         # Return None in the base class to satisfy linters; subclasses should override.
         return None
 
+    def _process_raw(self, payload) -> Optional[bytes]:
+        """Handle one undecoded payload when the worker runs with raw_frames=True.
+
+        Override to inspect or forward payloads without parsing them; read_codec names
+        their codec. The default decodes the payload, calls _process_message and
+        encodes its reply, so a worker behaves the same with or without raw_frames.
+        @param payload the message document as bytes, checksummed and decompressed
+        @retval None or the reply document as bytes, in the codec send_obj would use
+        """
+        obj = self._decode_payload(payload, getattr(self, "_last_read_codec", jsocket_base.JSON_CODEC_ID))
+        resp_obj = self._process_message(obj)
+        if resp_obj is None:
+            return None
+        return self._send_codec().encode(resp_obj)
+
     def start(self):
         """ Starts the factory thread. 
             The newly living know nothing of the dead
@@ -747,6 +904,13 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
         self._is_alive = False
         logger.debug("ServerFactoryThread stopped (%s)", self.name)
 
+    def send_many(self, objs, codec=None) -> list:
+        """Send several objects in one write, counting each in the client's stats."""
+        sizes = jsocket_base.JsonSocket.send_many(self, objs, codec)
+        for size in sizes:
+            _note_message_out(self, size)
+        return sizes
+
     def _get_client_stats_internal(self) -> dict:
         _ensure_stats_state(self)
         with _stats_guard(self):
@@ -754,7 +918,16 @@ class ServerFactoryThread(threading.Thread, jsocket_base.JsonSocket, metaclass=a
 
 
 class ServerFactory(ThreadedServer):
-    """Accepts clients and spawns a ServerFactoryThread per connection."""
+    """Accepts clients and spawns a ServerFactoryThread per connection.
+
+    Each time the listening socket becomes readable, up to accept_batch queued
+    connections are accepted and handed off before waiting again.
+
+    listeners=[(address, port), ...] adds endpoints besides address/port (a port
+    of None makes address a Unix socket path), and
+    acceptors=N runs N accept threads per endpoint. All of them start the same
+    worker type and share one stats archive.
+    """
     def __init__(self, server_thread, **kwargs):
         init_kwargs = {
             "address": kwargs["address"],
@@ -766,6 +939,12 @@ class ServerFactory(ThreadedServer):
             init_kwargs["accept_timeout"] = kwargs["accept_timeout"]
         if "recv_timeout" in kwargs:
             init_kwargs["recv_timeout"] = kwargs["recv_timeout"]
+        if "socket_options" in kwargs:
+            init_kwargs["socket_options"] = kwargs["socket_options"]
+        if "reuse_port" in kwargs:
+            init_kwargs["reuse_port"] = kwargs["reuse_port"]
+        if "backlog" in kwargs:
+            init_kwargs["backlog"] = kwargs["backlog"]
         ThreadedServer.__init__(self, **init_kwargs)
         if not issubclass(server_thread, ServerFactoryThread):
             raise TypeError("serverThread not of type", ServerFactoryThread)
@@ -777,6 +956,25 @@ class ServerFactory(ThreadedServer):
         self._thread_args.pop('address', None)
         self._thread_args.pop('port', None)
         self._thread_args.pop('accept_timeout', None)
+        self._thread_args.pop('reuse_port', None)
+        self._thread_args.pop('backlog', None)
+        self._accept_batch = int(self._thread_args.pop('accept_batch', DEFAULT_ACCEPT_BATCH))
+        if self._accept_batch < 1:
+            raise ValueError("accept_batch must be at least 1")
+        self._accept_stats = _new_accept_stats()
+        self._acceptors = int(self._thread_args.pop('acceptors', 1))
+        if self._acceptors < 1:
+            raise ValueError("acceptors must be at least 1")
+        self._extra_listeners = []
+        try:
+            for address, port in self._thread_args.pop('listeners', None) or ():
+                self._extra_listeners.append(
+                    jsocket_base.create_listener(address, port, reuse_port=self._reuse_port)
+                )
+        except OSError:
+            self.close()
+            self._close_wakeup()
+            raise
 
     def _process_message(self, obj) -> Optional[dict]:
         """ServerFactory does not process messages itself."""
@@ -787,6 +985,8 @@ class ServerFactory(ThreadedServer):
         # (tests may call run() in a separate thread without invoking start()).
         if not self._is_alive:
             self._is_alive = True
+        if getattr(self, "_extra_listeners", None) or getattr(self, "_acceptors", 1) > 1:
+            self._run_acceptors()
         while self._is_alive:
             self._purge_threads()
             while not self.connected and self._is_alive:
@@ -804,62 +1004,201 @@ class ServerFactory(ThreadedServer):
                         logger.debug("factory stopping; accept loop exiting (%s:%s)", self.address, self.port)
                     continue
                 else:
+                    accepted_at = time.monotonic()
                     # Hand off the accepted connection to the worker
                     accepted_conn = self.conn
                     # Reset server connection reference so we can accept again
                     self._reset_connection_ref()
-                    if not self._is_alive:
-                        # Server is stopping; close the accepted connection without spawning a worker.
-                        try:
-                            accepted_conn.shutdown(socket.SHUT_RDWR)
-                        except OSError:
-                            pass
-                        try:
-                            accepted_conn.close()
-                        except OSError:
-                            pass
-                        break
-                    try:
-                        tmp = self._thread_type(**self._thread_args)
-                        tmp.swap_socket(accepted_conn)
-                        tmp.start()
-                    except Exception as e:  # pylint: disable=broad-exception-caught
-                        # Worker construction/hand-off failed; ensure the accepted connection is closed
-                        try:
-                            accepted_conn.shutdown(socket.SHUT_RDWR)
-                        except OSError:
-                            pass
-                        try:
-                            accepted_conn.close()
-                        except OSError:
-                            pass
-                        if self._is_alive:
-                            logger.exception(
-                                "factory worker handoff error on %s:%s: %s",
-                                self.address,
-                                self.port,
-                                e,
-                            )
-                        else:
-                            logger.debug(
-                                "factory stopping; worker handoff aborted (%s:%s)",
-                                self.address,
-                                self.port,
-                            )
-                        # Continue accepting new connections
-                        continue
-                    with self._threads_lock:
-                        self._threads.append(tmp)
-                    try:
-                        addr = accepted_conn.getpeername()
-                    except OSError:
-                        addr = None
-                    logger.debug("factory spawned worker %s for %s", tmp.name, _format_client_id(addr))
+                    accepted = 1
+                    if self._hand_off(accepted_conn, accepted_at):
+                        accepted += self._drain_accept_queue()
+                    self._note_accept_batch(accepted)
                     break
 
         self._wait_to_exit()
         self.close()
 
+    def _listening_sockets(self) -> list:
+        sock = getattr(self, "socket", None)
+        sockets = [sock] if sock is not None else []
+        return sockets + list(getattr(self, "_extra_listeners", ()))
+
+    def _run_acceptors(self):
+        """Accept on every listener with `acceptors` threads each, this thread being one of them.
+
+        The listening sockets are made non-blocking, so when several threads wake for
+        the same connection the ones that lose the race find the queue empty and wait again.
+        """
+        self._listen()
+        for sock in self._extra_listeners:
+            sock.listen(self._backlog)
+        sockets = self._listening_sockets()
+        for sock in sockets:
+            sock.setblocking(False)
+        targets = [sock for sock in sockets for _ in range(self._acceptors)][1:]
+        threads = [
+            threading.Thread(
+                target=self._accept_loop, args=(sock,), name=f"{self.name}-acceptor-{i + 1}", daemon=True
+            )
+            for i, sock in enumerate(targets)
+        ]
+        for t in threads:
+            t.start()
+        self._accept_loop(self.socket)
+        for t in threads:
+            t.join()
+
+    def _accept_loop(self, sock):
+        while self._is_alive:
+            self._purge_threads()
+            if not self._wait_for_accept(sock):
+                continue
+            pending = self._accept_pending(self._accept_batch, sock)
+            if not pending:
+                continue
+            for conn, _addr in pending:
+                self._hand_off(conn, time.monotonic())
+            self._note_accept_batch(len(pending), sock)
+
+    def close(self):
+        """Close the listening sockets, including any extra listeners."""
+        super().close()
+        for sock in getattr(self, "_extra_listeners", ()):
+            jsocket_base.close_listener(sock)
+
+    def _get_listeners(self) -> list:
+        addresses = []
+        for sock in self._listening_sockets():
+            try:
+                addresses.append(sock.getsockname())
+            except OSError:
+                pass
+        return addresses
+
+    def _hand_off(self, accepted_conn, accepted_at=None) -> bool:
+        """Start a worker for an accepted connection, closing it if that is not possible.
+
+        @retval True if the factory should keep accepting
+        """
+        if not self._is_alive:
+            # Server is stopping; close the accepted connection without spawning a worker.
+            try:
+                accepted_conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                accepted_conn.close()
+            except OSError:
+                pass
+            return False
+        try:
+            tmp = self._start_worker(accepted_conn)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Worker construction/hand-off failed; ensure the accepted connection is closed
+            try:
+                accepted_conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                accepted_conn.close()
+            except OSError:
+                pass
+            if self._is_alive:
+                logger.exception(
+                    "factory worker handoff error on %s:%s: %s",
+                    self.address,
+                    self.port,
+                    e,
+                )
+            else:
+                logger.debug(
+                    "factory stopping; worker handoff aborted (%s:%s)",
+                    self.address,
+                    self.port,
+                )
+            # Continue accepting new connections
+            return True
+        if accepted_at is not None:
+            self._note_handoff(time.monotonic() - accepted_at)
+        with self._threads_lock:
+            self._threads.append(tmp)
+        logger.debug("factory spawned worker %s for %s", tmp.name, _peer_client_id(accepted_conn))
+        return True
+
+    def _drain_accept_queue(self) -> int:
+        """Accept and hand off connections already queued, up to accept_batch per wakeup.
+
+        @retval number of connections accepted
+        """
+        limit = getattr(self, "_accept_batch", DEFAULT_ACCEPT_BATCH) - 1
+        if limit <= 0 or not self._is_alive:
+            return 0
+        pending = self._accept_pending(limit)
+        for conn, _addr in pending:
+            # Once stopping, _hand_off closes each remaining connection.
+            self._hand_off(conn, time.monotonic())
+        return len(pending)
+
+    def _note_accept_batch(self, count, sock=None):
+        if sock is None:
+            sock = getattr(self, "socket", None)
+        queue = jsocket_base.accept_queue_info(sock)
+        with _stats_guard(self):
+            stats = self._get_accept_stats()
+            stats["accepted"] += count
+            stats["wakeups"] += 1
+            stats["max_batch"] = max(stats["max_batch"], count)
+            if queue is not None:
+                stats["queue_len_peak"] = max(stats["queue_len_peak"], queue[0] + count)
+
+    def _note_handoff(self, seconds):
+        with _stats_guard(self):
+            stats = self._get_accept_stats()
+            stats["handoffs"] += 1
+            stats["handoff_total"] += seconds
+            stats["handoff_max"] = max(stats["handoff_max"], seconds)
+
+    def _get_accept_stats(self) -> dict:
+        stats = getattr(self, "_accept_stats", None)
+        if stats is None:
+            stats = self._accept_stats = _new_accept_stats()
+        return stats
+
+    def get_accept_stats(self) -> dict:
+        """Accept path metrics, also reported as get_client_stats()["accept"].
+
+        backlog / queue_len: configured listen backlog and the kernel's current accept
+        queue length (None where TCP_INFO is unavailable); queue_len_peak: longest queue
+        seen at a wakeup; accepted / wakeups / max_batch: connections accepted, poll
+        wakeups and the most accepted in one wakeup; handoff_avg_ms / handoff_max_ms:
+        time from accept to the worker having the connection. listeners / acceptors:
+        number of listening sockets and accept threads per socket. Queue lengths are
+        summed over all listeners.
+        """
+        queues = [jsocket_base.accept_queue_info(sock) for sock in self._listening_sockets()]
+        queues = [queue for queue in queues if queue is not None]
+        with _stats_guard(self):
+            stats = dict(self._get_accept_stats())
+        handoffs = stats.pop("handoffs")
+        total = stats.pop("handoff_total")
+        stats["backlog"] = getattr(self, "_backlog", jsocket_base.DEFAULT_BACKLOG)
+        stats["queue_len"] = sum(queue[0] for queue in queues) if queues else None
+        stats["listeners"] = len(self._listening_sockets())
+        stats["acceptors"] = getattr(self, "_acceptors", 1)
+        stats["handoff_avg_ms"] = total / handoffs * 1000.0 if handoffs else 0.0
+        stats["handoff_max_ms"] = stats.pop("handoff_max") * 1000.0
+        return stats
+
+    def _start_worker(self, conn):
+        """Create the worker for an accepted connection and start it.
+
+        @retval the worker, tracked in _threads for stats and shutdown
+        """
+        worker = self._thread_type(**self._thread_args)
+        worker.swap_socket(conn)
+        worker.start()
+        return worker
+
     def stop_all(self):
         """Stop and join all active worker threads."""
         while True:
@@ -873,17 +1212,19 @@ class ServerFactory(ThreadedServer):
             self._purge_threads()
 
     def _archive_thread_stats(self, thread):
-        if getattr(thread, "_stats_archived", False):
-            return
-        stats_map = _stats_from_thread(thread)
-        if not stats_map:
-            thread._stats_archived = True
-            return
-        # Dead threads should never be marked connected in the archive.
-        for stats in stats_map.values():
-            stats["connected"] = False
-            stats["_connected_since"] = None
+        # The flag is checked and set under the lock get_client_stats reads under, so a
+        # worker is always counted exactly once: in the archive or as live.
         with _stats_guard(self):
+            if getattr(thread, "_stats_archived", False):
+                return
+            stats_map = _stats_from_thread(thread)
+            thread._stats_archived = True
+            if not stats_map:
+                return
+            # Dead threads should never be marked connected in the archive.
+            for stats in stats_map.values():
+                stats["connected"] = False
+                stats["_connected_since"] = None
             archive = getattr(self, "_client_stats_archive", None)
             if archive is None:
                 self._client_stats_archive = {}
@@ -893,7 +1234,6 @@ class ServerFactory(ThreadedServer):
                     archive[client_id] = _clone_client_stats(stats)
                 else:
                     archive[client_id] = _merge_client_stats(archive[client_id], stats)
-        thread._stats_archived = True
 
     def _purge_threads(self):
         # Rebuild list to avoid mutating while iterating, archiving stats for finished threads.
@@ -929,30 +1269,37 @@ class ServerFactory(ThreadedServer):
             threads = list(self._threads)
         return len([True for x in threads if x.is_alive()])
 
-    def get_client_stats(self) -> dict:
-        """Return per-client stats including connects, messages, failures, and timestamps."""
+    def _live_workers(self):
+        """Return workers still serving a client, archiving stats of finished ones."""
         with self._threads_lock:
             threads = list(self._threads)
-        # Archive any finished threads encountered.
         for t in threads:
             if not t.is_alive():
                 self._archive_thread_stats(t)
-        alive = [t for t in threads if t.is_alive()]
+        return [t for t in threads if t.is_alive()]
+
+    def get_client_stats(self) -> dict:
+        """Return per-client stats including connects, messages, failures, and timestamps."""
+        alive = self._live_workers()
         with _stats_guard(self):
             archive = getattr(self, "_client_stats_archive", {}) or {}
             combined = {cid: _clone_client_stats(stats) for cid, stats in archive.items()}
-        for t in alive:
-            stats_map = _stats_from_thread(t)
-            for client_id, stats in stats_map.items():
-                existing = combined.get(client_id)
-                if existing is None:
-                    combined[client_id] = _clone_client_stats(stats)
-                else:
-                    combined[client_id] = _merge_client_stats(existing, stats)
+            # Still under the archive lock: a worker archived meanwhile is already in `archive`.
+            for t in alive:
+                if getattr(t, "_stats_archived", False):
+                    continue
+                stats_map = _stats_from_thread(t)
+                for client_id, stats in stats_map.items():
+                    existing = combined.get(client_id)
+                    if existing is None:
+                        combined[client_id] = _clone_client_stats(stats)
+                    else:
+                        combined[client_id] = _merge_client_stats(existing, stats)
         combined = _rekey_stats_map(combined)
         now = time.monotonic()
         clients = {cid: _format_client_stats(stats, now) for cid, stats in combined.items()}
         connected = sum(1 for stats in clients.values() if stats.get("connected"))
-        return {"connected_clients": connected, "clients": clients}
+        return {"connected_clients": connected, "clients": clients, "accept": self.get_accept_stats()}
 
     active = property(_get_num_of_active_threads, doc="number of active threads")
+    listeners = property(_get_listeners, doc="(address, port) bound by each listening socket")
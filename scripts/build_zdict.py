@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from jsocket import compression
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Build a shared zlib dictionary from captured JSON messages (one per line).",
+    )
+    parser.add_argument("samples", help="File with one JSON message per line")
+    parser.add_argument("output", help="Where to write the dictionary bytes")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=compression.DEFAULT_ZDICT_SIZE,
+        help=f"Maximum dictionary size in bytes (default: {compression.DEFAULT_ZDICT_SIZE})",
+    )
+    return parser.parse_args(argv)
+
+
+def _load_samples(path):
+    samples = []
+    with open(path, "rb") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            # Round-trip through json so samples match what send_obj puts on the wire.
+            samples.append(json.loads(line))
+    return samples
+
+
+def _ratio(samples, zdict):
+    raw = 0
+    plain = 0
+    shared = 0
+    for sample in samples:
+        data = json.dumps(sample, ensure_ascii=False).encode("utf-8")
+        raw += len(data)
+        plain += len(zlib.compress(data))
+        shared += len(compression.compress(compression.COMPRESSION_ZLIB, data, zdict=zdict))
+    return raw, plain, shared
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    samples = _load_samples(args.samples)
+    zdict = compression.build_zdict(samples, size=args.size)
+    Path(args.output).write_bytes(zdict)
+    raw, plain, shared = _ratio(samples, zdict)
+    print(f"dictionary: {len(zdict)} bytes, id {compression.zdict_id(zdict)}")
+    print(f"samples: {len(samples)} messages, {raw} bytes raw")
+    print(f"zlib without dictionary: {plain} bytes ({plain / raw:.1%})")
+    print(f"zlib with dictionary:    {shared} bytes ({shared / raw:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -443,7 +443,7 @@ def test_wakeup_close_handles_errors():
 
 
 def test_wait_for_accept_paths(monkeypatch):
-    """_wait_for_accept should handle listen/select/wakeup paths."""
+    """_wait_for_accept should handle listen/poll/wakeup paths."""
 
     class WaitServer(tserver.ThreadedServer):
         def __init__(self):
@@ -468,8 +468,30 @@ def test_wait_for_accept_paths(monkeypatch):
     srv._listen = listen_fail
     assert srv._wait_for_accept() is False
 
+    class FakeSock:
+        def __init__(self, fd):
+            self.fd = fd
+
+        def fileno(self):
+            return self.fd
+
+    srv.socket = FakeSock(2000)
+    srv._wakeup_r = FakeSock(2001)
+
+    def fake_poll(result):
+        class FakePoll:
+            def register(self, sock, _events):
+                assert sock.fileno() >= 2000
+
+            def poll(self):
+                if isinstance(result, Exception):
+                    raise result
+                return [(sock.fileno(), tserver.select.POLLIN) for sock in result]
+
+        return FakePoll
+
     srv._listen = lambda: None
-    monkeypatch.setattr(tserver.select, "select", lambda *_: (_ for _ in ()).throw(ValueError("boom")))
+    monkeypatch.setattr(tserver.select, "poll", fake_poll(ValueError("boom")))
     assert srv._wait_for_accept() is False
 
     drained = {"n": 0}
@@ -478,10 +500,15 @@ def test_wait_for_accept_paths(monkeypatch):
         drained["n"] += 1
 
     srv._drain_wakeup = drain
-    monkeypatch.setattr(tserver.select, "select", lambda *_: ([srv._wakeup_r], [], []))
+    monkeypatch.setattr(tserver.select, "poll", fake_poll([srv._wakeup_r]))
     assert srv._wait_for_accept() is False
     assert drained["n"] == 1
 
+    monkeypatch.setattr(tserver.select, "poll", fake_poll([srv.socket]))
+    assert srv._wait_for_accept() is True
+
+    # Platforms without poll fall back to select.
+    monkeypatch.delattr(tserver.select, "poll")
     monkeypatch.setattr(tserver.select, "select", lambda *_: ([srv.socket], [], []))
     assert srv._wait_for_accept() is True
 
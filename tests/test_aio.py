@@ -0,0 +1,320 @@
+"""Pytest: asyncio client and stream framing."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import asyncio
+import socket
+import struct
+import threading
+import time
+import zlib
+import pytest
+
+import jsocket
+from jsocket import jsocket_base
+
+
+class EchoServer(jsocket.ThreadedServer):
+    """Blocking echo server used to check wire compatibility."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+def _start_threaded_server(**kwargs):
+    try:
+        server = EchoServer(address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+async def _echo_handler(reader, writer):
+    stream = jsocket.AsyncJsonStream(reader, writer)
+    async for obj in stream:
+        await stream.send_obj(obj)
+    await stream.close()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_async_client_talks_to_threaded_server():
+    """AsyncJsonClient frames are read by the blocking server and vice versa."""
+    server, port = _start_threaded_server(compression="zlib", compression_threshold=64)
+
+    async def _run():
+        client = jsocket.AsyncJsonClient(address="127.0.0.1", port=port, compression="zlib", compression_threshold=64)
+        assert await client.connect() is True
+        try:
+            await client.send_obj({"hello": "async"})
+            assert await client.read_obj() == {"hello": "async"}
+            big = {"rows": ["value-%d" % i for i in range(500)]}
+            await client.send_obj(big)
+            assert await client.read_obj() == big
+            assert client.framer._last_read_flags & jsocket_base.FLAG_COMPRESSION_MASK
+            assert await client.send_many([{"i": 1}, {"i": 2}]) == [8, 8]
+            assert [await client.read_obj(), await client.read_obj()] == [{"i": 1}, {"i": 2}]
+        finally:
+            await client.close()
+
+    try:
+        asyncio.run(_run())
+    finally:
+        server.stop()
+        server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(60)
+def test_one_loop_drives_a_thousand_connections():
+    """A single event loop runs 1000 concurrent client connections."""
+
+    async def _run():
+        server = await asyncio.start_server(_echo_handler, "127.0.0.1", 0, backlog=2048)
+        port = server.sockets[0].getsockname()[1]
+
+        async def _client(i):
+            client = jsocket.AsyncJsonClient(
+                address="127.0.0.1",
+                port=port,
+                timeout=10.0,
+                retry_policy=jsocket.RetryPolicy(initial_delay=0.1, multiplier=1.0, max_delay=0.1, jitter=False),
+            )
+            assert await client.connect() is True
+            try:
+                for n in range(3):
+                    await client.send_obj({"client": i, "n": n})
+                    assert await client.read_obj() == {"client": i, "n": n}
+            finally:
+                await client.close()
+
+        try:
+            await asyncio.gather(*(_client(i) for i in range(1000)))
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(_run())
+
+
+def _raw_frame_server(payload_bytes):
+    """Serve `payload_bytes` to the first client, then close."""
+
+    async def _handler(reader, writer):
+        writer.write(payload_bytes)
+        await writer.drain()
+        writer.close()
+
+    return asyncio.start_server(_handler, "127.0.0.1", 0)
+
+
+def _read_from_raw(payload_bytes, **client_kwargs):
+    async def _run():
+        server = await _raw_frame_server(payload_bytes)
+        port = server.sockets[0].getsockname()[1]
+        client = jsocket.AsyncJsonClient(address="127.0.0.1", port=port, **client_kwargs)
+        try:
+            assert await client.connect() is True
+            return await client.read_obj()
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(_run())
+
+
+def _jsn1(payload, checksum=None):
+    if checksum is None:
+        checksum = zlib.crc32(payload) & 0xFFFFFFFF
+    return struct.pack(jsocket_base.FRAME_HEADER_FMT, jsocket_base.FRAME_MAGIC, len(payload), checksum) + payload
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+@pytest.mark.parametrize(
+    "wire, match",
+    [
+        (b"NOPE" + b"\x00" * 8, "invalid message header magic"),
+        (_jsn1(b'{"a": 1}', checksum=1), "checksum mismatch"),
+        (_jsn1(b"not json"), "invalid JSON payload"),
+        (_jsn1(b'"' + b"x" * 200 + b'"'), "exceeds max_message_size"),
+    ],
+)
+def test_framing_errors_match_blocking_client(wire, match):
+    with pytest.raises(jsocket.FramingError, match=match):
+        _read_from_raw(wire, max_message_size=128)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_disconnect_and_timeouts():
+    """EOF mid-frame is a broken connection; idle reads time out like socket.timeout."""
+    with pytest.raises(RuntimeError, match="socket connection broken"):
+        _read_from_raw(_jsn1(b'{"cut": "short"}')[:-3])
+
+    async def _idle():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = jsocket.AsyncJsonClient(address="127.0.0.1", port=port, recv_timeout=0.1)
+        try:
+            assert await client.connect() is True
+            with pytest.raises(socket.timeout):
+                await client.read_obj()
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(_idle())
+
+
+@pytest.mark.timeout(10)
+def test_connect_retries_without_blocking_the_loop():
+    """Failed connect attempts sleep with asyncio, so other tasks keep running."""
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    async def _run():
+        ticks = 0
+
+        async def _ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(_ticker())
+        client = jsocket.AsyncJsonClient(
+            address="127.0.0.1",
+            port=port,
+            retry_policy=jsocket.RetryPolicy(
+                attempts=3, initial_delay=0.1, multiplier=1.0, max_delay=0.1, jitter=False
+            ),
+        )
+        assert await client.connect() is False
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(_run()) >= 10
+
+
+class AsyncEchoServer(jsocket.AsyncJsonServer):
+    """Coroutine handler echoing every message."""
+
+    async def _process_message(self, obj):
+        if obj.get("sleep"):
+            await asyncio.sleep(obj["sleep"])
+        return obj
+
+
+class SyncEchoServer(jsocket.AsyncJsonServer):
+    """Plain handler; runs in the executor and records its thread."""
+
+    threads = set()
+
+    def _process_message(self, obj):
+        SyncEchoServer.threads.add(threading.get_ident())
+        return obj if obj.get("reply", True) else None
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_async_server_holds_many_idle_connections_with_stats():
+    """One event loop serves thousands of mostly idle clients and tracks each one."""
+
+    async def _run():
+        server = AsyncEchoServer(address="127.0.0.1", port=0, timeout=None, backlog=4096)
+        await server.start()
+        clients = []
+        try:
+            for _ in range(2000):
+                client = jsocket.AsyncJsonClient(address="127.0.0.1", port=server.port, recv_timeout=5.0)
+                assert await client.connect() is True
+                clients.append(client)
+            await asyncio.gather(*(c.send_obj({"client_id": f"c{i}"}) for i, c in enumerate(clients[:50])))
+            replies = await asyncio.gather(*(c.read_obj() for c in clients[:50]))
+            assert replies == [{"client_id": f"c{i}"} for i in range(50)]
+            await asyncio.sleep(0.05)
+            stats = server.get_client_stats()
+            assert server.connections == 2000
+            assert stats["connected_clients"] == 2000
+            assert stats["clients"]["c7"]["messages_in"] == 1
+            assert stats["clients"]["c7"]["messages_out"] == 1
+        finally:
+            for client in clients:
+                await client.close()
+            await asyncio.sleep(0.1)
+            stats = server.get_client_stats()
+            await server.stop()
+        assert stats["connected_clients"] == 0
+        assert stats["clients"]["c7"]["disconnects"] == 1
+
+    asyncio.run(_run())
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_async_handlers_overlap_and_sync_handlers_use_executor():
+    """Coroutine handlers run concurrently; plain ones are kept off the loop thread."""
+
+    async def _run():
+        server = AsyncEchoServer(address="127.0.0.1", port=0)
+        await server.start()
+        clients = [jsocket.AsyncJsonClient(address="127.0.0.1", port=server.port) for _ in range(20)]
+        try:
+            for client in clients:
+                assert await client.connect() is True
+            start = time.perf_counter()
+            await asyncio.gather(*(c.send_obj({"sleep": 0.2}) for c in clients))
+            await asyncio.gather(*(c.read_obj() for c in clients))
+            assert time.perf_counter() - start < 1.0
+        finally:
+            for client in clients:
+                await client.close()
+            await server.stop()
+
+        sync_server = SyncEchoServer(address="127.0.0.1", port=0)
+        await sync_server.start()
+        client = jsocket.AsyncJsonClient(address="127.0.0.1", port=sync_server.port)
+        try:
+            assert await client.connect() is True
+            await client.send_obj({"reply": False})
+            await client.send_obj({"x": 1})
+            assert await client.read_obj() == {"x": 1}
+        finally:
+            await client.close()
+            await sync_server.stop()
+        assert SyncEchoServer.threads and threading.get_ident() not in SyncEchoServer.threads
+
+    asyncio.run(_run())
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_blocking_client_talks_to_async_server():
+    """The blocking JsonClient interoperates with AsyncJsonServer."""
+
+    async def _run():
+        server = AsyncEchoServer(address="127.0.0.1", port=0)
+        await server.start()
+
+        def _blocking():
+            client = jsocket.JsonClient(address="127.0.0.1", port=server.port)
+            assert client.connect() is True
+            try:
+                client.send_obj({"from": "thread"})
+                return client.read_obj()
+            finally:
+                client.close()
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, _blocking)
+        finally:
+            await server.stop()
+
+    assert asyncio.run(_run()) == {"from": "thread"}
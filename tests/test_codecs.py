@@ -0,0 +1,243 @@
+"""Pytest: pluggable payload codecs, per-frame codec negotiation and a codec benchmark."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import logging
+import socket
+import struct
+import threading
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base, serializers
+
+logger = logging.getLogger(__name__)
+
+
+def _pair(codec_a=None, codec_b=None):
+    left, right = socket.socketpair()
+    a = jsocket_base.JsonSocket(create_socket=False, codec=codec_a)
+    b = jsocket_base.JsonSocket(create_socket=False, codec=codec_b)
+    for sock, raw in ((a, left), (b, right)):
+        raw.settimeout(1.0)
+        sock.socket = raw
+        sock.conn = raw
+    return a, b
+
+
+def _close(*socks):
+    for sock in socks:
+        sock.close()
+
+
+def test_default_codec_keeps_jsn1_frames():
+    """JSON payloads keep the v2.0 JSN1 header so existing peers can read them."""
+    a, b = _pair()
+    try:
+        a.send_obj({"k": "v"})
+        raw = b.conn.recv(4, socket.MSG_PEEK)
+        assert raw == jsocket_base.FRAME_MAGIC
+        assert b.read_obj() == {"k": "v"}
+    finally:
+        _close(a, b)
+
+
+def test_custom_codec_is_flagged_and_mirrored(monkeypatch):
+    """Non-JSON frames carry the codec id and replies mirror the peer's codec."""
+    monkeypatch.setattr(serializers, "_codecs_by_name", dict(serializers._codecs_by_name))
+    monkeypatch.setattr(serializers, "_codecs_by_id", dict(serializers._codecs_by_id))
+    serializers.register_codec(
+        "reversed-json",
+        200,
+        lambda obj: serializers.get_codec("json").encode(obj)[::-1],
+        lambda data: serializers.get_codec("json").decode(bytes(data)[::-1]),
+    )
+    client, server = _pair(codec_a="reversed-json")
+    client._handle_control({"op": "codec_accept", "ids": [200]})
+    try:
+        client.send_obj({"ping": 1})
+        header = server.conn.recv(jsocket_base.FRAME_HEADER_SIZE + jsocket_base.FRAME_EXT_SIZE, socket.MSG_PEEK)
+        magic, _size, _crc, codec_id, flags, _reserved = struct.unpack(jsocket_base.FRAME_EXT_HEADER_FMT, header)
+        assert magic == jsocket_base.FRAME_MAGIC_EXT
+        assert (codec_id, flags) == (200, 0)
+        assert server.read_obj() == {"ping": 1}
+
+        server.send_obj({"pong": 1})
+        assert client.read_obj() == {"pong": 1}
+        assert client._last_read_codec == 200
+    finally:
+        _close(client, server)
+
+
+def test_unknown_codec_id_is_framing_error():
+    """Frames naming a codec this side lacks are rejected before the body is read."""
+    a, b = _pair()
+    try:
+        header = struct.pack(jsocket_base.FRAME_EXT_HEADER_FMT, jsocket_base.FRAME_MAGIC_EXT, 2, 0, 250, 0, 0)
+        a.conn.sendall(header + b"{}")
+        with pytest.raises(jsocket.FramingError, match="unsupported payload codec"):
+            b.read_obj()
+    finally:
+        _close(a, b)
+
+
+def test_unregistered_codec_name_rejected():
+    """Selecting a codec that is not installed raises ValueError."""
+    with pytest.raises(ValueError):
+        jsocket_base.JsonSocket(create_socket=False, codec="not-a-codec")
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    """Echo worker for mixed codec fleets."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+@pytest.mark.skipif("orjson" not in serializers.available_codecs(), reason="orjson not installed")
+def test_mixed_fleet_json_and_orjson_clients():
+    """One server answers JSON and orjson clients in their own codec."""
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    clients = []
+    try:
+        for codec in (None, "orjson"):
+            client = jsocket.JsonClient(address="127.0.0.1", port=port, codec=codec)
+            clients.append(client)
+            assert client.connect() is True
+            client.send_obj({"echo": codec or "json"})
+            assert client.read_obj() == {"echo": codec or "json"}
+        assert clients[0]._last_read_codec == serializers.JSON_CODEC_ID
+        assert clients[1]._last_read_codec == serializers.get_codec("orjson").codec_id
+    finally:
+        for client in clients:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+class JsonOnlyWorker(EchoWorker):
+    """Echo worker standing in for a server without any optional codec installed."""
+
+    def _decodable_codec_ids(self):
+        return [serializers.JSON_CODEC_ID]
+
+
+def _register_reversed_json(monkeypatch):
+    monkeypatch.setattr(serializers, "_codecs_by_name", dict(serializers._codecs_by_name))
+    monkeypatch.setattr(serializers, "_codecs_by_id", dict(serializers._codecs_by_id))
+    serializers.register_codec(
+        "reversed-json",
+        200,
+        lambda obj: serializers.get_codec("json").encode(obj)[::-1],
+        lambda data: serializers.get_codec("json").decode(bytes(data)[::-1]),
+    )
+
+
+def test_codec_offer_falls_back_to_json_for_peer_without_codec(monkeypatch):
+    """A codec the peer cannot decode is replaced by JSON after the offer; the setting is kept."""
+    _register_reversed_json(monkeypatch)
+    client, server = _pair(codec_a="reversed-json", codec_b="reversed-json")
+    server._decodable_codec_ids = lambda: [serializers.JSON_CODEC_ID]
+    received = []
+    reader = threading.Thread(target=lambda: received.append(server.read_obj()))
+    try:
+        reader.start()
+        assert client._negotiate_codec() == "json"
+        client.send_obj({"ping": 1})
+        reader.join(timeout=2)
+        assert received == [{"ping": 1}]
+        assert server.read_codec == "json"
+        assert client.codec == "reversed-json"
+        # The server learned the client decodes its configured codec.
+        server.send_obj({"pong": 1})
+        assert client.read_obj() == {"pong": 1}
+        assert client.read_codec == "reversed-json"
+    finally:
+        reader.join(timeout=2)
+        _close(client, server)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+@pytest.mark.parametrize("worker, expected", [(EchoWorker, "reversed-json"), (JsonOnlyWorker, "json")])
+def test_client_codec_is_negotiated_on_connect(monkeypatch, worker, expected):
+    """A client set to a codec the server lacks talks JSON instead of being dropped."""
+    _register_reversed_json(monkeypatch)
+    try:
+        server = jsocket.ServerFactory(worker, address="127.0.0.1", port=0)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, codec="reversed-json")
+    try:
+        assert client.connect() is True
+        for i in range(3):
+            client.send_obj({"echo": i})
+            assert client.read_obj() == {"echo": i}
+            assert client.read_codec == expected
+        (stats,) = server.get_client_stats()["clients"].values()
+        assert stats["failures"].get("framing", 0) == 0
+    finally:
+        client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_codec_server_answers_plain_jsn1_client_in_jsn1(monkeypatch):
+    """A client that never sends a codec offer gets JSN1 replies from a server configured for another codec."""
+    _register_reversed_json(monkeypatch)
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0, codec="reversed-json")
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        client.send_obj({"echo": 1})
+        assert client.conn.recv(4, socket.MSG_PEEK) == jsocket_base.FRAME_MAGIC
+        assert client.read_obj() == {"echo": 1}
+    finally:
+        client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+def _sample_payload(records):
+    return {
+        "records": [
+            {"id": i, "name": f"sensor-{i}", "value": i * 0.5, "ok": True, "tags": ["a", "b"]}
+            for i in range(records)
+        ]
+    }
+
+
+def test_codec_benchmark_by_payload_size():
+    """Compare encode+decode time of every installed codec by payload size."""
+    rows = []
+    for records in (1, 100, 10000):
+        obj = _sample_payload(records)
+        for name in serializers.available_codecs():
+            codec = serializers.get_codec(name)
+            encoded = codec.encode(obj)
+            assert codec.decode(encoded) == obj
+            loops = max(1, 2000 // records)
+            start = time.perf_counter()
+            for _ in range(loops):
+                codec.decode(codec.encode(obj))
+            elapsed = (time.perf_counter() - start) / loops
+            rows.append((records, name, len(encoded), elapsed))
+    for records, name, size, elapsed in rows:
+        logger.info("%6d records %8s: %8d bytes %10.1f us/roundtrip", records, name, size, elapsed * 1e6)
+    assert rows
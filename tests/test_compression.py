@@ -0,0 +1,120 @@
+"""Pytest: per-frame compression, thresholds and decompression limits."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import socket
+import struct
+import zlib
+import pytest
+
+import jsocket
+from jsocket import compression, jsocket_base, tserver
+
+
+def _pair(**kwargs):
+    left, right = socket.socketpair()
+    a = jsocket_base.JsonSocket(create_socket=False, **kwargs)
+    b = jsocket_base.JsonSocket(create_socket=False)
+    for sock, raw in ((a, left), (b, right)):
+        raw.settimeout(1.0)
+        sock.socket = raw
+        sock.conn = raw
+    return a, b
+
+
+def _telemetry(n):
+    return {"records": [{"sensor": "temp-probe", "unit": "celsius", "value": 21.5, "seq": i} for i in range(n)]}
+
+
+@pytest.mark.parametrize("name", ["zlib", "lzma", "bz2"])
+def test_large_payload_is_compressed_and_flagged(name):
+    """Payloads above the threshold are compressed and flagged in the header."""
+    sender, receiver = _pair(compression=name, compression_threshold=256)
+    try:
+        obj = _telemetry(500)
+        sender.send_obj(obj)
+        header = receiver.conn.recv(jsocket_base.FRAME_HEADER_SIZE + jsocket_base.FRAME_EXT_SIZE, socket.MSG_PEEK)
+        magic, size, _crc, _codec, flags, _reserved = struct.unpack(jsocket_base.FRAME_EXT_HEADER_FMT, header)
+        assert magic == jsocket_base.FRAME_MAGIC_EXT
+        assert flags & jsocket_base.FLAG_COMPRESSION_MASK == compression.COMPRESSION_IDS[name]
+        assert size == sender._last_send_size
+        assert size < len(jsocket_base.get_codec("json").encode(obj))
+        assert receiver.read_obj() == obj
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_small_payload_below_threshold_stays_jsn1():
+    """Payloads under the threshold are sent as plain JSN1 frames."""
+    sender, receiver = _pair(compression="zlib", compression_threshold=4096)
+    try:
+        sender.send_obj({"small": True})
+        assert receiver.conn.recv(4, socket.MSG_PEEK) == jsocket_base.FRAME_MAGIC
+        assert receiver.read_obj() == {"small": True}
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_decompression_bomb_is_rejected():
+    """A small frame that expands past max_message_size is a framing error."""
+    sender, receiver = _pair()
+    receiver.max_message_size = 64 * 1024
+    try:
+        bomb = zlib.compress(b"[" + b"0," * (512 * 1024) + b"0]", 9)
+        assert len(bomb) < receiver.max_message_size
+        header = struct.pack(
+            jsocket_base.FRAME_EXT_HEADER_FMT,
+            jsocket_base.FRAME_MAGIC_EXT,
+            len(bomb),
+            zlib.crc32(bomb) & 0xFFFFFFFF,
+            0,
+            compression.COMPRESSION_ZLIB,
+            0,
+        )
+        sender.conn.sendall(header + bomb)
+        with pytest.raises(jsocket.FramingError, match="exceeds max_message_size") as excinfo:
+            receiver.read_obj()
+        assert tserver._framing_failure_kind(excinfo.value) == "oversize"
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_corrupt_compressed_payload_is_framing_error():
+    """Undecodable compressed bytes surface as FramingError."""
+    sender, receiver = _pair()
+    try:
+        junk = b"definitely not zlib"
+        header = struct.pack(
+            jsocket_base.FRAME_EXT_HEADER_FMT,
+            jsocket_base.FRAME_MAGIC_EXT,
+            len(junk),
+            zlib.crc32(junk) & 0xFFFFFFFF,
+            0,
+            compression.COMPRESSION_ZLIB,
+            0,
+        )
+        sender.conn.sendall(header + junk)
+        with pytest.raises(jsocket.FramingError, match="invalid compressed payload"):
+            receiver.read_obj()
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("comp_id", [compression.COMPRESSION_LZMA, compression.COMPRESSION_BZ2])
+def test_bounded_decompress_limits(comp_id):
+    """lzma/bz2 decompression stops at the limit instead of expanding fully."""
+    data = compression.compress(comp_id, b"x" * 100000)
+    assert compression.decompress(comp_id, data, 100000) == b"x" * 100000
+    with pytest.raises(compression.DecompressionLimitError):
+        compression.decompress(comp_id, data, 1000)
+    with pytest.raises(ValueError):
+        compression.decompress(comp_id, data[: len(data) // 2], None)
+
+
+def test_unknown_compression_name_rejected():
+    """Only stdlib compressors are accepted."""
+    with pytest.raises(ValueError):
+        jsocket_base.JsonSocket(create_socket=False, compression="zstd")
@@ -0,0 +1,149 @@
+"""Pytest: sans-I/O FrameEncoder/FrameDecoder with split, merged and corrupted input, plus a microbenchmark."""
+# pylint: disable=missing-function-docstring
+
+import logging
+import random
+import time
+import pytest
+
+from jsocket import framing
+
+logger = logging.getLogger(__name__)
+
+
+def _frames(encoder, payloads, **kwargs):
+    out = bytearray()
+    for payload in payloads:
+        header, body = encoder.encode(payload, **kwargs)
+        out += header
+        out += body
+    return bytes(out)
+
+
+PAYLOADS = [b'{"a":1}', b"", b'{"blob":"' + b"x" * 5000 + b'"}', b"[1,2,3]"]
+
+
+@pytest.mark.parametrize("integrity", ["crc32", "adler32", "none"])
+def test_roundtrip_every_split_point(integrity):
+    encoder = framing.FrameEncoder(integrity)
+    stream = _frames(encoder, PAYLOADS, codec_id=0, flags=0)
+    for cut in range(len(stream) + 1):
+        decoder = framing.FrameDecoder(integrity=integrity)
+        frames = decoder.feed(stream[:cut]) + decoder.feed(stream[cut:])
+        assert [f.payload for f in frames] == PAYLOADS
+        assert decoder.buffered == 0
+
+
+def test_byte_at_a_time_and_merged_feeds_agree():
+    encoder = framing.FrameEncoder()
+    stream = _frames(encoder, PAYLOADS * 3, codec_id=7, flags=framing.FLAG_CONTROL, dict_id=0)
+    merged = framing.FrameDecoder().feed(stream)
+    decoder = framing.FrameDecoder()
+    trickled = []
+    for i in range(len(stream)):
+        trickled += decoder.feed(stream[i:i + 1])
+    assert merged == trickled
+    assert [f.payload for f in merged] == PAYLOADS * 3
+    assert {(f.codec_id, f.flags) for f in merged} == {(7, framing.FLAG_CONTROL)}
+
+
+def test_jsn1_header_only_for_plain_crc32_json():
+    header, _ = framing.FrameEncoder().encode(b"{}")
+    assert header[:4] == framing.FRAME_MAGIC and len(header) == framing.FRAME_HEADER_SIZE
+    header, _ = framing.FrameEncoder("adler32").encode(b"{}")
+    assert header[:4] == framing.FRAME_MAGIC_EXT
+
+
+def test_typed_errors():
+    encoder = framing.FrameEncoder()
+    frame = _frames(encoder, [b'{"x":1}'])
+    with pytest.raises(framing.BadHeaderError):
+        framing.FrameDecoder().feed(b"JSNX" + frame[4:])
+    with pytest.raises(framing.MessageTooLargeError):
+        framing.FrameDecoder(max_message_size=3).feed(frame)
+    with pytest.raises(framing.ChecksumError, match="mismatch"):
+        framing.FrameDecoder().feed(frame[:-1] + b"]")
+    adler_frame = _frames(framing.FrameEncoder("adler32"), [b'{"x":1}'])
+    with pytest.raises(framing.ChecksumError, match="mismatch"):
+        framing.FrameDecoder(integrity="adler32").feed(adler_frame[:-1] + b"]")
+    # A crc32 receiver verifies stronger-or-equal frames in their own mode and refuses weaker ones.
+    with pytest.raises(framing.UnsupportedFrameError, match="weaker"):
+        framing.FrameDecoder().feed(_frames(framing.FrameEncoder("none"), [b"{}"]))
+    with pytest.raises(framing.UnsupportedFrameError):
+        framing.FrameDecoder().feed(_frames(encoder, [b"{}"], flags=0x40))
+    # Every error is still a FramingError for existing handlers.
+    assert issubclass(framing.ChecksumError, framing.FramingError)
+
+
+def test_receiver_with_integrity_none_skips_checksums():
+    frame = bytearray(_frames(framing.FrameEncoder(), [b'{"x":1}']))
+    frame[-2] ^= 0xFF
+    assert framing.FrameDecoder(integrity="none").feed(bytes(frame))[0].payload == bytes(frame[-7:])
+
+
+def test_single_bit_flips_never_yield_a_corrupted_payload():
+    payload = b'{"key":"value","n":12345}'
+    stream = _frames(framing.FrameEncoder(), [payload], flags=0)
+    for bit in range(len(stream) * 8):
+        corrupted = bytearray(stream)
+        corrupted[bit // 8] ^= 1 << (bit % 8)
+        try:
+            frames = framing.FrameDecoder().feed(bytes(corrupted))
+        except framing.FramingError:
+            continue
+        # A flip in the length field leaves the decoder waiting; anything it returns must be intact.
+        assert all(f.payload == payload for f in frames)
+
+
+def test_random_garbage_only_raises_framing_errors():
+    rng = random.Random(1234)
+    valid = _frames(framing.FrameEncoder(), PAYLOADS)
+    for _ in range(2000):
+        data = bytearray(valid)
+        for _ in range(rng.randint(1, 4)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+        if rng.random() < 0.3:
+            data = bytearray(rng.randrange(256) for _ in range(rng.randint(0, 64))) + data
+        decoder = framing.FrameDecoder(max_message_size=1 << 16)
+        try:
+            pos = 0
+            while pos < len(data):
+                step = rng.randint(1, 600)
+                decoder.feed(bytes(data[pos:pos + step]))
+                pos += step
+        except framing.FramingError:
+            pass
+
+
+def test_reset_drops_partial_frame():
+    decoder = framing.FrameDecoder()
+    stream = _frames(framing.FrameEncoder(), [b'{"a":1}'])
+    assert decoder.feed(stream[:-2]) == []
+    decoder.reset()
+    assert decoder.buffered == 0
+    assert [f.payload for f in decoder.feed(stream)] == [b'{"a":1}']
+
+
+def test_decoder_microbenchmark():
+    """Decode rate of 128-byte frames fed in 64 KiB reads."""
+    encoder = framing.FrameEncoder()
+    count = 50000
+    stream = _frames(encoder, [b"x" * 128] * count)
+    chunk = 64 * 1024
+    decoder = framing.FrameDecoder()
+    start = time.perf_counter()
+    decoded = 0
+    for pos in range(0, len(stream), chunk):
+        decoded += len(decoder.feed(stream[pos:pos + chunk]))
+    elapsed = time.perf_counter() - start
+    assert decoded == count
+    start = time.perf_counter()
+    for _ in range(count):
+        encoder.encode(b"x" * 128)
+    encode_elapsed = time.perf_counter() - start
+    logger.info(
+        "framing: decode %.0fk frames/s (%.0f MB/s), encode %.0fk frames/s",
+        count / elapsed / 1e3,
+        len(stream) / elapsed / 1e6,
+        count / encode_elapsed / 1e3,
+    )
@@ -0,0 +1,180 @@
+"""Pytest: frame integrity modes (crc32, adler32, none) and incremental checksums."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import socket
+import struct
+import threading
+import zlib
+import pytest
+
+import jsocket
+from jsocket import framing, jsocket_base, tserver
+
+
+def _pair(sender_kwargs=None, receiver_kwargs=None):
+    left, right = socket.socketpair()
+    a = jsocket_base.JsonSocket(create_socket=False, **(sender_kwargs or {}))
+    b = jsocket_base.JsonSocket(create_socket=False, **(receiver_kwargs or {}))
+    for sock, raw in ((a, left), (b, right)):
+        raw.settimeout(1.0)
+        sock.socket = raw
+        sock.conn = raw
+    return a, b
+
+
+def _peek_header(receiver):
+    size = jsocket_base.FRAME_HEADER_SIZE + jsocket_base.FRAME_EXT_SIZE
+    return struct.unpack(jsocket_base.FRAME_EXT_HEADER_FMT, receiver.conn.recv(size, socket.MSG_PEEK))
+
+
+def test_crc32_default_stays_jsn1():
+    """The default mode keeps plain JSN1 frames for older peers."""
+    sender, receiver = _pair()
+    try:
+        assert sender.integrity == "crc32"
+        sender.send_obj({"a": 1})
+        assert receiver.conn.recv(4, socket.MSG_PEEK) == jsocket_base.FRAME_MAGIC
+        assert receiver.read_obj() == {"a": 1}
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("mode", ["adler32", "none"])
+def test_mode_is_flagged_and_roundtrips(mode):
+    """Non-default modes are carried in the JSN2 flags byte."""
+    sender, receiver = _pair({"integrity": mode}, {"integrity": mode})
+    sender._handle_control({"op": "integrity_accept", "mode": mode})
+    try:
+        obj = {"mode": mode, "data": list(range(100))}
+        sender.send_obj(obj)
+        magic, _size, checksum, _codec, flags, _zdict = _peek_header(receiver)
+        assert magic == jsocket_base.FRAME_MAGIC_EXT
+        assert flags & jsocket_base.FLAG_INTEGRITY_MASK == (
+            jsocket_base.INTEGRITY_MODES[mode] << jsocket_base.FLAG_INTEGRITY_SHIFT
+        )
+        payload = jsocket_base.get_codec("json").encode(obj)
+        assert checksum == (zlib.adler32(payload) if mode == "adler32" else 0)
+        assert receiver.read_obj() == obj
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("mode", ["none", "adler32"])
+def test_crc32_receiver_rejects_weaker_frames(mode):
+    """A crc32 receiver refuses a frame whose declared mode is weaker than its own."""
+    sender, receiver = _pair()
+    try:
+        header, payload = framing.FrameEncoder(mode).encode(b'{"a": 1}')
+        sender.conn.sendall(header + payload)
+        with pytest.raises(jsocket.UnsupportedFrameError, match="weaker") as excinfo:
+            receiver.read_obj()
+        assert tserver._framing_failure_kind(excinfo.value) == "framing"
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("mode", ["none", "adler32"])
+def test_weaker_sender_uses_crc32_until_the_peer_accepts_its_mode(mode):
+    """Without an integrity offer a sender cannot know the peer's mode, so it sends crc32."""
+    sender, receiver = _pair({"integrity": mode})
+    try:
+        sender.send_obj({"a": 1})
+        assert receiver.conn.recv(4, socket.MSG_PEEK) == jsocket_base.FRAME_MAGIC
+        assert receiver.read_obj() == {"a": 1}
+        assert sender.integrity == mode
+    finally:
+        sender.close()
+        receiver.close()
+
+
+class EchoWorker(tserver.ServerFactoryThread):
+    def _process_message(self, obj):
+        return obj
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+@pytest.mark.parametrize(
+    "client_mode, server_mode, expected",
+    [("none", "crc32", "crc32"), ("none", "none", "none"), ("adler32", "none", "adler32"), ("crc32", "none", "crc32")],
+)
+def test_integrity_is_negotiated_on_connect(client_mode, server_mode, expected):
+    """Both sides send the stronger of the two configured modes, so neither rejects the other."""
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0, integrity=server_mode)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, integrity=client_mode)
+    try:
+        assert client.connect() is True
+        for i in range(3):
+            client.send_obj({"echo": i})
+            assert client.read_obj() == {"echo": i}
+            assert framing._integrity_name(client._last_read_integrity) == expected
+        (stats,) = server.get_client_stats()["clients"].values()
+        assert stats["failures"].get("framing", 0) == 0
+    finally:
+        client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+def test_trusted_receiver_accepts_any_mode_without_checking():
+    """Integrity "none" skips verification even when the peer sends a checksum."""
+    sender, receiver = _pair(receiver_kwargs={"integrity": "none"})
+    try:
+        payload = b'{"trusted": true}'
+        header = struct.pack(jsocket_base.FRAME_HEADER_FMT, jsocket_base.FRAME_MAGIC, len(payload), 12345)
+        sender.conn.sendall(header + payload)
+        assert receiver.read_obj() == {"trusted": True}
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("mode", ["crc32", "adler32"])
+def test_bad_checksum_is_bad_crc_in_every_mode(mode):
+    """Corrupt checksums are reported as bad_crc regardless of the mode."""
+    sender, receiver = _pair(receiver_kwargs={"integrity": mode})
+    try:
+        payload = b'{"x": 1}'
+        flags = jsocket_base.INTEGRITY_MODES[mode] << jsocket_base.FLAG_INTEGRITY_SHIFT
+        header = struct.pack(
+            jsocket_base.FRAME_EXT_HEADER_FMT, jsocket_base.FRAME_MAGIC_EXT, len(payload), 1, 0, flags, 0
+        )
+        sender.conn.sendall(header + payload)
+        with pytest.raises(jsocket.FramingError, match="checksum mismatch") as excinfo:
+            receiver.read_obj()
+        assert tserver._framing_failure_kind(excinfo.value) == "bad_crc"
+    finally:
+        sender.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize("digest", [zlib.crc32, zlib.adler32])
+def test_incremental_checksum_matches_single_pass(digest):
+    """Per-chunk checksums over buffered, scratch and direct reads equal one pass over the data."""
+    sender, receiver = _pair()
+    payload = bytes(range(256)) * 1200
+    try:
+        receiver._recv_pending += payload[:100]
+        writer = threading.Thread(target=sender.conn.sendall, args=(payload[100:],))
+        writer.start()
+        data, value = receiver._read_payload(len(payload), digest)
+        writer.join()
+        assert bytes(data) == payload
+        assert value == digest(payload) & 0xFFFFFFFF
+        assert receiver._read_payload(0, None) == (bytearray(), None)
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_unknown_integrity_mode_rejected():
+    with pytest.raises(ValueError):
+        jsocket_base.JsonSocket(create_socket=False, integrity="md5")
@@ -0,0 +1,183 @@
+"""Pytest: request-id multiplexing over a single connection."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import threading
+import time
+import pytest
+
+import jsocket
+
+
+class SlowEchoWorker(jsocket.ServerFactoryThread):
+    """Echo worker that sleeps for the requested delay and fails on request."""
+
+    def _process_message(self, obj):
+        if obj.get("fail"):
+            raise ValueError("asked to fail")
+        time.sleep(obj.get("delay", 0))
+        return obj
+
+
+def _start_server(**kwargs):
+    try:
+        server = jsocket.ServerFactory(SlowEchoWorker, address="127.0.0.1", port=0, multiplex=True, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(server, *clients):
+    for client in clients:
+        client.close()
+    server.stop()
+    server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_replies_complete_out_of_order():
+    """A fast call is answered before an earlier slow one on the same connection."""
+    server, port = _start_server(multiplex_workers=4)
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        slow = client.call_async({"name": "slow", "delay": 0.5})
+        fast = client.call_async({"name": "fast"})
+        assert fast.result(timeout=2) == {"name": "fast"}
+        assert not slow.done()
+        assert slow.result(timeout=2) == {"name": "slow", "delay": 0.5}
+        assert client.in_flight == 0
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_many_threads_share_one_connection():
+    """Concurrent callers each get their own reply; the server sees one client."""
+    server, port = _start_server(multiplex_workers=8)
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    errors = []
+
+    def _worker(tid):
+        try:
+            for i in range(25):
+                assert client.call({"tid": tid, "i": i}, timeout=5) == {"tid": tid, "i": i}
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            errors.append(e)
+
+    try:
+        assert client.connect() is True
+        threads = [threading.Thread(target=_worker, args=(t,)) for t in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+        time.sleep(0.05)
+        stats = server.get_client_stats()
+        assert stats["connected_clients"] == 1
+        client_stats = next(iter(stats["clients"].values()))
+        assert client_stats["messages_in"] == 200
+        assert client_stats["messages_out"] == 200
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_handler_error_fails_only_that_call():
+    """A handler exception comes back as RemoteCallError; the connection stays up."""
+    server, port = _start_server()
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        with pytest.raises(jsocket.RemoteCallError, match="asked to fail"):
+            client.call({"fail": True}, timeout=2)
+        assert client.call({"ok": 1}, timeout=2) == {"ok": 1}
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_plain_messages_still_work_in_multiplex_mode():
+    """Un-enveloped clients are served normally by a multiplexing worker."""
+    server, port = _start_server()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        client.send_obj({"plain": True})
+        assert client.read_obj() == {"plain": True}
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_close_fails_calls_in_flight():
+    """Closing the client fails outstanding futures instead of leaving them hanging."""
+    server, port = _start_server()
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        pending = client.call_async({"delay": 1.0})
+        client.close()
+        with pytest.raises(RuntimeError, match="socket connection broken"):
+            pending.result(timeout=2)
+        with pytest.raises(RuntimeError):
+            client.call_async({"after": "close"})
+    finally:
+        _stop(server)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_call_timeout_abandons_the_call():
+    """A timed-out call raises socket.timeout and its late reply is dropped."""
+    server, port = _start_server(multiplex_workers=2)
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        with pytest.raises(TimeoutError):
+            client.call({"delay": 0.3}, timeout=0.05)
+        assert client.in_flight == 0
+        time.sleep(0.4)
+        assert client.call({"next": 1}, timeout=2) == {"next": 1}
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_plain_replies_and_envelopes_share_the_send_lock(monkeypatch):
+    """Plain replies and executor-sent envelopes are never written concurrently."""
+    unlocked = []
+    real_send_parts = jsocket.ServerFactoryThread._send_parts
+
+    def _send_parts(self, parts):
+        if not self._send_lock.locked():
+            unlocked.append(parts)
+        return real_send_parts(self, parts)
+
+    monkeypatch.setattr(SlowEchoWorker, "_send_parts", _send_parts)
+    server, port = _start_server(multiplex_workers=4)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, timeout=5.0)
+    try:
+        assert client.connect() is True
+        replies = []
+        reader = threading.Thread(target=lambda: replies.extend(client.read_obj() for _ in range(80)))
+        reader.start()
+        blob = "m" * 200000
+        for i in range(40):
+            client.send_obj({"mux_id": i, "body": {"i": i, "blob": blob}})
+            client.send_obj({"plain": i, "blob": blob})
+        reader.join()
+        assert sorted(r["mux_id"] for r in replies if "mux_id" in r) == list(range(40))
+        assert sorted(r["plain"] for r in replies if "plain" in r) == list(range(40))
+        assert not unlocked
+    finally:
+        _stop(server, client)
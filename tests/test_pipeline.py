@@ -0,0 +1,149 @@
+"""Pytest: pipelined requests on a single JsonClient connection."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import logging
+import socket
+import threading
+import time
+import pytest
+
+import jsocket
+
+logger = logging.getLogger(__name__)
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    """Echo worker for pipelining tests."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+class DelayProxy:
+    """TCP forwarder that holds every chunk for `delay` seconds to simulate link latency."""
+
+    def __init__(self, target_port, delay):
+        self.delay = delay
+        self._target_port = target_port
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(1)
+        self.port = self._listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _pump(self, src, dst):
+        try:
+            while True:
+                chunk = src.recv(65536)
+                if not chunk:
+                    break
+                time.sleep(self.delay)
+                dst.sendall(chunk)
+        except OSError:
+            pass
+        for sock in (src, dst):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _run(self):
+        try:
+            client, _ = self._listener.accept()
+        except OSError:
+            return
+        upstream = socket.create_connection(("127.0.0.1", self._target_port))
+        for src, dst in ((client, upstream), (upstream, client)):
+            threading.Thread(target=self._pump, args=(src, dst), daemon=True).start()
+
+    def close(self):
+        self._listener.close()
+
+
+@pytest.fixture(name="echo_port")
+def fixture_echo_port():
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0, socket_options="low_latency")
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    yield port
+    server.stop()
+    server.join(timeout=3)
+
+
+def _client(port):
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    assert client.connect() is True
+    return client
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_pipeline_returns_replies_in_order(echo_port):
+    """Replies come back in request order for any window size."""
+    client = _client(echo_port)
+    try:
+        for depth in (1, 3, 64):
+            requests = [{"seq": i, "depth": depth} for i in range(200)]
+            assert list(client.pipeline(iter(requests), depth=depth)) == requests
+        # Lock-step calls still work on the same connection afterwards.
+        client.send_obj({"after": True})
+        assert client.read_obj() == {"after": True}
+    finally:
+        client.close()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_closing_pipeline_early_drains_in_flight_replies(echo_port):
+    """Abandoning the iterator leaves the connection in sync."""
+    client = _client(echo_port)
+    try:
+        replies = client.pipeline(({"seq": i} for i in range(100)), depth=8)
+        assert next(replies) == {"seq": 0}
+        replies.close()
+        client.send_obj({"next": 1})
+        assert client.read_obj() == {"next": 1}
+    finally:
+        client.close()
+
+
+def test_pipeline_rejects_bad_depth():
+    client = jsocket.JsonClient.__new__(jsocket.JsonClient)
+    with pytest.raises(ValueError):
+        next(client.pipeline([{}], depth=0))
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_pipeline_benchmark_over_latent_link(echo_port):
+    """With 2 ms of added latency, pipelining is far faster than send-then-read."""
+    proxy = DelayProxy(echo_port, 0.002)
+    client = None
+    try:
+        client = _client(proxy.port)
+        count = 100
+        start = time.perf_counter()
+        for i in range(count):
+            client.send_obj({"i": i})
+            assert client.read_obj() == {"i": i}
+        lockstep = time.perf_counter() - start
+        start = time.perf_counter()
+        replies = list(client.pipeline(({"i": i} for i in range(count)), depth=32))
+        pipelined = time.perf_counter() - start
+        assert replies == [{"i": i} for i in range(count)]
+    finally:
+        if client is not None:
+            client.close()
+        proxy.close()
+    logger.info(
+        "%d requests over 2 ms link: lock-step %.0f req/s, pipelined %.0f req/s",
+        count,
+        count / lockstep,
+        count / pipelined,
+    )
+    assert pipelined < lockstep / 3
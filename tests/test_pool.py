@@ -0,0 +1,208 @@
+"""Pytest: JsonClientPool lending validated connections to many threads."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import socket
+import threading
+import time
+import pytest
+
+import jsocket
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    def _process_message(self, obj):
+        if isinstance(obj, dict) and obj.get("sleep"):
+            time.sleep(obj["sleep"])
+        return obj
+
+
+def _start():
+    server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(server, pool):
+    pool.close()
+    server.stop()
+    server.join(timeout=5)
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_many_threads_share_a_bounded_pool():
+    server, port = _start()
+    pool = jsocket.JsonClientPool(address="127.0.0.1", port=port, min_size=2, max_size=4)
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(20):
+                with pool.connection() as client:
+                    client.send_obj({"n": n, "i": i})
+                    assert client.read_obj() == {"n": n, "i": i}
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            errors.append(e)
+
+    try:
+        assert _wait_for(lambda: pool.get_stats()["idle"] == 2)
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        stats = pool.get_stats()
+        assert stats["checkouts"] == 200
+        assert stats["in_use"] == 0
+        assert 2 <= stats["size"] <= 4
+        assert stats["in_use_peak"] <= 4
+        assert 0 < stats["utilization_peak"] <= 1.0
+        assert stats["wait_max_ms"] >= stats["wait_avg_ms"] >= 0
+    finally:
+        _stop(server, pool)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_checkout_times_out_when_exhausted():
+    server, port = _start()
+    pool = jsocket.JsonClientPool(address="127.0.0.1", port=port, min_size=1, max_size=1)
+    try:
+        held = pool.checkout()
+        start = time.monotonic()
+        with pytest.raises(socket.timeout):
+            pool.checkout(timeout=0.2)
+        assert 0.15 < time.monotonic() - start < 1.0
+        pool.checkin(held)
+        assert pool.checkout(timeout=0.2) is held
+        assert pool.get_stats()["timeouts"] == 1
+    finally:
+        _stop(server, pool)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_closed_connections_never_go_back_into_the_pool():
+    server, port = _start()
+    pool = jsocket.JsonClientPool(address="127.0.0.1", port=port, min_size=0, max_size=2)
+    try:
+        client = pool.checkout()
+        # What read_obj does on a FramingError.
+        client._close_connection()
+        pool.checkin(client)
+        assert pool.get_stats()["idle"] == 0
+        with pytest.raises(ValueError):
+            with pool.connection() as other:
+                assert other is not client
+                raise ValueError("handler failed mid-request")
+        fresh = pool.checkout()
+        assert fresh is not client and fresh is not other
+        fresh.send_obj({"ok": 1})
+        assert fresh.read_obj() == {"ok": 1}
+        pool.checkin(fresh)
+        assert pool.get_stats()["discarded"] == 2
+        with pytest.raises(ValueError):
+            pool.checkin(client)
+    finally:
+        _stop(server, pool)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_stale_and_unhealthy_connections_are_replaced():
+    server, port = _start()
+    checks = []
+    pool = jsocket.JsonClientPool(
+        address="127.0.0.1",
+        port=port,
+        min_size=0,
+        max_size=2,
+        health_check=lambda c: checks.append(c) or len(checks) > 1,
+    )
+    try:
+        # The first connection fails its health check and is replaced before it is lent.
+        client = pool.checkout()
+        assert len(checks) == 2 and checks[1] is client
+        # An unread reply left on the connection makes it unusable.
+        client.send_obj({"late": True})
+        time.sleep(0.1)
+        pool.checkin(client)
+        replacement = pool.checkout()
+        assert replacement is not client
+        assert len(checks) == 3
+        assert pool.get_stats()["discarded"] == 2
+        pool.checkin(replacement)
+    finally:
+        _stop(server, pool)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_background_eviction_and_refill():
+    server, port = _start()
+    pool = jsocket.JsonClientPool(
+        address="127.0.0.1", port=port, min_size=1, max_size=3, idle_timeout=0.2, maintenance_interval=0.05
+    )
+    try:
+        clients = [pool.checkout() for _ in range(3)]
+        for client in clients:
+            pool.checkin(client)
+        assert _wait_for(lambda: pool.get_stats()["evicted_idle"] == 2)
+        assert pool.size == 1
+        # The server dropping the last connection is noticed and the pool refills.
+        server.stop_all()
+        assert _wait_for(lambda: pool.get_stats()["discarded"] >= 1 and pool.get_stats()["idle"] == 1)
+        with pool.connection() as client:
+            client.send_obj({"after": "refill"})
+            assert client.read_obj() == {"after": "refill"}
+    finally:
+        _stop(server, pool)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_connections_above_fd_setsize_are_lent():
+    """Descriptors above 1024 cannot go through select(); they must still pass validation."""
+    resource = pytest.importorskip("resource")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < 1200:
+        if hard != resource.RLIM_INFINITY and hard < 1200:
+            pytest.skip("open file limit too low")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (1200, hard))
+    server, port = _start()
+    filler = [socket.socket() for _ in range(1100)]
+    pool = jsocket.JsonClientPool(address="127.0.0.1", port=port, min_size=0, max_size=1)
+    try:
+        with pool.connection(timeout=3) as client:
+            assert client.conn.fileno() >= 1024
+            client.send_obj({"high": "fd"})
+            assert client.read_obj() == {"high": "fd"}
+        stats = pool.get_stats()
+        assert stats["discarded"] == 0 and stats["idle"] == 1
+    finally:
+        for sock in filler:
+            sock.close()
+        _stop(server, pool)
+        if soft < 1200:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_closed_pool_and_bad_sizes():
+    with pytest.raises(ValueError):
+        jsocket.JsonClientPool(min_size=3, max_size=2)
+    pool = jsocket.JsonClientPool(address="127.0.0.1", port=1, min_size=0, max_size=1)
+    pool.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.checkout(timeout=0.1)
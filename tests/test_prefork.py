@@ -0,0 +1,186 @@
+"""Pytest: pre-fork server sharing one port across processes with SO_REUSEPORT."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import pytest
+
+import jsocket
+import jsocket.prefork
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="SO_REUSEPORT not available")
+
+
+class PidWorker(jsocket.ServerFactoryThread):
+    """Replies with the serving process id; {"crash": true} kills the process."""
+
+    def _process_message(self, obj):
+        if obj.get("crash"):
+            os._exit(3)
+        return {"pid": os.getpid(), "echo": obj}
+
+
+def _start(**kwargs):
+    try:
+        server = jsocket.PreforkServer(PidWorker, address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    server.start()
+    return server
+
+
+def _call(port, obj):
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    assert client.connect() is True
+    try:
+        client.send_obj(obj)
+        return client.read_obj()
+    finally:
+        client.close()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_reuse_port_lets_two_servers_bind_one_port():
+    class Echo(jsocket.ThreadedServer):
+        def _process_message(self, obj):
+            return obj
+
+    first = Echo(address="127.0.0.1", port=0, reuse_port=True)
+    try:
+        first._listen()
+        port = first.socket.getsockname()[1]
+        second = Echo(address="127.0.0.1", port=port, reuse_port=True)
+        second.close()
+        with pytest.raises(OSError):
+            Echo(address="127.0.0.1", port=port)
+    finally:
+        first.close()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_connections_spread_across_children_and_stats_merge():
+    server = _start(processes=3, socket_options="low_latency")
+    try:
+        assert len(set(server.pids)) == 3
+        pids = {_call(server.port, {"client_id": "shared", "n": n})["pid"] for n in range(60)}
+        assert len(pids) >= 2
+        assert pids <= set(server.pids)
+        stats = server.get_client_stats()
+        assert stats["clients"]["shared"]["messages_in"] == 60
+        assert stats["clients"]["shared"]["connects"] == 60
+        assert [p["alive"] for p in stats["processes"]] == [True, True, True]
+    finally:
+        server.stop()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_crashed_child_is_restarted():
+    server = _start(processes=2, supervise_interval=0.1)
+    try:
+        before = set(server.pids)
+        client = jsocket.JsonClient(address="127.0.0.1", port=server.port)
+        assert client.connect() is True
+        client.send_obj({"crash": True})
+        with pytest.raises(RuntimeError):
+            client.read_obj()
+        client.close()
+        assert _wait_for(lambda: sum(p["restarts"] for p in server.get_client_stats()["processes"]) == 1)
+        assert _wait_for(lambda: len(set(server.pids) - before) == 1)
+        for n in range(10):
+            assert _call(server.port, {"n": n})["echo"] == {"n": n}
+        assert all(p["alive"] for p in server.get_client_stats()["processes"])
+    finally:
+        server.stop()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_selector_factory_children():
+    server = _start(processes=2, factory_type=jsocket.SelectorServerFactory, io_threads=1)
+    try:
+        assert _call(server.port, {"client_id": "sel"})["echo"] == {"client_id": "sel"}
+        assert server.get_client_stats()["clients"]["sel"]["messages_out"] == 1
+    finally:
+        server.stop()
+
+
+def test_processes_validated():
+    with pytest.raises(ValueError):
+        jsocket.PreforkServer(PidWorker, address="127.0.0.1", port=0, processes=0)
+
+
+class CrashingFactory(jsocket.ServerFactory):
+    """Factory whose process dies as soon as it starts."""
+
+    def __init__(self, *args, **kwargs):  # pylint: disable=super-init-not-called
+        os._exit(4)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_crash_loop_backs_off_and_gives_up():
+    server = _start(
+        processes=1, factory_type=CrashingFactory, supervise_interval=0.01, restart_delay=0.05, max_restarts=3
+    )
+    start = time.monotonic()
+    try:
+        assert _wait_for(lambda: server.get_client_stats()["processes"][0]["gave_up"], timeout=10)
+        # Restarts waited 0.05 + 0.1 + 0.2 s instead of spinning.
+        assert time.monotonic() - start >= 0.35
+        (slot,) = server.get_client_stats()["processes"]
+        assert slot["restarts"] == 3
+        assert slot["alive"] is False
+        time.sleep(0.2)
+        assert server.get_client_stats()["processes"][0]["restarts"] == 3
+    finally:
+        server.stop()
+
+
+def test_late_stats_reply_is_not_returned_for_the_next_request(monkeypatch):
+    """A reply that arrives after get_client_stats() gave up is dropped by the next call."""
+    monkeypatch.setattr(jsocket.prefork, "STATS_TIMEOUT", 0.2)
+    server = jsocket.PreforkServer(PidWorker, address="127.0.0.1", port=0, processes=1)
+    parent_end, child_end = multiprocessing.Pipe()
+
+    class Alive:
+        pid = 1234
+
+        @staticmethod
+        def is_alive():
+            return True
+
+    child = server._children[0]
+    child.process, child.control = Alive(), parent_end
+
+    def answer(delay):
+        request = child_end.recv()
+        time.sleep(delay)
+        child_end.send(("stats", request[1], {"clients": {f"req{request[1]}": {"messages_in": request[1]}}}))
+
+    try:
+        slow = threading.Thread(target=answer, args=(0.4,))
+        slow.start()
+        assert server.get_client_stats()["clients"] == {}
+        slow.join()
+        fast = threading.Thread(target=answer, args=(0,))
+        fast.start()
+        stats = server.get_client_stats()
+        fast.join()
+        assert list(stats["clients"]) == ["req2"]
+    finally:
+        parent_end.close()
+        child_end.close()
+        server._reservation.close()
@@ -0,0 +1,119 @@
+"""Pytest: read_raw/send_raw and raw_frames workers that forward payloads without decoding them."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import json
+import logging
+import time
+import pytest
+
+import jsocket
+
+logger = logging.getLogger(__name__)
+
+
+class RawWorker(jsocket.ServerFactoryThread):
+    """Answers every payload with the same bytes plus a marker, never parsing it."""
+
+    def _process_message(self, obj):
+        raise AssertionError("raw workers should not decode payloads")
+
+    def _process_raw(self, payload):
+        assert isinstance(payload, bytes)
+        return payload[:-1] + b',"raw":"' + self.read_codec.encode() + b'"}'
+
+
+class DecodingWorker(jsocket.ServerFactoryThread):
+    def _process_message(self, obj):
+        return {"seen": obj}
+
+
+def _start(factory_type=jsocket.ServerFactory, worker=RawWorker, **kwargs):
+    server = factory_type(worker, address="127.0.0.1", port=0, raw_frames=True, **kwargs)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(server, client):
+    client.close()
+    server.stop()
+    server.join(timeout=5)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+@pytest.mark.parametrize(
+    "factory_type, extra",
+    [
+        (jsocket.ServerFactory, {}),
+        (jsocket.SelectorServerFactory, {}),
+        (jsocket.SelectorServerFactory, {"processes": 1}),
+    ],
+)
+def test_raw_worker_round_trip(factory_type, extra):
+    server, port = _start(factory_type, compression="zlib", compression_threshold=16, **extra)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, compression="zlib", compression_threshold=16)
+    try:
+        assert client.connect() is True
+        doc = json.dumps({"pad": "x" * 500}, separators=(",", ":")).encode()
+        client.send_raw(doc)
+        reply = client.read_raw()
+        # Compressed on the wire both ways, yet the worker and the client only see the document.
+        assert reply == doc[:-1] + b',"raw":"json"}'
+        assert client.read_codec == "json"
+        client.send_obj({"k": 1})
+        assert client.read_obj() == {"k": 1, "raw": "json"}
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_default_process_raw_falls_back_to_process_message():
+    server, port = _start(worker=DecodingWorker)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        client.send_obj({"a": [1, 2]})
+        assert client.read_obj() == {"seen": {"a": [1, 2]}}
+    finally:
+        _stop(server, client)
+
+
+def test_send_raw_frames_bytes_as_given():
+    sender = jsocket.JsonSocket(create_socket=False)
+    header, payload = sender._frame_payload(memoryview(b'{"x":1}'), 0)
+    decoder = jsocket.FrameDecoder()
+    (frame,) = decoder.feed(header + bytes(payload))
+    assert frame.payload == b'{"x":1}'
+    assert sender._last_send_size == 7
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_raw_forwarding_benchmark():
+    """A relay that forwards payloads with read_raw/send_raw against one that decodes and re-encodes."""
+    server, port = _start(worker=RawWorker)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    doc = {"items": [{"id": i, "name": f"item-{i}", "tags": ["a", "b", "c"]} for i in range(200)]}
+    payload = json.dumps(doc).encode()
+    count = 300
+    try:
+        assert client.connect() is True
+        start = time.perf_counter()
+        for _ in range(count):
+            client.send_obj(json.loads(payload))
+            client.read_obj()
+        decoded = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(count):
+            client.send_raw(payload)
+            client.read_raw()
+        raw = time.perf_counter() - start
+    finally:
+        _stop(server, client)
+    logger.info(
+        "%d B relay: decode/encode %.0f us, raw %.0f us", len(payload), decoded / count * 1e6, raw / count * 1e6
+    )
+    assert raw < decoded * 1.5
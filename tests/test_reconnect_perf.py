@@ -1,12 +1,16 @@
-"""Pytest: multiple clients reconnect with staggered delays (poor man's perf test)."""
+"""Pytest: multiple clients reconnect with staggered delays (poor man's perf test), and connect retry policy."""
 
+import logging
 import random
+import socket
 import threading
 import time
 import pytest
 
 import jsocket
 
+logger = logging.getLogger(__name__)
+
 
 class EchoWorker(jsocket.ServerFactoryThread):
     """Echo worker for concurrent reconnect testing."""
@@ -107,3 +111,138 @@ def test_serverfactory_many_clients_reconnect_with_random_delays():
                 pass
         server.stop()
         server.join(timeout=3)
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_retry_policy_backoff_and_jitter_bounds():
+    policy = jsocket.RetryPolicy(initial_delay=0.1, multiplier=2.0, max_delay=1.0, jitter=False)
+    assert [policy.delay(n) for n in range(1, 7)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+    assert policy.backoff(5000) == 1.0
+    jittered = jsocket.RetryPolicy(initial_delay=0.1, multiplier=2.0, max_delay=1.0)
+    samples = [jittered.delay(3) for _ in range(500)]
+    assert all(0 <= d <= 0.4 for d in samples)
+    assert max(samples) - min(samples) > 0.2
+    with pytest.raises(ValueError):
+        jsocket.RetryPolicy(attempts=0)
+
+
+class _VirtualClock:
+    """Stands in for jsocket_base.time so connect() backs off on a virtual clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def test_fail_fast_and_deadline_bound_connect_attempts(monkeypatch):
+    port = _free_port()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    monkeypatch.setattr(jsocket.jsocket_base.time, "sleep", lambda *_: pytest.fail("fail_fast slept"))
+    assert client.connect(fail_fast=True) is False
+    monkeypatch.undo()
+
+    clock = _VirtualClock()
+    attempts = []
+
+    def refuse(sock, addr):  # pylint: disable=unused-argument
+        attempts.append((clock.now, sock.gettimeout()))
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(jsocket.jsocket_base, "time", clock)
+    monkeypatch.setattr(socket.socket, "connect", refuse)
+    policy = jsocket.RetryPolicy(attempts=1000, initial_delay=0.1, multiplier=2.0, jitter=False, deadline=2.0)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, connect_timeout=1.0, retry_policy=policy)
+    assert client.connect() is False
+    # Backoff 0.1, 0.2, 0.4, 0.8; the next 1.6 s sleep would pass the deadline, so the
+    # sleep is cut short and a last attempt gets the final half of the 0.5 s left.
+    assert [at for at, _ in attempts] == pytest.approx([0.0, 0.1, 0.3, 0.7, 1.5, 1.75])
+    assert attempts[-1][1] == pytest.approx(0.25)
+    assert clock.now <= 2.0
+    client.close()
+
+
+def _reconnect_attempts(monkeypatch, policy, clients=20, outage=1.0):
+    """Connect attempts of clients that start retrying when their server goes away.
+
+    @retval {client index: [monotonic time of each attempt]}, the last one succeeded
+    """
+    port = _free_port()
+    attempts = {}
+    lock = threading.Lock()
+    real_connect = socket.socket.connect
+
+    def counting_connect(sock, addr):
+        if addr == ("127.0.0.1", port):
+            with lock:
+                attempts.setdefault(threading.current_thread().name, []).append(time.monotonic())
+        return real_connect(sock, addr)
+
+    monkeypatch.setattr(socket.socket, "connect", counting_connect)
+    results = []
+
+    def _connect():
+        client = jsocket.JsonClient(address="127.0.0.1", port=port, retry_policy=policy)
+        try:
+            results.append(client.connect())
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=_connect, name=f"client-{n}") for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(outage)
+    server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=port)
+    server.start()
+    try:
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        server.stop()
+        server.join(timeout=3)
+        monkeypatch.undo()
+    assert results == [True] * clients
+    return attempts
+
+
+def _spread(times):
+    mean = sum(times) / len(times)
+    return (sum((t - mean) ** 2 for t in times) / len(times)) ** 0.5
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_clients_reconnect_after_restart_without_a_herd(monkeypatch):
+    """During a 1 s outage, jittered backoff keeps probing and spreads the reconnects out."""
+    fixed = _reconnect_attempts(
+        monkeypatch, jsocket.RetryPolicy(initial_delay=3.0, multiplier=1.0, max_delay=3.0, jitter=False)
+    )
+    jittered = _reconnect_attempts(monkeypatch, jsocket.DEFAULT_RETRY_POLICY)
+    fixed_spread = _spread([times[-1] for times in fixed.values()])
+    jittered_spread = _spread([times[-1] for times in jittered.values()])
+    logger.info(
+        "reconnect attempts per client: fixed %s, jittered %s; reconnect spread: fixed %.0f ms, jittered %.0f ms",
+        sorted(len(t) for t in fixed.values()),
+        sorted(len(t) for t in jittered.values()),
+        fixed_spread * 1e3,
+        jittered_spread * 1e3,
+    )
+    # A fixed 3 s sleep outlasts the outage: every client fails once and retries in the same instant.
+    assert all(len(times) == 2 for times in fixed.values())
+    # Jittered backoff sleeps at most 0.1 + 0.2 + 0.4 s in its first three retries.
+    assert all(len(times) >= 4 for times in jittered.values())
+    assert jittered_spread > fixed_spread
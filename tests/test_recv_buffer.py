@@ -0,0 +1,98 @@
+"""Unit tests for the buffered receive path in JsonSocket._read."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import json
+import socket
+import struct
+import zlib
+import pytest
+
+from jsocket import jsocket_base
+
+
+class ChunkSocket:
+    """Socket stub that serves a byte stream in fixed-size recv_into chunks."""
+
+    def __init__(self, data, chunk=None):
+        self._data = bytes(data)
+        self._pos = 0
+        self._chunk = chunk
+        self.recv_calls = 0
+
+    def recv_into(self, buf):
+        self.recv_calls += 1
+        if self._pos >= len(self._data):
+            raise socket.timeout("idle")
+        n = len(buf)
+        if self._chunk is not None:
+            n = min(n, self._chunk)
+        n = min(n, len(self._data) - self._pos)
+        buf[:n] = self._data[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def fileno(self):
+        return 1
+
+    def shutdown(self, how):  # pylint: disable=unused-argument
+        return None
+
+    def close(self):
+        return None
+
+
+def _frame(obj):
+    payload = json.dumps(obj).encode("utf-8")
+    checksum = zlib.crc32(payload) & 0xFFFFFFFF
+    return struct.pack(jsocket_base.FRAME_HEADER_FMT, jsocket_base.FRAME_MAGIC, len(payload), checksum) + payload
+
+
+def _make_socket(conn):
+    sock = jsocket_base.JsonSocket(create_socket=False)
+    sock.socket = conn
+    sock.conn = conn
+    return sock
+
+
+def test_read_ahead_serves_several_frames_from_one_recv():
+    """A single recv_into should fill the header, body and following frames."""
+    objs = [{"n": i, "pad": "x" * 20} for i in range(5)]
+    conn = ChunkSocket(b"".join(_frame(o) for o in objs))
+    sock = _make_socket(conn)
+
+    assert [sock.read_obj() for _ in objs] == objs
+    assert conn.recv_calls == 1
+
+
+def test_large_payload_in_small_segments():
+    """Large payloads arriving in small segments reassemble correctly."""
+    obj = {"blob": "y" * (3 * jsocket_base.RECV_BUFFER_SIZE + 17)}
+    conn = ChunkSocket(_frame(obj) + _frame({"tail": True}), chunk=1500)
+    sock = _make_socket(conn)
+
+    assert sock.read_obj() == obj
+    assert sock.read_obj() == {"tail": True}
+
+
+def test_idle_timeout_on_empty_buffer_propagates():
+    """A timeout before any frame bytes arrive is surfaced as socket.timeout."""
+    sock = _make_socket(ChunkSocket(b""))
+    with pytest.raises(socket.timeout):
+        sock.read_obj()
+
+
+def test_timeout_mid_header_is_framing_error():
+    """A timeout after a partial header is a framing error, even from read-ahead."""
+    sock = _make_socket(ChunkSocket(_frame({"a": 1})[:6]))
+    with pytest.raises(jsocket_base.FramingError):
+        sock.read_obj()
+
+
+def test_close_connection_drops_read_ahead():
+    """Buffered bytes must not leak into the next connection."""
+    conn = ChunkSocket(_frame({"a": 1}) + _frame({"b": 2}))
+    sock = _make_socket(conn)
+    assert sock.read_obj() == {"a": 1}
+    assert len(sock._recv_pending) > 0
+    sock._close_connection()
+    assert len(sock._recv_pending) == 0
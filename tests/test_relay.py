@@ -0,0 +1,260 @@
+"""Pytest: RelayServer forwarding frames to upstream servers without decoding them."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base, relay
+
+logger = logging.getLogger(__name__)
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    """Echoes every message and tags it with the upstream's port."""
+
+    port = None
+
+    def _process_message(self, obj):
+        if isinstance(obj, dict):
+            obj["upstream"] = self.port
+        return obj
+
+
+class DecodingRelayWorker(jsocket.ServerFactoryThread):
+    """Baseline relay that decodes every message and re-encodes it upstream."""
+
+    upstream = None
+
+    def _process_message(self, obj):
+        if self.upstream is None:
+            self.upstream = jsocket.JsonClient(address="127.0.0.1", port=self.upstream_port, timeout=10.0)
+            self.upstream.connect()
+        self.upstream.send_obj(obj)
+        return self.upstream.read_obj()
+
+
+def _start_upstream(**kwargs):
+    server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0, **kwargs)
+    _, port = server.socket.getsockname()
+    # Each upstream gets its own worker class so replies say which one answered.
+    server._thread_type = type("EchoWorker%d" % port, (EchoWorker,), {"port": port})
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _start_relay(upstreams, **kwargs):
+    server = jsocket.RelayServer(upstreams, address="127.0.0.1", port=0, **kwargs)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(*servers):
+    for server in servers:
+        server.stop()
+        server.join(timeout=5)
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_relay_passes_compressed_and_dictionary_frames_through():
+    zdict = b'{"n": , "name": "item-", "tags": ["alpha", "beta", "gamma"'
+    upstream, up_port = _start_upstream(compression="zlib", compression_threshold=16, zdicts=[zdict])
+    proxy, port = _start_relay([("127.0.0.1", up_port)])
+    client = jsocket.JsonClient(
+        address="127.0.0.1", port=port, compression="zlib", compression_threshold=16, zdicts=[zdict]
+    )
+    try:
+        assert client.connect() is True
+        # The offer goes to the upstream; the relay only forwards it.
+        assert client.zdict_id == jsocket_base.register_zdict(zdict)
+        docs = [{"n": i, "name": f"item-{i}", "tags": ["alpha", "beta", "gamma"] * 4} for i in range(60)]
+        for doc in docs:
+            client.send_obj(doc)
+            assert client.read_obj() == dict(doc, upstream=up_port)
+        assert client._last_read_flags & jsocket_base.FLAG_COMPRESSION_MASK
+        big = {"blob": "q" * (2 * 1024 * 1024)}
+        client.send_obj(big)
+        assert client.read_obj() == dict(big, upstream=up_port)
+        client.close()
+        assert _wait_for(lambda: proxy.active == 0)
+        (stats,) = proxy.get_client_stats()["clients"].values()
+        assert stats["messages_in"] == stats["messages_out"] == 61
+    finally:
+        client.close()
+        _stop(proxy, upstream)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_relay_round_robins_and_skips_dead_upstreams():
+    first, first_port = _start_upstream()
+    second, second_port = _start_upstream()
+    dead = socket.socket()
+    dead.bind(("127.0.0.1", 0))
+    dead_port = dead.getsockname()[1]
+    dead.close()
+    proxy, port = _start_relay([("127.0.0.1", first_port), ("127.0.0.1", dead_port), ("127.0.0.1", second_port)])
+    clients = [jsocket.JsonClient(address="127.0.0.1", port=port) for _ in range(3)]
+    try:
+        seen = []
+        for client in clients:
+            assert client.connect() is True
+            client.send_obj({})
+            seen.append(client.read_obj()["upstream"])
+        assert seen == [first_port, second_port, second_port]
+        assert proxy.upstreams[1] == ("127.0.0.1", dead_port)
+    finally:
+        for client in clients:
+            client.close()
+        _stop(proxy, first, second)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_no_reachable_upstream_closes_client():
+    dead = socket.socket()
+    dead.bind(("127.0.0.1", 0))
+    dead_port = dead.getsockname()[1]
+    dead.close()
+    proxy, port = _start_relay([("127.0.0.1", dead_port)])
+    sock = socket.create_connection(("127.0.0.1", port))
+    try:
+        sock.settimeout(5)
+        assert sock.recv(1) == b""
+        assert _wait_for(lambda: proxy.active == 0)
+        (stats,) = proxy.get_client_stats()["clients"].values()
+        assert stats["failures"]["upstream"] == 1
+    finally:
+        sock.close()
+        _stop(proxy)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_corrupted_frame_is_never_forwarded():
+    upstream, up_port = _start_upstream()
+    proxy, port = _start_relay([("127.0.0.1", up_port)])
+    sock = socket.create_connection(("127.0.0.1", port))
+    try:
+        payload = b'{"x":1}'
+        sock.sendall(struct.pack(jsocket_base.FRAME_HEADER_FMT, jsocket_base.FRAME_MAGIC, len(payload), 0) + payload)
+        sock.settimeout(5)
+        assert sock.recv(1) == b""
+        assert _wait_for(lambda: proxy.active == 0)
+        (stats,) = proxy.get_client_stats()["clients"].values()
+        assert stats["failures"]["bad_crc"] == 1
+        assert stats["messages_in"] == 0
+        assert all(s["messages_in"] == 0 for s in upstream.get_client_stats()["clients"].values())
+    finally:
+        sock.close()
+        _stop(proxy, upstream)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_relay_declines_shared_memory():
+    upstream, up_port = _start_upstream(shared_memory_threshold=1024)
+    proxy, port = _start_relay([("127.0.0.1", up_port)])
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, shared_memory_threshold=1024)
+    try:
+        assert client.connect() is True
+        big = {"blob": "s" * 100000}
+        client.send_obj(big)
+        assert client.read_obj() == dict(big, upstream=up_port)
+        assert not client.shared_memory
+    finally:
+        client.close()
+        _stop(proxy, upstream)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+@pytest.mark.parametrize("integrity, splice", [("crc32", True), ("none", False), ("none", True)])
+def test_frames_larger_than_the_buffer_stream_through(monkeypatch, integrity, splice):
+    if splice and not relay._HAS_SPLICE:
+        pytest.skip("os.splice not available")
+    spliced = []
+    if splice:
+        real_splice = os.splice
+        monkeypatch.setattr(relay.os, "splice", lambda *a: spliced.append(a[2]) or real_splice(*a))
+    upstream, up_port = _start_upstream()
+    proxy, port = _start_relay([("127.0.0.1", up_port)], integrity=integrity, relay_buffer_size=64 * 1024)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        for size in (100, 70000, 1024 * 1024):
+            doc = {"blob": "b" * size}
+            client.send_obj(doc)
+            assert client.read_obj() == dict(doc, upstream=up_port)
+        assert bool(spliced) is (integrity == "none" and splice)
+    finally:
+        client.close()
+        _stop(proxy, upstream)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(60)
+def test_relay_benchmark():
+    """Round trip through RelayServer against a relay that decodes and re-encodes every message."""
+    upstream, up_port = _start_upstream()
+    proxy, port = _start_relay([("127.0.0.1", up_port)])
+    decoding = jsocket.ServerFactory(
+        type("Relay", (DecodingRelayWorker,), {"upstream_port": up_port}), address="127.0.0.1", port=0, timeout=10.0
+    )
+    decoding._listen()
+    decoding.start()
+    doc = {"items": [{"id": i, "name": f"item-{i}", "tags": ["a", "b", "c"]} for i in range(2000)]}
+    results = {}
+    try:
+        for name, relay_port in (("frame relay", port), ("decoding relay", decoding.socket.getsockname()[1])):
+            client = jsocket.JsonClient(address="127.0.0.1", port=relay_port, timeout=10.0)
+            assert client.connect() is True
+            count = 50
+            start = time.perf_counter()
+            for _ in range(count):
+                client.send_obj(doc)
+                client.read_obj()
+            results[name] = (time.perf_counter() - start) / count
+            client.close()
+    finally:
+        _stop(proxy, decoding, upstream)
+    logger.info(
+        "frame relay %.2f ms, decoding relay %.2f ms", results["frame relay"] * 1e3, results["decoding relay"] * 1e3
+    )
+    assert results["frame relay"] < results["decoding relay"]
+
+
+def test_upstreams_required():
+    with pytest.raises(ValueError):
+        jsocket.RelayServer([], address="127.0.0.1", port=0)
+    with pytest.raises(TypeError):
+        jsocket.RelayServer([("127.0.0.1", 1)], relay_thread=EchoWorker, address="127.0.0.1", port=0)
+
+
+def test_ring_rotates_under_threads():
+    ring = relay._UpstreamRing([("h", 1), ("h", 2), ("h", 3)])
+    firsts = []
+    threads = [threading.Thread(target=lambda: firsts.append(ring.order()[0])) for _ in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(firsts) == sorted([("h", 1), ("h", 2), ("h", 3)] * 10)
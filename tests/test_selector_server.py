@@ -0,0 +1,358 @@
+"""Pytest: selector-based ServerFactory serving many clients from a few threads."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base, serializers
+
+logger = logging.getLogger(__name__)
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    """Plain synchronous handler, unchanged from the thread-per-client setup."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+def _start(**kwargs):
+    try:
+        server = jsocket.SelectorServerFactory(EchoWorker, address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(server, *clients):
+    for client in clients:
+        client.close()
+    server.stop()
+    server.join(timeout=5)
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_echo_small_and_large_messages():
+    """Frames split across many reads and replies larger than one send both work."""
+    server, port = _start()
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        client.send_obj({"hi": 1})
+        assert client.read_obj() == {"hi": 1}
+        big = {"blob": "z" * (3 * 1024 * 1024)}
+        client.send_obj(big)
+        assert client.read_obj() == big
+        client.send_many([{"n": i} for i in range(20)])
+        assert [client.read_obj() for _ in range(20)] == [{"n": i} for i in range(20)]
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(60)
+def test_thousands_of_clients_without_thread_per_client():
+    """3000 connected clients are served by two I/O threads."""
+    threads_before = threading.active_count()
+    server, port = _start(io_threads=2)
+    clients = []
+    try:
+        for _ in range(3000):
+            client = jsocket.JsonClient(address="127.0.0.1", port=port, timeout=5.0)
+            assert client.connect() is True
+            clients.append(client)
+        assert threading.active_count() <= threads_before + 3
+        for i, client in enumerate(clients[::100]):
+            client.send_obj({"client_id": f"c{i}"})
+            assert client.read_obj() == {"client_id": f"c{i}"}
+        assert _wait_for(lambda: server.active == 3000)
+        stats = server.get_client_stats()
+        assert stats["connected_clients"] == 3000
+        assert stats["clients"]["c3"]["messages_in"] == 1
+        assert stats["clients"]["c3"]["messages_out"] == 1
+    finally:
+        _stop(server, *clients)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_framing_error_closes_only_that_client():
+    """A bad header is recorded as bad_header; other clients are unaffected."""
+    server, port = _start()
+    good = jsocket.JsonClient(address="127.0.0.1", port=port)
+    bad = socket.create_connection(("127.0.0.1", port))
+    try:
+        assert good.connect() is True
+        bad.sendall(struct.pack(jsocket_base.FRAME_HEADER_FMT, b"NOPE", 2, 0) + b"{}")
+        bad.settimeout(2)
+        assert bad.recv(1) == b""
+        good.send_obj({"still": "ok"})
+        assert good.read_obj() == {"still": "ok"}
+        assert _wait_for(lambda: server.active == 1)
+        failures = [s["failures"]["bad_header"] for s in server.get_client_stats()["clients"].values()]
+        assert sum(failures) == 1
+    finally:
+        bad.close()
+        _stop(server, good)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_multiplexed_calls_and_disconnect_stats():
+    """Envelope handling and disconnect accounting work through the selector loop."""
+    server, port = _start(multiplex=True)
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        futures = [client.call_async({"i": i}) for i in range(50)]
+        assert [f.result(timeout=2) for f in futures] == [{"i": i} for i in range(50)]
+        client.close()
+        assert _wait_for(lambda: server.active == 0)
+        stats = server.get_client_stats()
+        assert stats["connected_clients"] == 0
+        (client_stats,) = stats["clients"].values()
+        assert client_stats["messages_in"] == 50
+        assert client_stats["disconnects"] == 1
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.parametrize("kwargs", [{"io_threads": 0}, {"workers": -1}, {"workers": 2, "max_queue": 0}])
+def test_thread_counts_validated(kwargs):
+    with pytest.raises(ValueError):
+        jsocket.SelectorServerFactory(EchoWorker, address="127.0.0.1", port=0, **kwargs)
+
+
+class SlowWorker(jsocket.ServerFactoryThread):
+    """Sleeps for obj["sleep"] seconds and records the thread it ran on."""
+
+    threads = set()
+
+    def _process_message(self, obj):
+        SlowWorker.threads.add(threading.current_thread().name)
+        time.sleep(obj.get("sleep", 0))
+        return obj
+
+
+def _start_pool(**kwargs):
+    try:
+        server = jsocket.SelectorServerFactory(SlowWorker, address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_worker_pool_keeps_per_connection_order():
+    """A fixed pool handles many clients' pipelined messages, each client in order."""
+    threads_before = threading.active_count()
+    server, port = _start_pool(workers=4, max_queue=16)
+    clients = [jsocket.JsonClient(address="127.0.0.1", port=port) for _ in range(50)]
+    try:
+        for client in clients:
+            assert client.connect() is True
+        assert threading.active_count() <= threads_before + 6
+        for i, client in enumerate(clients):
+            client.send_many([{"client": i, "seq": n} for n in range(40)])
+        for i, client in enumerate(clients):
+            assert [client.read_obj() for _ in range(40)] == [{"client": i, "seq": n} for n in range(40)]
+        assert {name for name in SlowWorker.threads if name.startswith("jsocket-pool-")}
+        assert not {name for name in SlowWorker.threads if name.startswith("jsocket-selector-")}
+        pool = server.get_client_stats()["pool"]
+        assert pool["workers"] == 4
+        assert pool["messages_handled"] == 2000
+        assert pool["queue_depth"] == 0
+        assert 0 < pool["queue_depth_peak"] <= 16
+        assert pool["queue_wait_max_ms"] >= pool["queue_wait_avg_ms"] > 0
+    finally:
+        _stop(server, *clients)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_slow_handler_does_not_block_other_clients():
+    """While one worker sleeps, other clients are answered by the rest of the pool."""
+    server, port = _start_pool(workers=2)
+    slow = jsocket.JsonClient(address="127.0.0.1", port=port)
+    fast = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert slow.connect() is True
+        assert fast.connect() is True
+        slow.send_obj({"sleep": 1.0})
+        time.sleep(0.05)
+        start = time.monotonic()
+        fast.send_obj({"fast": True})
+        assert fast.read_obj() == {"fast": True}
+        assert time.monotonic() - start < 0.5
+        assert slow.read_obj() == {"sleep": 1.0}
+        assert server.get_client_stats()["pool"]["queue_wait_max_ms"] < 500
+    finally:
+        _stop(server, slow, fast)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_full_queue_stops_reading_until_workers_catch_up():
+    """The work queue never holds more than max_queue messages."""
+    server, port = _start_pool(workers=1, max_queue=4)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        requests = [{"sleep": 0.01, "seq": n} for n in range(30)]
+        client.send_many(requests)
+        assert [client.read_obj() for _ in range(30)] == requests
+        pool = server.get_client_stats()["pool"]
+        assert pool["queue_depth_peak"] == 4
+        assert pool["queue_wait_max_ms"] >= 20
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_worker_pool_replies_in_the_codec_of_each_request(monkeypatch):
+    """A queued request is answered in its own codec even after the I/O thread read a later frame."""
+    monkeypatch.setattr(serializers, "_codecs_by_name", dict(serializers._codecs_by_name))
+    monkeypatch.setattr(serializers, "_codecs_by_id", dict(serializers._codecs_by_id))
+    codec = serializers.register_codec(
+        "reversed-json",
+        200,
+        lambda obj: serializers.get_codec("json").encode(obj)[::-1],
+        lambda data: serializers.get_codec("json").decode(bytes(data)[::-1]),
+    )
+    server, port = _start_pool(workers=1)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        client.send_raw(codec.encode({"sleep": 0.3, "seq": 1}), codec=codec.name)
+        client.send_obj({"seq": 2})
+        assert client.read_obj() == {"sleep": 0.3, "seq": 1}
+        assert client.read_codec == "reversed-json"
+        assert client.read_obj() == {"seq": 2}
+        assert client.read_codec == "json"
+    finally:
+        _stop(server, client)
+
+
+class CpuWorker(jsocket.ServerFactoryThread):
+    """CPU-bound handler that reports the process it ran in."""
+
+    def _process_message(self, obj):
+        if obj.get("fail"):
+            raise ValueError("boom")
+        total = 0
+        for i in range(obj.get("work", 0)):
+            total += i * i
+        return {"seq": obj.get("seq"), "total": total, "pid": os.getpid(), "pad": obj.get("pad")}
+
+
+def _start_cpu(**kwargs):
+    try:
+        server = jsocket.SelectorServerFactory(CpuWorker, address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_process_pool_runs_handlers_in_worker_processes():
+    """Frames are decoded and handled in child processes; order, codecs and stats hold."""
+    server, port = _start_cpu(processes=2, compression="zlib", compression_threshold=16)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, compression="zlib", compression_threshold=16)
+    try:
+        assert client.connect() is True
+        client.send_many([{"seq": n, "work": 1000, "client_id": "cpu", "pad": "x" * 200} for n in range(20)])
+        replies = [client.read_obj() for _ in range(20)]
+        assert [r["seq"] for r in replies] == list(range(20))
+        assert os.getpid() not in {r["pid"] for r in replies}
+        assert client._last_read_flags & jsocket_base.FLAG_COMPRESSION_MASK
+        client.send_obj({"fail": True})
+        with pytest.raises(RuntimeError):
+            client.read_obj()
+        assert _wait_for(lambda: server.active == 0)
+        stats = server.get_client_stats()["clients"]["cpu"]
+        assert stats["messages_in"] == 21
+        assert stats["messages_out"] == 20
+        assert stats["failures"]["handler"] == 1
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(30)
+def test_process_pool_answers_multiplexed_calls():
+    server, port = _start_cpu(processes=2, multiplex=True)
+    client = jsocket.MultiplexClient(address="127.0.0.1", port=port)
+    try:
+        assert client.connect() is True
+        assert client.call({"seq": 1}, timeout=5)["seq"] == 1
+        with pytest.raises(jsocket.RemoteCallError, match="boom"):
+            client.call({"fail": True}, timeout=5)
+        assert client.call({"seq": 2}, timeout=5)["seq"] == 2
+    finally:
+        _stop(server, client)
+
+
+def _cpu_throughput(port, clients=4, per_client=8, work=200000):
+    conns = [jsocket.JsonClient(address="127.0.0.1", port=port, timeout=30.0) for _ in range(clients)]
+    try:
+        for conn in conns:
+            assert conn.connect() is True
+        start = time.perf_counter()
+        for conn in conns:
+            conn.send_many([{"seq": n, "work": work} for n in range(per_client)])
+        for conn in conns:
+            assert [conn.read_obj()["seq"] for _ in range(per_client)] == list(range(per_client))
+        return clients * per_client / (time.perf_counter() - start)
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(120)
+def test_process_pool_benchmark_scales_with_cores():
+    """CPU-bound handlers: thread pool is GIL-bound, process pool uses every core."""
+    cores = min(os.cpu_count() or 1, 4)
+    threaded, port = _start_cpu(workers=cores)
+    try:
+        thread_rate = _cpu_throughput(port)
+    finally:
+        _stop(threaded)
+    procs, port = _start_cpu(processes=cores)
+    try:
+        process_rate = _cpu_throughput(port)
+    finally:
+        _stop(procs)
+    logger.info(
+        "%d workers, CPU-bound handler: threads %.1f msg/s, processes %.1f msg/s", cores, thread_rate, process_rate
+    )
+    if cores >= 2:
+        assert process_rate > thread_rate * 1.3
@@ -0,0 +1,234 @@
+"""Pytest: single-write framing and a small-message round-trip benchmark."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import logging
+import socket
+import threading
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingSocket:
+    """Socket stub that records gathered and plain writes."""
+
+    def __init__(self, max_chunk=None):
+        self.sendmsg_calls = 0
+        self.send_calls = 0
+        self.data = bytearray()
+        self._max_chunk = max_chunk
+
+    def sendmsg(self, buffers):
+        self.sendmsg_calls += 1
+        joined = b"".join(bytes(b) for b in buffers)
+        if self._max_chunk is not None:
+            joined = joined[:self._max_chunk]
+        self.data += joined
+        return len(joined)
+
+    def send(self, data):
+        self.send_calls += 1
+        self.data += data
+        return len(data)
+
+
+def _make_socket(conn):
+    sock = jsocket_base.JsonSocket(create_socket=False)
+    sock.socket = conn
+    sock.conn = conn
+    return sock
+
+
+def test_send_obj_uses_single_gathered_write():
+    """Header and payload leave in one sendmsg call."""
+    conn = RecordingSocket()
+    sock = _make_socket(conn)
+    sock.send_obj({"echo": "hi"})
+    assert conn.sendmsg_calls == 1
+    assert conn.send_calls == 0
+    assert bytes(conn.data[:4]) == jsocket_base.FRAME_MAGIC
+    assert len(conn.data) == jsocket_base.FRAME_HEADER_SIZE + sock._last_send_size
+
+
+def test_send_obj_resumes_partial_gathered_writes():
+    """Partial sendmsg results continue from the right offset."""
+    conn = RecordingSocket(max_chunk=5)
+    sock = _make_socket(conn)
+    sock.send_obj({"echo": "partial"})
+    assert conn.sendmsg_calls > 1
+    payload = bytes(conn.data[jsocket_base.FRAME_HEADER_SIZE:])
+    assert payload == '{"echo": "partial"}'.encode("utf-8")
+
+
+class EchoServer(jsocket.ThreadedServer):
+    """Echo server for round-trip timing."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+class _TwoWriteMixin:
+    """Reproduces the previous header-then-payload write pattern."""
+
+    def _send_parts(self, parts):
+        for part in parts:
+            self._send(part)
+
+
+class TwoWriteEchoServer(_TwoWriteMixin, EchoServer):
+    """Echo server sending header and payload separately."""
+
+
+class TwoWriteClient(_TwoWriteMixin, jsocket.JsonClient):
+    """Client sending header and payload separately."""
+
+
+def _avg_roundtrip(server_cls, client_cls, count):
+    server = server_cls(address="127.0.0.1", port=0)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    client = None
+    try:
+        client = client_cls(address="127.0.0.1", port=port)
+        assert client.connect() is True
+        client.send_obj({"warmup": True})
+        assert client.read_obj() == {"warmup": True}
+        start = time.perf_counter()
+        for i in range(count):
+            client.send_obj({"i": i})
+            assert client.read_obj() == {"i": i}
+        return (time.perf_counter() - start) / count
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(20)
+def test_small_message_roundtrip_benchmark():
+    """Single-write frames avoid the Nagle/delayed-ACK stall of split writes."""
+    try:
+        two_write = _avg_roundtrip(TwoWriteEchoServer, TwoWriteClient, 10)
+        one_write = _avg_roundtrip(EchoServer, jsocket.JsonClient, 200)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    logger.info("small-message RTT: split writes %.3f ms, single write %.3f ms", two_write * 1e3, one_write * 1e3)
+    assert one_write < 0.02
+    if two_write >= 0.02:
+        # The split-write path hit a delayed-ACK stall; the single write must not.
+        assert one_write < two_write / 4
+
+
+def test_send_many_packs_frames_into_one_write():
+    """send_many emits ordinary frames in a single write and reports each size."""
+    conn = RecordingSocket()
+    sock = _make_socket(conn)
+    objs = [{"i": i} for i in range(50)]
+    sizes = sock.send_many(objs)
+    assert conn.sendmsg_calls == 1
+    assert sizes == [len(jsocket_base.get_codec("json").encode(obj)) for obj in objs]
+    assert len(conn.data) == sum(sizes) + len(objs) * jsocket_base.FRAME_HEADER_SIZE
+    assert sock.send_many([]) == []
+    assert conn.sendmsg_calls == 1
+
+
+def test_send_many_encodes_everything_before_writing():
+    """An oversize object aborts the batch before any bytes are written."""
+    conn = RecordingSocket()
+    sock = _make_socket(conn)
+    sock.max_message_size = 64
+    with pytest.raises(ValueError):
+        sock.send_many([{"ok": 1}, {"big": "x" * 100}])
+    assert not conn.data
+
+
+def test_send_many_frames_are_read_individually():
+    """A batch is read back one object at a time by an unmodified reader."""
+    left, right = socket.socketpair()
+    sender, receiver = _make_socket(left), _make_socket(right)
+    right.settimeout(1.0)
+    try:
+        objs = [{"seq": i, "pad": "y" * i} for i in range(100)]
+        sender.send_many(objs)
+        assert [receiver.read_obj() for _ in objs] == objs
+    finally:
+        sender.close()
+        receiver.close()
+
+
+class BatchWorker(jsocket.ServerFactoryThread):
+    """Worker answering each request with a batch of replies."""
+
+    def _process_message(self, obj):
+        self.send_many([{"part": i} for i in range(obj["parts"])])
+        return None
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_server_send_many_counts_each_message():
+    """Server-side send_many keeps messages_out/bytes_out per object."""
+    try:
+        server = jsocket.ServerFactory(BatchWorker, address="127.0.0.1", port=0)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    client = None
+    try:
+        client = jsocket.JsonClient(address="127.0.0.1", port=port)
+        assert client.connect() is True
+        client.send_obj({"parts": 5})
+        assert [client.read_obj() for _ in range(5)] == [{"part": i} for i in range(5)]
+        time.sleep(0.05)
+        stats = next(iter(server.get_client_stats()["clients"].values()))
+        assert stats["messages_out"] == 5
+        assert stats["bytes_out"] == sum(len(f'{{"part": {i}}}') for i in range(5))
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+def test_send_many_benchmark():
+    """Batching small objects beats a send_obj loop over a local socket pair."""
+    left, right = socket.socketpair()
+    sender = _make_socket(left)
+    objs = [{"i": i, "v": "small"} for i in range(64)]
+    total = 0
+
+    def _drain():
+        nonlocal total
+        while True:
+            chunk = right.recv(1 << 20)
+            if not chunk:
+                return
+            total += len(chunk)
+
+    reader = threading.Thread(target=_drain)
+    reader.start()
+    try:
+        start = time.perf_counter()
+        for _ in range(50):
+            for obj in objs:
+                sender.send_obj(obj)
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(50):
+            sender.send_many(objs)
+        batched = time.perf_counter() - start
+    finally:
+        left.shutdown(socket.SHUT_WR)
+        reader.join(timeout=5)
+        sender.close()
+        right.close()
+    logger.info("64 small objects x50: send_obj loop %.1f ms, send_many %.1f ms", loop * 1e3, batched * 1e3)
+    assert batched < loop
@@ -1,9 +1,11 @@
 """Pytest: server stats reporting for active client connections."""
 
+import threading
 import time
 import pytest
 
 import jsocket
+from jsocket import tserver
 
 
 class EchoServer(jsocket.ThreadedServer):
@@ -136,3 +138,95 @@ def test_serverfactory_client_stats():
                 pass
         server.stop()
         server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(15)
+def test_serverfactory_accept_stats():
+    """ServerFactory reports accept queue and handoff metrics for queued connections."""
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address='127.0.0.1', port=0, backlog=64, accept_batch=8)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+
+    clients = []
+    _, port = server.socket.getsockname()
+    # Queue connections before the accept loop runs so one wakeup drains several.
+    server._listen()
+    try:
+        for _ in range(5):
+            client = jsocket.JsonClient(address='127.0.0.1', port=port)
+            assert client.connect() is True
+            clients.append(client)
+        server.start()
+        for i, client in enumerate(clients):
+            client.send_obj({"echo": i})
+            assert client.read_obj() == {"echo": i}
+
+        accept = server.get_client_stats()["accept"]
+        assert accept["backlog"] == 64
+        assert accept["accepted"] == 5
+        assert accept["wakeups"] < 5
+        assert accept["max_batch"] > 1
+        assert accept["handoff_max_ms"] >= accept["handoff_avg_ms"] > 0.0
+    finally:
+        for client in clients:
+            try:
+                client.close()
+            except OSError:
+                pass
+        try:
+            server.stop_all()
+        except RuntimeError:
+            pass
+        server.stop()
+        server.join(timeout=3)
+
+
+class _ArchivedWhileCounted:
+    """Live worker stub that another thread archives while get_client_stats checks it."""
+
+    name = "late"
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._archived = False
+        self.racer = None
+
+    def is_alive(self):
+        return True
+
+    def _get_client_stats_internal(self):
+        stats = tserver._new_client_stats("late")
+        stats["messages_in"] = 1
+        return {"late": stats}
+
+    def _get_archived(self):
+        if self.racer is None:
+            self.racer = threading.Thread(target=self._factory._archive_thread_stats, args=(self,))
+            self.racer.start()
+            self.racer.join(timeout=0.2)
+        return self._archived
+
+    def _set_archived(self, value):
+        self._archived = value
+
+    _stats_archived = property(_get_archived, _set_archived)
+
+
+def test_worker_archived_during_get_client_stats_is_counted_once():
+    """A worker archived between the archive snapshot and the live scan is still reported."""
+    try:
+        server = jsocket.ServerFactory(EchoWorker, address="127.0.0.1", port=0)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    try:
+        worker = _ArchivedWhileCounted(server)
+        with server._threads_lock:
+            server._threads.append(worker)
+        assert server.get_client_stats()["clients"]["late"]["messages_in"] == 1
+        worker.racer.join(timeout=2)
+        assert worker._archived
+        assert server.get_client_stats()["clients"]["late"]["messages_in"] == 1
+    finally:
+        server.close()
@@ -64,3 +64,43 @@ def test_serverfactory_handles_two_clients_concurrently():
                 pass
         server.stop()
         server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(15)
+def test_serverfactory_multiple_listeners_and_acceptors():
+    """Clients of every listener are served by the same worker type and counted together."""
+    try:
+        server = jsocket.ServerFactory(
+            EchoWorker, address='127.0.0.1', port=0, listeners=[('127.0.0.1', 0)], acceptors=3
+        )
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+
+    ports = [port for _, port in server.listeners]
+    assert len(ports) == 2
+    server.start()
+
+    clients = []
+    try:
+        for i in range(6):
+            client = jsocket.JsonClient(address='127.0.0.1', port=ports[i % 2])
+            assert client.connect() is True
+            client.timeout = 1.5
+            clients.append(client)
+        for i, client in enumerate(clients):
+            client.send_obj({"echo": i})
+            assert client.read_obj() == {"echo": i}
+
+        time.sleep(0.2)
+        stats = server.get_client_stats()
+        assert stats["connected_clients"] == 6
+        assert stats["accept"]["accepted"] == 6
+        assert stats["accept"]["listeners"] == 2
+        assert stats["accept"]["acceptors"] == 3
+    finally:
+        for client in clients:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+    assert not server.is_alive()
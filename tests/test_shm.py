@@ -0,0 +1,232 @@
+"""Pytest: shared-memory transport for large same-host payloads and a throughput benchmark."""
+# pylint: disable=protected-access,missing-function-docstring
+
+import logging
+import os
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base, shm
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.skipif(not shm.available(), reason="POSIX shared memory not available")
+
+LARGE = 1 << 20
+
+
+class EchoServer(jsocket.ThreadedServer):
+    """ThreadedServer that echoes dict payloads."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = 2.0
+
+    def _process_message(self, obj):
+        if isinstance(obj, dict):
+            return obj
+        return None
+
+
+def _segments():
+    try:
+        return {name for name in os.listdir("/dev/shm") if name.startswith(shm.SEGMENT_PREFIX)}
+    except OSError:
+        return set()
+
+
+def _start(**kwargs):
+    server = EchoServer(address="127.0.0.1", port=0, **kwargs)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+def _stop(server, client):
+    client.close()
+    server.stop()
+    server.join(timeout=3)
+
+
+def test_segment_pool_reuses_released_segments_and_falls_back_to_one_shot():
+    pool = shm.SegmentPool(max_segments=1)
+    reader = shm.SegmentReader()
+    try:
+        first, pooled = pool.write(b"a" * 5000)
+        assert pooled is True
+        # The only pooled segment is still out, so this one is one-shot and unlinked on read.
+        extra, pooled = pool.write(b"b" * 10)
+        assert pooled is False
+        assert reader.read(extra, 10, False) == b"b" * 10
+        assert extra not in _segments()
+        assert reader.read(first, 5000, True) == b"a" * 5000
+        pool.release([first])
+        again, pooled = pool.write(b"c" * 100)
+        assert (again, pooled) == (first, True)
+        assert reader.read(again, 100, True) == b"c" * 100
+    finally:
+        reader.close()
+        pool.close()
+    assert first not in _segments()
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_closed_pool_keeps_unread_segments_until_acknowledged_or_expired():
+    pool = shm.SegmentPool(max_segments=2)
+    reader = shm.SegmentReader()
+    try:
+        read_later, _ = pool.write(b"r" * 5000)
+        never_read, _ = pool.write(b"n" * 5000)
+        pool.close(linger=0.5)
+        assert {read_later, never_read} <= _segments()
+        # The peer can still read a segment sent just before close(); that acknowledges it.
+        assert reader.read(read_later, 5000, True) == b"r" * 5000
+        assert _wait_for(lambda: read_later not in _segments(), timeout=0.3)
+        assert never_read in _segments()
+        assert _wait_for(lambda: never_read not in _segments())
+    finally:
+        reader.close()
+
+
+class RecordingServer(EchoServer):
+    """Server that keeps every message it handles and never replies."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.handled = []
+
+    def _process_message(self, obj):
+        self.handled.append(obj)
+        time.sleep(obj.get("sleep", 0))
+        return None
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(15)
+def test_message_sent_just_before_close_is_delivered():
+    before = _segments()
+    server = RecordingServer(address="127.0.0.1", port=0, shared_memory_threshold=LARGE, max_message_size=16 * LARGE)
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    client = jsocket.JsonClient(
+        address="127.0.0.1", port=port, shared_memory_threshold=LARGE, max_message_size=16 * LARGE
+    )
+    try:
+        assert client.connect() is True
+        assert client.shared_memory is True
+        big = {"blob": "x" * (2 * LARGE)}
+        # The server is still busy with the first message when the client closes.
+        client.send_obj({"sleep": 0.3})
+        client.send_obj(big)
+        client.close()
+        assert _wait_for(lambda: server.handled == [{"sleep": 0.3}, big])
+        (stats,) = server.get_client_stats()["clients"].values()
+        assert stats["failures"].get("framing", 0) == 0
+    finally:
+        _stop(server, client)
+    assert _wait_for(lambda: _segments() <= before)
+
+
+def test_reader_rejects_foreign_segment_names():
+    reader = shm.SegmentReader()
+    for name in ("psm_0123456789abcdef", "../jsk_0123456789abcdef", "jsk_xyz"):
+        with pytest.raises(ValueError):
+            reader.read(name, 1, True)
+
+
+def test_shm_frame_rejected_without_negotiation():
+    sock = jsocket_base.JsonSocket(create_socket=False)
+    flags = jsocket_base.FLAG_SHM
+    header = jsocket_base.struct.pack(
+        jsocket_base.FRAME_EXT_HEADER_FMT, jsocket_base.FRAME_MAGIC_EXT, 10, 0, 0, flags, 0
+    )
+    with pytest.raises(jsocket_base.FramingError, match="did not negotiate"):
+        sock._check_header(header[:jsocket_base.FRAME_HEADER_SIZE], header[jsocket_base.FRAME_HEADER_SIZE:])
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(15)
+def test_large_payloads_travel_through_shared_memory():
+    before = _segments()
+    server, port = _start(shared_memory_threshold=LARGE, max_message_size=16 * LARGE)
+    client = jsocket.JsonClient(
+        address="127.0.0.1", port=port, shared_memory_threshold=LARGE, max_message_size=16 * LARGE
+    )
+    try:
+        assert client.connect() is True
+        assert client.shared_memory is True
+        small = {"echo": "inline"}
+        client.send_obj(small)
+        assert client.read_obj() == small
+        assert not client._last_read_flags & jsocket_base.FLAG_SHM
+        big = {"blob": "x" * (2 * LARGE)}
+        for _ in range(3):
+            client.send_obj(big)
+            assert client.read_obj() == big
+            assert client._last_read_flags & jsocket_base.FLAG_SHM
+        # The server's replies carried releases, so one pooled segment served every request.
+        assert len(client._shm_pool._segments) == 1
+        assert client._shm_pool._busy == set()
+    finally:
+        _stop(server, client)
+    assert _segments() <= before
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(15)
+def test_peer_without_shared_memory_gets_inline_frames():
+    server, port = _start(max_message_size=16 * LARGE)
+    client = jsocket.JsonClient(
+        address="127.0.0.1", port=port, shared_memory_threshold=LARGE, max_message_size=16 * LARGE
+    )
+    try:
+        assert client.connect() is True
+        assert client.shared_memory is False
+        big = {"blob": "y" * (2 * LARGE)}
+        client.send_obj(big)
+        assert client.read_obj() == big
+        assert not client._last_read_flags & jsocket_base.FLAG_SHM
+    finally:
+        _stop(server, client)
+
+
+def _avg_roundtrip(threshold, payload, count):
+    kwargs = {"shared_memory_threshold": threshold, "max_message_size": 64 * LARGE, "integrity": "none"}
+    if "orjson" in jsocket.available_codecs():
+        kwargs["codec"] = "orjson"
+    server, port = _start(**kwargs)
+    client = jsocket.JsonClient(address="127.0.0.1", port=port, **kwargs)
+    try:
+        assert client.connect() is True
+        client.send_obj(payload)
+        client.read_obj()
+        start = time.perf_counter()
+        for _ in range(count):
+            client.send_obj(payload)
+            client.read_obj()
+        return (time.perf_counter() - start) / count
+    finally:
+        _stop(server, client)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(60)
+def test_shared_memory_benchmark():
+    """8 MB round trips over loopback TCP with and without shared memory."""
+    payload = {"blob": "z" * (8 * LARGE)}
+    inline = _avg_roundtrip(None, payload, 10)
+    shared = _avg_roundtrip(LARGE, payload, 10)
+    logger.info("8 MB RTT: socket %.1f ms, shared memory %.1f ms", inline * 1e3, shared * 1e3)
+    # Codec work dominates both; only guard against shared memory making things clearly worse.
+    assert shared < inline * 1.5
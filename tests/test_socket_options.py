@@ -0,0 +1,95 @@
+"""Pytest: socket option profiles for clients, servers and factory workers."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import socket
+import time
+import pytest
+
+import jsocket
+from jsocket import jsocket_base
+
+
+class OptionSocket:
+    """Socket stub that records setsockopt calls."""
+
+    def __init__(self):
+        self.options = {}
+
+    def setsockopt(self, level, optname, value):
+        self.options[(level, optname)] = value
+
+    def getsockopt(self, level, optname):
+        return self.options.get((level, optname), 0)
+
+    def settimeout(self, timeout):  # pylint: disable=unused-argument
+        return None
+
+    def getpeername(self):
+        return ("127.0.0.1", 4242)
+
+
+def test_resolve_profiles_and_overrides():
+    """Profiles resolve by name and dicts can override a base profile."""
+    assert jsocket_base.resolve_socket_options(None) == {}
+    assert jsocket_base.resolve_socket_options("low_latency") == {"tcp_nodelay": True}
+    custom = jsocket_base.resolve_socket_options({"profile": "bulk_throughput", "rcvbuf": 1024})
+    assert custom["rcvbuf"] == 1024
+    assert custom["sndbuf"] == 4 * 1024 * 1024
+    with pytest.raises(ValueError):
+        jsocket_base.resolve_socket_options("nope")
+    with pytest.raises(ValueError):
+        jsocket_base.resolve_socket_options({"bogus": 1})
+
+
+def test_swap_socket_applies_options_to_accepted_connection():
+    """ServerFactoryThread applies its profile to sockets handed over by the factory."""
+
+    class Worker(jsocket.ServerFactoryThread):
+        def _process_message(self, obj):  # pragma: no cover - not used
+            return None
+
+    worker = Worker(socket_options={"tcp_nodelay": True, "keepalive": True})
+    sock = OptionSocket()
+    worker.swap_socket(sock)
+    assert sock.options[(socket.IPPROTO_TCP, socket.TCP_NODELAY)] == 1
+    assert sock.options[(socket.SOL_SOCKET, socket.SO_KEEPALIVE)] == 1
+    assert worker.socket_options == {"tcp_nodelay": True, "keepalive": True}
+    assert worker.get_socket_options()["tcp_nodelay"] == 1
+
+
+class EchoWorker(jsocket.ServerFactoryThread):
+    """Echo worker that records its live socket options."""
+
+    seen = []
+
+    def _process_message(self, obj):
+        EchoWorker.seen.append(self.get_socket_options())
+        return obj
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_low_latency_profile_end_to_end():
+    """Client, factory and accepted worker connections all carry the profile."""
+    try:
+        server = jsocket.ServerFactory(
+            EchoWorker, address="127.0.0.1", port=0, socket_options="low_latency"
+        )
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server.start()
+    client = None
+    try:
+        client = jsocket.JsonClient(address="127.0.0.1", port=port, socket_options="low_latency")
+        assert client.connect() is True
+        assert client.get_socket_options()["tcp_nodelay"] == 1
+        client.send_obj({"echo": 1})
+        assert client.read_obj() == {"echo": 1}
+        time.sleep(0.05)
+        assert EchoWorker.seen and EchoWorker.seen[-1]["tcp_nodelay"] == 1
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
@@ -242,7 +242,7 @@ def test_read_obj_invalid_utf8_closes():
 
     sock._close_connection = _close
     sock._read_header = lambda: (len(data), checksum)
-    sock._read = lambda _size: data
+    sock._read_payload = lambda _size, _digest: (data, checksum)
     with pytest.raises(jsocket_base.FramingError):
         sock.read_obj()
     assert closed["n"] == 1
@@ -261,7 +261,7 @@ def test_read_obj_invalid_json_closes():
 
     sock._close_connection = _close
     sock._read_header = lambda: (len(data), checksum)
-    sock._read = lambda _size: data
+    sock._read_payload = lambda _size, _digest: (data, checksum)
     with pytest.raises(jsocket_base.FramingError):
         sock.read_obj()
     assert closed["n"] == 1
@@ -0,0 +1,142 @@
+"""Pytest: shared zlib dictionaries trained from samples and negotiated per connection."""
+# pylint: disable=protected-access,missing-function-docstring,missing-class-docstring
+
+import random
+import socket
+import struct
+import zlib
+import pytest
+
+import jsocket
+from jsocket import compression, jsocket_base
+
+
+def _message(rng, i):
+    return {
+        "event": "metric",
+        "service": rng.choice(["checkout", "search", "auth"]),
+        "host": f"web-{rng.randint(1, 40):02d}.dc1.example.net",
+        "timestamp": 1700000000 + i,
+        "latency_ms": round(rng.uniform(1, 250), 2),
+        "status": rng.choice(["ok", "ok", "ok", "error"]),
+        "labels": {"region": "eu-west-1", "version": "2.14.3", "canary": False},
+    }
+
+
+def _samples(count, seed=7):
+    rng = random.Random(seed)
+    return [_message(rng, i) for i in range(count)]
+
+
+def test_build_zdict_beats_plain_zlib_on_small_messages():
+    """A dictionary trained on samples compresses unseen small messages much better."""
+    zdict = compression.build_zdict(_samples(200))
+    assert 0 < len(zdict) <= compression.DEFAULT_ZDICT_SIZE
+    plain = shared = 0
+    for msg in _samples(50, seed=99):
+        data = jsocket_base.get_codec("json").encode(msg)
+        plain += len(zlib.compress(data))
+        shared += len(compression.compress(compression.COMPRESSION_ZLIB, data, zdict=zdict))
+    assert shared < plain * 0.7
+
+
+def test_register_zdict_ids():
+    """Dictionary ids are content-derived, non-zero and collision checked."""
+    zdict = compression.build_zdict(_samples(20))
+    dict_id = compression.register_zdict(zdict)
+    assert dict_id == compression.zdict_id(zdict) != 0
+    assert compression.get_zdict(dict_id) == zdict
+    with pytest.raises(ValueError):
+        compression.register_zdict(zdict + b"x", dict_id=dict_id)
+
+
+class EchoServer(jsocket.ThreadedServer):
+    """Echo server used for dictionary negotiation."""
+
+    def _process_message(self, obj):
+        return obj
+
+
+def _start_server(**kwargs):
+    try:
+        server = EchoServer(address="127.0.0.1", port=0, **kwargs)
+    except PermissionError as e:
+        pytest.skip(f"Socket creation blocked: {e}")
+    _, port = server.socket.getsockname()
+    server._listen()
+    server.start()
+    return server, port
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_client_and_server_agree_on_dictionary():
+    """Client and server agree on a dictionary at connect time and use it per frame."""
+    zdict = compression.build_zdict(_samples(200))
+    dict_id = compression.register_zdict(zdict)
+    server, port = _start_server(compression="zlib", compression_threshold=64, zdicts=[dict_id])
+    client = None
+    try:
+        client = jsocket.JsonClient(
+            address="127.0.0.1", port=port, compression="zlib", compression_threshold=64, zdicts=[dict_id]
+        )
+        assert client.connect() is True
+        assert client.zdict_id == dict_id
+        msg = _samples(1, seed=3)[0]
+        client.send_obj(msg)
+        assert client.read_obj() == msg
+        assert client._last_read_zdict == dict_id
+        assert client._last_read_flags & jsocket_base.FLAG_COMPRESSION_MASK == compression.COMPRESSION_ZLIB
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+@pytest.mark.integration
+@pytest.mark.timeout(10)
+def test_server_without_dictionary_falls_back_to_plain_zlib():
+    """When the server has none of the offered dictionaries, frames use plain zlib."""
+    dict_id = compression.register_zdict(compression.build_zdict(_samples(30, seed=5)))
+    server, port = _start_server()
+    client = None
+    try:
+        client = jsocket.JsonClient(
+            address="127.0.0.1", port=port, compression="zlib", compression_threshold=64, zdicts=[dict_id]
+        )
+        assert client.connect() is True
+        assert client.zdict_id is None
+        msg = _samples(1, seed=4)[0]
+        client.send_obj(msg)
+        assert client.read_obj() == msg
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
+        server.join(timeout=3)
+
+
+def test_unknown_dictionary_id_is_framing_error():
+    """Frames naming an unregistered dictionary are rejected."""
+    left, right = socket.socketpair()
+    receiver = jsocket_base.JsonSocket(create_socket=False)
+    receiver.socket = receiver.conn = right
+    right.settimeout(1.0)
+    try:
+        payload = zlib.compress(b"{}")
+        header = struct.pack(
+            jsocket_base.FRAME_EXT_HEADER_FMT,
+            jsocket_base.FRAME_MAGIC_EXT,
+            len(payload),
+            zlib.crc32(payload) & 0xFFFFFFFF,
+            0,
+            compression.COMPRESSION_ZLIB,
+            0xFFFF,
+        )
+        left.sendall(header + payload)
+        with pytest.raises(jsocket.FramingError, match="unknown zdict id"):
+            receiver.read_obj()
+    finally:
+        left.close()
+        receiver.close()